@@ -1,12 +1,20 @@
 
 import os
+import json
 import logging
-from typing import Dict
-from fastapi import FastAPI, HTTPException
-import pandas as pd
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
-from src.pdf_process import PDFProcessor
-from src.pdf_structure import PDFStructurer
+from src.batch import iter_process_pdfs
+from src.jobs import JobManager
+from src.llm import LLM_STREAM
+from src.llm_cache import CACHE_MODES
+from src.manifest import Manifest, file_hash
+from src.metrics import PROMETHEUS_CONTENT_TYPE, metrics, observe_result, result_timings
+from src.output import OUTPUT_FORMATS, OUTPUT_MEDIA_TYPES, open_sink
+from src.timing import stage
 
 # Configure logging with detailed formatting
 logging.basicConfig(
@@ -26,6 +34,137 @@ app = FastAPI(
     version="1.0.0"
 )
 
+job_manager = JobManager()
+
+# Folder holding every output file written by the API
+OUTPUT_FOLDER = "output"
+
+
+def validate_options(workers: int, llm_cache: Optional[str], pack_files: int = 1):
+    """
+    Validate the processing options shared by the extraction endpoints.
+    
+    Args:
+        workers (int): Number of worker processes
+        llm_cache (str, optional): LLM response cache mode
+        pack_files (int, optional): Number of files structured together. Defaults to 1.
+        
+    Raises:
+        HTTPException: 400 if an option is invalid
+    """
+    if workers < 1:
+        error_msg = f"Number of workers must be at least 1, got {workers}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
+
+    if pack_files < 1:
+        error_msg = f"Number of packed files must be at least 1, got {pack_files}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
+
+    if llm_cache is not None and llm_cache not in CACHE_MODES:
+        error_msg = f"Unknown LLM cache mode '{llm_cache}', expected one of {', '.join(CACHE_MODES)}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
+
+
+def validate_request(input_folder: str, workers: int, llm_cache: Optional[str], pack_files: int = 1):
+    """
+    Validate the parameters shared by the extraction endpoints.
+    
+    Args:
+        input_folder (str): Path to folder containing PDF files
+        workers (int): Number of worker processes
+        llm_cache (str, optional): LLM response cache mode
+        pack_files (int, optional): Number of files structured together. Defaults to 1.
+        
+    Raises:
+        HTTPException: 400 if a parameter is invalid
+    """
+    # Validate input folder
+    if not os.path.isdir(input_folder):
+        error_msg = f"Input folder '{input_folder}' does not exist"
+        logger.error(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
+
+    validate_options(workers, llm_cache, pack_files)
+
+
+def validate_output_format(output_format: str):
+    """
+    Validate the requested output format.
+    
+    Args:
+        output_format (str): Output file format
+        
+    Raises:
+        HTTPException: 400 if the format is not supported
+    """
+    if output_format not in OUTPUT_FORMATS:
+        error_msg = f"Unknown output format '{output_format}', expected one of {', '.join(OUTPUT_FORMATS)}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
+
+
+def validate_output_path(output_path: Optional[str], output_format: str) -> str:
+    """
+    Validate the requested output path, which must lie inside the output folder.
+    
+    Args:
+        output_path (str, optional): Requested path of the output file
+        output_format (str): Output file format
+        
+    Returns:
+        str: Path of the output file, "output/output.<format>" by default
+        
+    Raises:
+        HTTPException: 400 if the path resolves outside the output folder
+    """
+    output_file = output_path or os.path.join(OUTPUT_FOLDER, f"output.{output_format}")
+    output_folder = os.path.realpath(OUTPUT_FOLDER)
+    resolved = os.path.realpath(output_file)
+    if resolved == output_folder or os.path.commonpath([output_folder, resolved]) != output_folder:
+        error_msg = f"Output path '{output_path}' must be a file inside the '{OUTPUT_FOLDER}' folder"
+        logger.error(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
+    return output_file
+
+
+def list_pdf_files(input_folder: str) -> List[str]:
+    """
+    List the paths of the PDF files in a folder.
+    
+    Args:
+        input_folder (str): Path to folder containing PDF files
+        
+    Returns:
+        List[str]: Paths of the PDF files
+    """
+    return [os.path.join(input_folder, f) for f in os.listdir(input_folder) if f.endswith(".pdf")]
+
+
+def batch_options(
+    workers: int,
+    concurrent_llm: bool,
+    llm_cache: Optional[str],
+    lazy_ocr: Optional[bool],
+    stream_llm: Optional[bool] = None,
+    pack_files: int = 1,
+) -> dict:
+    """
+    Build the keyword arguments of iter_process_pdfs from request parameters.
+    
+    Returns:
+        dict: Worker count and processor/structurer options
+    """
+    return {
+        "workers": workers,
+        "pack_files": pack_files,
+        "processor_options": {"lazy_ocr": lazy_ocr},
+        "structurer_options": {"concurrent": concurrent_llm, "cache_mode": llm_cache, "stream": stream_llm},
+    }
+
+
 @app.get("/")
 async def root() -> Dict[str, str]:
     """
@@ -43,76 +182,174 @@ async def root() -> Dict[str, str]:
     logger.debug("Health check endpoint accessed")
     return {"message": "Automatic PDF structure service is running."}
 
+
+@app.get("/metrics", summary="Prometheus metrics")
+def get_metrics() -> Response:
+    """
+    Expose the pipeline metrics in the Prometheus text format.
+    
+    Includes per-stage duration histograms and counters of processed files,
+    OCR'd pages, table of contents entries, LLM blocks and tokens and JSON
+    parse failures, aggregated over every file processed by this server.
+    
+    Returns:
+        Response: Metrics text
+    """
+    return Response(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.post(
     "/extract_objectives_and_endpoints",
     summary="Extract structured data from PDF files",
 )
-def extract_objectives_and_endpoints(input_folder: str = "input") -> Dict[str, str]:
+def extract_objectives_and_endpoints(
+    input_folder: str = "input",
+    workers: int = 1,
+    concurrent_llm: bool = False,
+    llm_cache: Optional[str] = None,
+    incremental: bool = False,
+    lazy_ocr: Optional[bool] = None,
+    output_format: str = "csv",
+    output_path: Optional[str] = None,
+    stream_llm: Optional[bool] = None,
+    pack_files: int = 1,
+) -> Dict[str, Any]:
     """
     Process PDF files to extract objectives and endpoints data.
     
     Scans the specified input folder for PDF files, processes each file
     to extract structured data about objectives and endpoints, and
-    consolidates the results into a single CSV file.
+    appends the rows of each file to a single output file as soon as the
+    file is processed.
     
     Args:
         input_folder (str, optional): Path to folder containing PDF files. 
                                     Defaults to "input".
+        workers (int, optional): Number of worker processes used to process
+                                 files in parallel. Defaults to 1.
+        concurrent_llm (bool, optional): Send all content blocks of a
+                                         document to the LLM at the same
+                                         time. Defaults to False.
+        llm_cache (str, optional): LLM response cache mode, one of "use",
+                                   "bypass" or "refresh". Defaults to the
+                                   LLM_CACHE_MODE setting.
+        incremental (bool, optional): Only process new or changed PDF files,
+                                      reusing the rows stored in the output
+                                      manifest for the others. Defaults to False.
+        lazy_ocr (bool, optional): For scanned PDFs, only recognise the table
+                                   of contents and the pages it points to.
+                                   Defaults to the LAZY_OCR setting.
+        output_format (str, optional): Output file format, one of "csv",
+                                       "ndjson" or "parquet". Defaults to "csv".
+        output_path (str, optional): Path of the output file, inside the
+                                     "output" folder. Defaults to
+                                     "output/output.<format>".
+        stream_llm (bool, optional): Stream LLM responses and parse their
+                                     rows as they are generated. With one
+                                     worker, rows are appended to CSV and
+                                     NDJSON outputs before the response
+                                     finishes. Defaults to the LLM_STREAM setting.
+        pack_files (int, optional): Structure this many files together,
+                                    packing their short content blocks into
+                                    shared LLM requests. Defaults to 1.
     
     Returns:
-        Dict[str, str]: Success message with path to output CSV file
+        Dict[str, Any]: Success message with path to output file, the
+        processing time of each file broken down by stage, plus the number
+        of skipped, reprocessed and removed files in incremental mode
     """
 
     logger.info("Starting PDF extraction process from folder: %s", input_folder)
     
-    # Validate input folder
-    if not os.path.isdir(input_folder):
-        error_msg = f"Input folder '{input_folder}' does not exist"
-        logger.error(error_msg)
-        raise HTTPException(status_code=400, detail=error_msg)
+    validate_request(input_folder, workers, llm_cache, pack_files)
+    validate_output_format(output_format)
+    output_file = validate_output_path(output_path, output_format)
 
-    df_output = pd.DataFrame()
     processed_files = 0
     failed_files = 0
+    file_timings = []
 
     try:
         # Process each PDF file
-        pdf_files = [f for f in os.listdir(input_folder) if f.endswith(".pdf")]
-        total_files = len(pdf_files)
-        logger.info("Found %d PDF files to process", total_files)
-
-        for file in pdf_files:
-            file_path = os.path.join(input_folder, file)
-            logger.info("Processing file %d/%d: %s", processed_files + failed_files + 1, total_files, file)
-
-            try:
-                # Process individual PDF
-                logger.debug("Initializing PDF processor for %s", file)
-                pdf_processor = PDFProcessor(file_path)
-                
-                logger.debug("Structuring data from %s", file)
-                pdf_structured = PDFStructurer(pdf_processor).data_df
-                
-                # Convert structured data to DataFrame
-                data_dicts = [item.dict() for item in pdf_structured]
-                df = pd.DataFrame(data_dicts)
-                
-                # Append to master DataFrame
-                df_output = pd.concat([df_output, df])
+        file_paths = list_pdf_files(input_folder)
+        logger.info("Found %d PDF files", len(file_paths))
+
+        pending_paths = file_paths
+
+        if incremental:
+            # Only process files whose content changed since the last run
+            manifest = Manifest(os.path.join(OUTPUT_FOLDER, "manifest.json"))
+            removed_files = manifest.prune(file_paths, input_folder)
+            hashes = {file_path: file_hash(file_path) for file_path in file_paths}
+            pending_paths = [
+                file_path for file_path in file_paths
+                if not manifest.is_current(file_path, hashes[file_path])
+            ]
+            skipped_files = len(file_paths) - len(pending_paths)
+            logger.info(
+                "Incremental run: %d unchanged, %d new or changed, %d removed files",
+                skipped_files, len(pending_paths), removed_files
+            )
+
+        total_files = len(pending_paths)
+        logger.info("Processing %d PDF files", total_files)
+
+        # Parquet row groups are written per document, incremental runs rebuild the output
+        stream_to_sink = (
+            (LLM_STREAM if stream_llm is None else stream_llm)
+            and not incremental
+            and output_format != "parquet"
+        )
+
+        # Closed even if processing fails, so a Parquet output keeps its footer
+        with open_sink(output_format, output_file) as sink:
+            # End of the output before the first streamed row of each unfinished file
+            marks = {}
+
+            def write_row(file_path: str, row: dict):
+                with stage("write"):
+                    if file_path not in marks:
+                        marks[file_path] = sink.mark()
+                    sink.write_rows([row])
+
+            for result in iter_process_pdfs(
+                pending_paths,
+                on_row=write_row if stream_to_sink else None,
+                **batch_options(workers, concurrent_llm, llm_cache, lazy_ocr, stream_llm, pack_files),
+            ):
+                file = os.path.basename(result.file_path)
+                logger.info("Finished file %d/%d: %s", processed_files + failed_files + 1, total_files, file)
+                observe_result(result)
+                timings = result_timings(result)
+                file_timings.append(timings)
+
+                mark = marks.pop(result.file_path, None)
+                if result.error is not None:
+                    failed_files += 1
+                    logger.error("Failed to process %s: %s", file, result.error)
+                    if mark is not None:
+                        # Rows streamed before the failure are dropped, as with worker processes
+                        sink.discard(mark)
+                    if incremental:
+                        manifest.remove(result.file_path)
+                    continue
+
+                if not stream_to_sink:
+                    start = time.perf_counter()
+                    if incremental:
+                        manifest.update(result.file_path, hashes[result.file_path], result.rows)
+                    else:
+                        sink.write_rows(result.rows)
+                    write_seconds = time.perf_counter() - start
+                    timings["stages"]["write"] = round(write_seconds, 4)
+                    metrics.observe_stage("write", write_seconds)
                 processed_files += 1
                 logger.info("Successfully processed %s", file)
 
-            except Exception as e:
-                failed_files += 1
-                logger.error("Failed to process %s: %s", file, str(e), exc_info=True)
-                continue
-
-        # Create output directory and save results
-        output_folder = "output"
-        os.makedirs(output_folder, exist_ok=True)
-        
-        output_file = os.path.join(output_folder, "output.csv")
-        df_output.to_csv(output_file, index=False)
+            if incremental:
+                # Rebuild the merged output from the stored per-file results
+                manifest.save()
+                for file_path in file_paths:
+                    sink.write_rows(manifest.rows([file_path]))
         
         # Log processing summary
         logger.info(
@@ -121,11 +358,220 @@ def extract_objectives_and_endpoints(input_folder: str = "input") -> Dict[str, s
         )
         logger.info("Output saved to: %s", output_file)
         
-        return {
-            "message": f"Saved to CSV at {output_file}",
+        response = {
+            "message": f"Saved to {output_format.upper()} at {output_file}",
+            "files": file_timings,
         }
+        if incremental:
+            response.update(
+                skipped_files=skipped_files,
+                reprocessed_files=processed_files,
+                removed_files=removed_files,
+            )
+        return response
 
     except Exception as e:
         error_msg = "Unexpected error during PDF processing"
         logger.exception(error_msg)
         raise HTTPException(status_code=500, detail=f"{error_msg}: {str(e)}")
+
+
+@app.post(
+    "/extract_objectives_and_endpoints/upload",
+    summary="Extract structured data from uploaded PDF files",
+)
+async def extract_objectives_and_endpoints_upload(
+    files: List[UploadFile] = File(...),
+    workers: int = 1,
+    concurrent_llm: bool = False,
+    llm_cache: Optional[str] = None,
+    lazy_ocr: Optional[bool] = None,
+    stream_llm: Optional[bool] = None,
+    pack_files: int = 1,
+) -> StreamingResponse:
+    """
+    Process uploaded PDF files and stream the extracted rows back as NDJSON.
+    
+    Files are processed from memory. Only a scanned PDF that needs OCR is
+    written to a temporary file, removed once it is processed, as page
+    rendering needs a file. Rows are streamed as soon as each
+    document finishes, one JSON object per line following DFSchema. A
+    document that fails yields a single {"file": ..., "error": ...} line.
+    
+    Args:
+        files (List[UploadFile]): PDF files to process
+        workers (int, optional): Number of worker processes used to process
+                                 files in parallel. Defaults to 1.
+        concurrent_llm (bool, optional): Send all content blocks of a
+                                         document to the LLM at the same
+                                         time. Defaults to False.
+        llm_cache (str, optional): LLM response cache mode. Defaults to the
+                                   LLM_CACHE_MODE setting.
+        lazy_ocr (bool, optional): For scanned PDFs, only recognise the table
+                                   of contents and the pages it points to.
+                                   Defaults to the LAZY_OCR setting.
+        stream_llm (bool, optional): Stream LLM responses and parse their
+                                     rows as they are generated. Defaults to
+                                     the LLM_STREAM setting.
+        pack_files (int, optional): Structure this many files together,
+                                    packing their short content blocks into
+                                    shared LLM requests. Defaults to 1.
+    
+    Returns:
+        StreamingResponse: NDJSON stream of extracted rows
+    """
+    validate_options(workers, llm_cache, pack_files)
+
+    file_names = [os.path.basename(file.filename or f"upload_{i}.pdf") for i, file in enumerate(files)]
+    contents = []
+    for file in files:
+        # One upload at a time, each released by the server once read
+        contents.append(await file.read())
+        await file.close()
+    logger.info("Received %d uploaded PDF files", len(files))
+
+    def stream_rows() -> Iterator[str]:
+        for result in iter_process_pdfs(
+            file_names,
+            contents=contents,
+            ordered=False,
+            **batch_options(workers, concurrent_llm, llm_cache, lazy_ocr, stream_llm, pack_files),
+        ):
+            observe_result(result)
+            if result.error is not None:
+                logger.error("Failed to process %s: %s", result.file_path, result.error)
+                yield json.dumps({"file": result.file_path, "error": result.error}) + "\n"
+                continue
+            logger.info("Successfully processed %s", result.file_path)
+            for row in result.rows:
+                yield json.dumps(row) + "\n"
+
+    return StreamingResponse(stream_rows(), media_type="application/x-ndjson")
+
+
+@app.post(
+    "/jobs",
+    summary="Submit a background extraction job",
+)
+def submit_job(
+    input_folder: str = "input",
+    workers: int = 1,
+    concurrent_llm: bool = False,
+    llm_cache: Optional[str] = None,
+    lazy_ocr: Optional[bool] = None,
+    output_format: str = "csv",
+    stream_llm: Optional[bool] = None,
+    pack_files: int = 1,
+) -> Dict[str, Any]:
+    """
+    Queue the extraction of a folder of PDF files and return immediately.
+    
+    The job runs on a bounded pool of background workers. Its progress can
+    be polled at `/jobs/{job_id}` and its result downloaded from
+    `/jobs/{job_id}/result` once it has completed.
+    
+    Args:
+        input_folder (str, optional): Path to folder containing PDF files.
+                                    Defaults to "input".
+        workers (int, optional): Number of worker processes used by the job.
+                                 Defaults to 1.
+        concurrent_llm (bool, optional): Send all content blocks of a
+                                         document to the LLM at the same
+                                         time. Defaults to False.
+        llm_cache (str, optional): LLM response cache mode. Defaults to the
+                                   LLM_CACHE_MODE setting.
+        lazy_ocr (bool, optional): For scanned PDFs, only recognise the table
+                                   of contents and the pages it points to.
+                                   Defaults to the LAZY_OCR setting.
+        output_format (str, optional): Output file format, one of "csv",
+                                       "ndjson" or "parquet". Defaults to "csv".
+        stream_llm (bool, optional): Stream LLM responses and parse their
+                                     rows as they are generated. Defaults to
+                                     the LLM_STREAM setting.
+        pack_files (int, optional): Structure this many files together,
+                                    packing their short content blocks into
+                                    shared LLM requests. Defaults to 1.
+    
+    Returns:
+        Dict[str, Any]: Job identifier and status
+    """
+    validate_request(input_folder, workers, llm_cache, pack_files)
+    validate_output_format(output_format)
+
+    file_paths = list_pdf_files(input_folder)
+    job = job_manager.submit(
+        file_paths, batch_options(workers, concurrent_llm, llm_cache, lazy_ocr, stream_llm, pack_files), output_format=output_format
+    )
+    logger.info("Submitted job %s for folder %s", job.id, input_folder)
+    return {"job_id": job.id, "status": job.status}
+
+
+def get_job_or_404(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        error_msg = f"Job '{job_id}' not found"
+        logger.error(error_msg)
+        raise HTTPException(status_code=404, detail=error_msg)
+    return job
+
+
+@app.get(
+    "/jobs/{job_id}",
+    summary="Get the progress of an extraction job",
+)
+def get_job(job_id: str) -> Dict[str, Any]:
+    """
+    Report the status of a job, with per-file progress, timings and failures.
+    
+    Args:
+        job_id (str): Job identifier
+    
+    Returns:
+        Dict[str, Any]: Job status
+    """
+    return get_job_or_404(job_id).to_dict()
+
+
+@app.get(
+    "/jobs/{job_id}/result",
+    summary="Download the result of a completed extraction job",
+)
+def get_job_result(job_id: str) -> FileResponse:
+    """
+    Download the output file produced by a completed job.
+    
+    Args:
+        job_id (str): Job identifier
+    
+    Returns:
+        FileResponse: The output file
+    """
+    job = get_job_or_404(job_id)
+    if job.status != "completed":
+        error_msg = f"Job '{job_id}' is {job.status}, no result available"
+        logger.error(error_msg)
+        raise HTTPException(status_code=409, detail=error_msg)
+    return FileResponse(
+        job.output_file,
+        media_type=OUTPUT_MEDIA_TYPES[job.output_format],
+        filename=os.path.basename(job.output_file),
+    )
+
+
+@app.delete(
+    "/jobs/{job_id}",
+    summary="Cancel an extraction job",
+)
+def cancel_job(job_id: str) -> Dict[str, Any]:
+    """
+    Cancel a queued or running job. Files already being processed finish first.
+    
+    Args:
+        job_id (str): Job identifier
+    
+    Returns:
+        Dict[str, Any]: Job status
+    """
+    get_job_or_404(job_id)
+    job = job_manager.cancel(job_id)
+    return {"job_id": job.id, "status": job.status, "cancel_requested": job.cancel_event.is_set()}
@@ -0,0 +1,113 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from typing import List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.outcome_rules import OutcomeExtractor, load_synonyms  # noqa: E402
+
+# Labelled statements, with the column holding their outcome measure
+DATASETS = (
+    ("notebooks/data.csv", "outcome measure"),
+    ("notebooks/output.csv", "outcome_measure"),
+)
+
+
+def read_statements(path: str, column: str) -> List[Tuple[str, str]]:
+    """Read the statement texts of a CSV file with their outcome measure."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(row["statement_text"], row[column]) for row in csv.DictReader(f)]
+
+
+def score(extractor: OutcomeExtractor, statements: List[Tuple[str, str]]) -> dict:
+    """
+    Compare the measures found in each statement with its labelled outcome measure.
+
+    Labels are mapped to the dictionary measures with the same automaton, so
+    "Progression free survival" and "PFS" agree. Statements whose label
+    names no dictionary measure are only counted in the coverage.
+
+    Returns:
+        dict: Coverage, exact and partial agreement with the labels
+    """
+    found = extractor.extract(text for text, _ in statements)
+    labels = [extractor.normalise(label) for _, label in statements]
+    comparable = [(set(measures), set(label)) for measures, label in zip(found, labels) if label]
+    return {
+        "statements": len(statements),
+        "covered": sum(bool(measures) for measures in found),
+        "labels_in_dictionary": len(comparable),
+        "exact_agreement": sum(measures == label for measures, label in comparable) / len(comparable) if comparable else None,
+        "partial_agreement": sum(bool(measures & label) for measures, label in comparable) / len(comparable) if comparable else None,
+        "missed": [
+            {"statement_text": text, "label": label, "found": measures}
+            for (text, label), measures, normalised in zip(statements, found, labels)
+            if normalised and not set(measures) & set(normalised)
+        ],
+    }
+
+
+def throughput(extractor: OutcomeExtractor, texts: List[str], statements: int, batch_size: int) -> dict:
+    """
+    Time the extractor over the given texts repeated up to a number of statements.
+
+    Returns:
+        dict: Statements and characters per second
+    """
+    corpus = list(itertools.islice(itertools.cycle(texts), statements))
+    characters = sum(len(text) for text in corpus)
+    start = time.perf_counter()
+    for begin in range(0, len(corpus), batch_size):
+        extractor.extract(corpus[begin:begin + batch_size])
+    seconds = time.perf_counter() - start
+    return {
+        "statements": len(corpus),
+        "batch_size": batch_size,
+        "seconds": seconds,
+        "statements_per_second": len(corpus) / seconds if seconds else None,
+        "characters_per_second": characters / seconds if seconds else None,
+    }
+
+
+def main():
+    """
+    Command line entry point of the outcome measure rules benchmark.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the rule-based outcome measure extractor on the notebook data.")
+    parser.add_argument("--statements", type=int, default=200000, help="Statements scanned to measure throughput")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Statements scanned in one pass")
+    parser.add_argument("--synonyms", default=None, help="JSON synonym dictionary merged into the default one")
+    parser.add_argument("--show-missed", action="store_true", help="List statements whose label was not found")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    extractor = OutcomeExtractor(load_synonyms(args.synonyms))
+    build_seconds = time.perf_counter() - start
+
+    report = {"build_seconds": build_seconds, "datasets": {}}
+    texts = []
+    for path, column in DATASETS:
+        statements = read_statements(os.path.join(ROOT, path), column)
+        texts.extend(text for text, _ in statements)
+        scores = score(extractor, statements)
+        if not args.show_missed:
+            scores["missed"] = len(scores["missed"])
+        report["datasets"][path] = scores
+    report["throughput"] = throughput(extractor, texts, args.statements, args.batch_size)
+
+    report = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.batch import iter_process_pdfs  # noqa: E402
+from src.fake_llm import FakeChatModel  # noqa: E402
+from src.output import open_sink  # noqa: E402
+from src.timing import STAGES, record_stages, stage  # noqa: E402
+
+VARIANTS = ("outline", "text-toc", "scanned")
+
+WORDS = (
+    "patients study treatment dose safety response tumor randomised cohort visit assessment "
+    "criteria baseline investigator protocol efficacy survival progression analysis adverse "
+    "events population sample size screening follow-up endpoint objective arm placebo"
+).split()
+
+# (title, share of the document) of the top-level sections, with their subsections
+SECTIONS = [
+    ("Introduction", 0.15, ["Background", "Rationale"]),
+    ("Study Objectives", 0.05, ["Primary Objective", "Secondary Objectives", "Exploratory Objectives"]),
+    ("Study Endpoints", 0.05, ["Primary Endpoint", "Secondary Endpoints"]),
+    ("Investigational Plan", 0.25, ["Overall Study Design", "Randomisation"]),
+    ("Selection of Study Population", 0.15, ["Inclusion Criteria", "Exclusion Criteria"]),
+    ("Safety Assessments", 0.2, ["Adverse Events", "Laboratory Tests"]),
+    ("Statistical Methods", 0.15, ["Sample Size", "Analysis Populations"]),
+]
+
+STATEMENTS = {
+    "Primary Objective": "To compare progression-free survival (PFS) between the two arms.",
+    "Secondary Objectives": "To compare overall survival (OS) and the objective response rate (ORR).",
+    "Exploratory Objectives": "To explore biomarkers associated with response.",
+    "Primary Endpoint": "PFS assessed by the investigator according to RECIST 1.1.",
+    "Secondary Endpoints": "OS, ORR and the incidence of adverse events.",
+}
+
+
+def _filler(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _layout(pages: int) -> List[list]:
+    """Assign [level, number, title, first page] to each heading of a document."""
+    headings = []
+    page = 3  # Title page and TOC page come first
+    body_pages = max(len(SECTIONS), pages - 2)
+    for number, (title, share, subsections) in enumerate(SECTIONS, start=1):
+        section_pages = max(1, round(body_pages * share))
+        headings.append([1, f"{number}", title, page])
+        for sub_number, subsection in enumerate(subsections, start=1):
+            offset = (sub_number - 1) * section_pages // len(subsections)
+            headings.append([2, f"{number}.{sub_number}", subsection, page + offset])
+        page += section_pages
+    return [heading for heading in headings if heading[3] <= pages]
+
+
+def generate_protocol(path: str, pages: int, variant: str = "outline", seed: int = 0, dpi: int = 100):
+    """
+    Write a synthetic clinical trial protocol.
+
+    Args:
+        path (str): Path of the PDF file to write
+        pages (int): Number of pages, at least 9
+        variant (str, optional): "outline" embeds the table of contents as PDF
+                                 outline, "text-toc" only prints it on page 2
+                                 and "scanned" rasterises every page without
+                                 a text layer. Defaults to "outline".
+        seed (int, optional): Seed of the filler text. Defaults to 0.
+        dpi (int, optional): Resolution of scanned pages. Defaults to 100.
+    """
+    import pymupdf
+
+    rng = random.Random(seed)
+    headings = _layout(pages)
+    starts: Dict[int, List[list]] = {}
+    for heading in headings:
+        starts.setdefault(heading[3], []).append(heading)
+
+    doc = pymupdf.open()
+    for page_number in range(1, pages + 1):
+        page = doc.new_page()
+        if page_number == 1:
+            lines = [f"Clinical Study Protocol {seed:04d}", "", _filler(rng, 30)]
+        elif page_number == 2:
+            lines = ["Table of Contents", ""] + [
+                f"{number} {title} {first_page}" for _, number, title, first_page in headings
+            ]
+        else:
+            lines = []
+            for _, number, title, _ in starts.get(page_number, []):
+                lines += [f"{number} {title}", STATEMENTS.get(title, _filler(rng, 25)), ""]
+            lines += [_filler(rng, 40) for _ in range(6 - len(lines) // 3)]
+        page.insert_textbox(pymupdf.Rect(50, 50, 545, 790), "\n".join(lines), fontsize=10)
+
+    if variant == "outline":
+        doc.set_toc([[level, f"{number} {title}", first_page] for level, number, title, first_page in headings])
+    elif variant == "scanned":
+        scanned = pymupdf.open()
+        for page in doc:
+            pixmap = page.get_pixmap(dpi=dpi)
+            scanned.new_page(width=page.rect.width, height=page.rect.height).insert_image(page.rect, pixmap=pixmap)
+        doc.close()
+        doc = scanned
+    doc.save(path)
+    doc.close()
+
+
+def generate_corpus(folder: str, variants: List[str], page_counts: List[int], docs: int, seed: int = 0) -> List[dict]:
+    """
+    Write docs protocols for each variant and page count.
+
+    Returns:
+        List[dict]: Path, variant and page count of each generated file
+    """
+    files = []
+    for variant in variants:
+        for pages in page_counts:
+            for i in range(docs):
+                path = os.path.join(folder, f"{variant}_{pages:04d}p_{i:03d}.pdf")
+                generate_protocol(path, pages, variant, seed=seed + i)
+                files.append({"path": path, "variant": variant, "pages": pages})
+    return files
+
+
+def _peak_rss_mb(who: int) -> float:
+    rss = resource.getrusage(who).ru_maxrss
+    # Reported in bytes on macOS, in kilobytes elsewhere
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_benchmark(args) -> dict:
+    """
+    Generate the corpus, run the pipeline over it with the fake LLM and summarise the run.
+
+    Returns:
+        dict: Throughput, peak RSS and per-stage timings of the run
+    """
+    skipped = []
+    variants = list(args.variants)
+    # Documents without an embedded outline go through OCR
+    if shutil.which("tesseract") is None:
+        for variant in ("text-toc", "scanned"):
+            if variant in variants:
+                variants.remove(variant)
+                skipped.append({"variant": variant, "reason": "tesseract is not installed"})
+
+    folder = args.workdir or tempfile.mkdtemp(prefix="pdf-benchmark-")
+    os.makedirs(folder, exist_ok=True)
+    try:
+        files = generate_corpus(folder, variants, args.pages, args.docs, seed=args.seed)
+        by_path = {file["path"]: file for file in files}
+
+        model = FakeChatModel(latency=args.llm_latency, rows=args.llm_rows)
+        stages_total = dict.fromkeys(STAGES, 0.0)
+        per_variant: Dict[str, dict] = {}
+        rows = failed = 0
+
+        start = time.perf_counter()
+        with record_stages() as write_stages, open_sink(args.format, os.path.join(folder, f"output.{args.format}")) as sink:
+            for result in iter_process_pdfs(
+                [file["path"] for file in files],
+                workers=args.workers,
+                processor_options={"lazy_ocr": args.lazy_ocr, "adaptive_ocr": args.adaptive_ocr, "text_store": args.text_store},
+                structurer_options={"chat_model": model, "concurrent": args.concurrent_llm, "cache_mode": "bypass"},
+                pack_files=args.pack_files,
+            ):
+                with stage("write"):
+                    sink.write_rows(result.rows)
+                rows += len(result.rows)
+                failed += result.error is not None
+
+                file = by_path[result.file_path]
+                summary = per_variant.setdefault(file["variant"], {"docs": 0, "pages": 0, "seconds": 0.0, "stages": {}})
+                summary["docs"] += 1
+                summary["pages"] += file["pages"]
+                summary["seconds"] += result.seconds
+                for name, seconds in (result.stages or {}).items():
+                    stages_total[name] = stages_total.get(name, 0.0) + seconds
+                    summary["stages"][name] = summary["stages"].get(name, 0.0) + seconds
+        seconds = time.perf_counter() - start
+        stages_total["write"] += write_stages.get("write", 0.0)
+    finally:
+        if not args.keep and not args.workdir:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    pages = sum(file["pages"] for file in files)
+    return {
+        "config": {
+            "variants": variants,
+            "pages": args.pages,
+            "docs_per_size": args.docs,
+            "workers": args.workers,
+            "concurrent_llm": args.concurrent_llm,
+            "pack_files": args.pack_files,
+            "lazy_ocr": args.lazy_ocr,
+            "adaptive_ocr": args.adaptive_ocr,
+            "text_store": args.text_store,
+            "llm_latency": args.llm_latency,
+            "llm_rows": args.llm_rows,
+            "format": args.format,
+            "seed": args.seed,
+        },
+        "docs": len(files),
+        "pages": pages,
+        "rows": rows,
+        "failed_docs": failed,
+        "seconds": seconds,
+        "docs_per_second": len(files) / seconds if seconds else None,
+        "pages_per_second": pages / seconds if seconds else None,
+        "peak_rss_mb": {
+            "main": _peak_rss_mb(resource.RUSAGE_SELF),
+            "workers": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+        },
+        "stage_seconds": stages_total,
+        "variants": per_variant,
+        "skipped": skipped,
+    }
+
+
+def main():
+    """
+    Command line entry point of the end-to-end benchmark.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the extraction pipeline on synthetic protocols.")
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=VARIANTS)
+    parser.add_argument("--pages", nargs="+", type=int, default=[20, 80], help="Page counts of the generated documents")
+    parser.add_argument("--docs", type=int, default=2, help="Documents per variant and page count")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrent-llm", action="store_true")
+    parser.add_argument(
+        "--pack-files", type=int, default=1,
+        help="Structure this many files together, packing their short blocks into shared requests",
+    )
+    parser.add_argument("--lazy-ocr", action="store_true")
+    parser.add_argument("--adaptive-ocr", action="store_true", help="Re-render low-confidence pages at higher resolutions")
+    parser.add_argument(
+        "--text-store", default="bypass", choices=("use", "bypass", "refresh"),
+        help="Page text store mode, bypassed by default to time text extraction",
+    )
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per fake LLM request")
+    parser.add_argument("--llm-rows", type=int, default=5, help="Rows per fake LLM response")
+    parser.add_argument("--format", default="csv", choices=("csv", "ndjson", "parquet"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None, help="Folder for the generated PDFs, kept after the run")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary folder")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = json.dumps(run_benchmark(args), indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be loaded before the first request needs them
+DEFERRED_MODULES = ("langchain", "langchain_core", "openai", "pandas", "pytesseract", "pdf2image", "pymupdf", "numpy", "torch")
+
+MEASURE = """
+import json, resource, sys, time
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "seconds": seconds,
+    "rss_mb": rss_after / 1024,
+    "import_rss_mb": (rss_after - rss_before) / 1024,
+    "loaded": [name for name in {deferred!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure_import(module: str = "app") -> dict:
+    """
+    Import a module in a fresh interpreter and measure it.
+
+    Args:
+        module (str, optional): Module to import. Defaults to "app".
+
+    Returns:
+        dict: Import time, peak RSS, RSS added by the import and deferred modules loaded anyway
+    """
+    env = dict(os.environ)
+    # Importing must work without credentials
+    env.pop("OPENAI_API_KEY", None)
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE.format(module=module, deferred=DEFERRED_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    """
+    Benchmark the cold start of the app and fail on regressions.
+    """
+    parser = argparse.ArgumentParser(description="Measure the time and memory of `import app`.")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=None, help="Fail if the median import time is above")
+    parser.add_argument("--max-rss-mb", type=float, default=None, help="Fail if the peak RSS is above")
+    args = parser.parse_args()
+
+    runs = [measure_import(args.module) for _ in range(args.runs)]
+    report = {
+        "module": args.module,
+        "runs": args.runs,
+        "median_seconds": statistics.median(run["seconds"] for run in runs),
+        "max_seconds": max(run["seconds"] for run in runs),
+        "peak_rss_mb": max(run["rss_mb"] for run in runs),
+        "median_import_rss_mb": statistics.median(run["import_rss_mb"] for run in runs),
+        "deferred_modules_loaded": sorted({name for run in runs for name in run["loaded"]}),
+    }
+    print(json.dumps(report, indent=2))
+
+    failures = []
+    if report["deferred_modules_loaded"]:
+        failures.append(f"deferred modules loaded at import: {report['deferred_modules_loaded']}")
+    if args.max_seconds is not None and report["median_seconds"] > args.max_seconds:
+        failures.append(f"median import time {report['median_seconds']:.3f}s above {args.max_seconds}s")
+    if args.max_rss_mb is not None and report["peak_rss_mb"] > args.max_rss_mb:
+        failures.append(f"peak RSS {report['peak_rss_mb']:.1f} MB above {args.max_rss_mb} MB")
+    if failures:
+        sys.exit("Startup regression: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import json
+import os
+
 import requests
 
 def post_extract_objectives_and_endpoints(api_url: str, input_folder: str):
@@ -27,6 +30,38 @@ def post_extract_objectives_and_endpoints(api_url: str, input_folder: str):
         print(f"Request failed: {e}")
         raise
 
+def post_upload_pdfs(api_url: str, pdf_paths: list):
+    """
+    Uploads PDF files to the FastAPI endpoint and yields extracted rows as they arrive.
+
+    Args:
+        api_url (str): The base URL of the FastAPI server.
+        pdf_paths (list): Paths of the PDF files to upload.
+
+    Yields:
+        dict: Extracted rows, or {"file": ..., "error": ...} for failed files.
+    """
+    endpoint = f"{api_url}/extract_objectives_and_endpoints/upload"
+    files = [
+        ("files", (os.path.basename(pdf_path), open(pdf_path, "rb"), "application/pdf"))
+        for pdf_path in pdf_paths
+    ]
+
+    try:
+        with requests.post(endpoint, files=files, stream=True) as response:
+            if response.status_code != 200:
+                print(f"Error {response.status_code}: {response.text}")
+                response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+    except requests.RequestException as e:
+        print(f"Request failed: {e}")
+        raise
+    finally:
+        for _, (_, f, _) in files:
+            f.close()
+
 if __name__ == "__main__":
     API_URL = "http://127.0.0.1:8000"
     INPUT_FOLDER = "input"
@@ -0,0 +1,70 @@
+import argparse
+import json
+import sys
+
+from src.evaluation import EVAL_MATCH_THRESHOLD, evaluate, load_rows, regressions, run_pipeline
+
+
+def main():
+    """
+    Command line entry point scoring extracted rows against gold rows.
+
+    Optionally extracts the rows of a folder of PDFs first, reporting the
+    throughput of the run next to the scores, and compares the report with
+    a baseline one, exiting with an error when quality or throughput dropped.
+    """
+    parser = argparse.ArgumentParser(description="Score extracted rows against gold rows, and check for regressions.")
+    parser.add_argument("--gold", default="notebooks/data.csv", help="Gold rows (CSV, NDJSON or Parquet)")
+    parser.add_argument("--predictions", default="notebooks/output.csv", help="Predicted rows, written first with --input-folder")
+    parser.add_argument("--input-folder", default=None, help="Extract the rows of the PDFs of this folder first")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrent-llm", action="store_true")
+    parser.add_argument(
+        "--lazy-ocr", action=argparse.BooleanOptionalAction, default=None, help="Defaults to the LAZY_OCR setting"
+    )
+    parser.add_argument("--pack-files", type=int, default=1)
+    parser.add_argument("--llm-cache", default=None, choices=("use", "bypass", "refresh"))
+    parser.add_argument("--threshold", type=float, default=EVAL_MATCH_THRESHOLD, help="Lowest similarity of aligned statements")
+    parser.add_argument("--canonical-outcomes", action="store_true", help="Compare outcome measures by the measures they name")
+    parser.add_argument("--baseline", default=None, help="Report of a reference run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Largest drop of a score tolerated")
+    parser.add_argument("--max-slowdown", type=float, default=None, help="Largest relative drop of docs/s tolerated, e.g. 0.2")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    run = None
+    if args.input_folder:
+        run = run_pipeline(
+            args.input_folder,
+            args.predictions,
+            workers=args.workers,
+            processor_options={"lazy_ocr": args.lazy_ocr},
+            structurer_options={"concurrent": args.concurrent_llm, "cache_mode": args.llm_cache},
+            pack_files=args.pack_files,
+        )
+
+    report = evaluate(
+        load_rows(args.gold), load_rows(args.predictions), threshold=args.threshold, canonical_outcomes=args.canonical_outcomes
+    )
+    report["gold"], report["predictions"] = args.gold, args.predictions
+    if run is not None:
+        report["run"] = run
+
+    found = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(report, json.load(f), tolerance=args.tolerance, max_slowdown=args.max_slowdown)
+        report["regressions"] = found
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    if found:
+        print("Regressions against " + args.baseline + ":\n  " + "\n  ".join(found), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
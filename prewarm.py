@@ -0,0 +1,48 @@
+import argparse
+import json
+import os
+
+from src.text_store import TEXT_STORE_PATH, iter_warm_files
+
+
+def main():
+    """
+    Command line entry point pre-warming the page text store.
+
+    Extracts the text of every page of the PDFs of a folder, with OCR for
+    scanned ones, and their table of contents, across worker processes, so
+    later runs read them from the store instead of the PDFs.
+    """
+    parser = argparse.ArgumentParser(description="Store the page text of the PDF files of a folder.")
+    parser.add_argument("input_folder")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("--ocr-workers", type=int, default=1, help="OCR threads per worker process")
+    parser.add_argument("--refresh", action="store_true", help="Extract files already in the store again")
+    args = parser.parse_args()
+
+    file_paths = [
+        os.path.join(args.input_folder, file_name)
+        for file_name in sorted(os.listdir(args.input_folder))
+        if file_name.endswith(".pdf")
+    ]
+    processor_options = {
+        "lazy_ocr": False,
+        "ocr_workers": args.ocr_workers,
+        "text_store": "refresh" if args.refresh else "use",
+    }
+
+    summary = {"store": TEXT_STORE_PATH, "files": len(file_paths), "extracted": 0, "stored": 0, "pages": 0, "errors": {}}
+    for i, result in enumerate(iter_warm_files(file_paths, workers=args.workers, processor_options=processor_options), start=1):
+        if result.error is not None:
+            summary["errors"][result.file_path] = result.error
+        else:
+            summary["stored" if result.stored else "extracted"] += 1
+            summary["pages"] += result.pages
+        print(f"[{i}/{len(file_paths)}] {os.path.basename(result.file_path)}: "
+              f"{result.error or ('already stored' if result.stored else f'{result.pages} pages')} "
+              f"({result.seconds:.1f}s)", flush=True)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
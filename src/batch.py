@@ -0,0 +1,368 @@
+import asyncio
+import logging
+import time
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from src.ocr import OCR_WORKERS
+from src.pdf_process import PDFProcessor
+from src.pdf_structure import PDFStructurer, astructure_batch
+from src.timing import record_counts, record_stages
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+
+class FileResult(NamedTuple):
+    """
+    Outcome of processing one PDF file.
+
+    Attributes:
+        file_path (str): Path to the PDF file
+        rows (List[dict]): Extracted rows, empty if processing failed
+        error (str, optional): Error message if processing failed
+        seconds (float): Wall-clock processing time
+        stages (Dict[str, float], optional): Seconds spent in each pipeline stage
+        counts (Dict[str, int], optional): Counters recorded while processing,
+            e.g. OCR'd pages or LLM tokens
+    """
+    file_path: str
+    rows: List[dict]
+    error: Optional[str]
+    seconds: float
+    stages: Optional[Dict[str, float]] = None
+    counts: Optional[Dict[str, int]] = None
+
+
+def process_pdf(
+    file_path: str,
+    processor_options: Optional[dict] = None,
+    structurer_options: Optional[dict] = None,
+    data: Optional[bytes] = None,
+    on_row: Optional[Callable[[dict], None]] = None,
+) -> List[dict]:
+    """
+    Run the full open/OCR/TOC/structure pipeline on a single PDF.
+
+    Args:
+        file_path (str): Path to the PDF file, or its file name when the
+                         content is given in data
+        processor_options (dict, optional): Keyword arguments for PDFProcessor,
+                                            e.g. lazy_ocr. Defaults to None.
+        structurer_options (dict, optional): Keyword arguments for PDFStructurer,
+                                             e.g. concurrent or cache_mode.
+                                             Defaults to None.
+        data (bytes, optional): Content of the PDF file, processed from
+                                memory instead of reading file_path.
+                                Defaults to None.
+        on_row (Callable[[dict], None], optional): Called with each row as
+                                                   soon as it is extracted.
+                                                   Defaults to None.
+
+    Returns:
+        List[dict]: Extracted rows as plain dictionaries following DFSchema
+    """
+    logger.debug("Initializing PDF processor for %s", file_path)
+    pdf_processor = PDFProcessor(file_path, data=data, **(processor_options or {}))
+
+    logger.debug("Structuring data from %s", file_path)
+    structurer_options = dict(structurer_options or {})
+    if on_row is not None:
+        structurer_options["on_row"] = lambda row: on_row(row.dict())
+    try:
+        pdf_structured = PDFStructurer(pdf_processor, **structurer_options).data_df
+    finally:
+        # Releases the PDF and any temporary copy written for OCR
+        pdf_processor.doc.close()
+
+    return [item.dict() for item in pdf_structured]
+
+
+def process_pdf_safe(
+    file_path: str,
+    data: Optional[bytes] = None,
+    processor_options: Optional[dict] = None,
+    structurer_options: Optional[dict] = None,
+    on_row: Optional[Callable[[dict], None]] = None,
+) -> FileResult:
+    """
+    Process one PDF file without raising, so one bad file can't break the pool or a queue worker.
+
+    Args:
+        file_path (str): Path to the PDF file
+        data (bytes, optional): Content of the PDF file
+        processor_options (dict, optional): Keyword arguments for PDFProcessor
+        structurer_options (dict, optional): Keyword arguments for PDFStructurer
+        on_row (Callable[[dict], None], optional): Called with each row as
+                                                   soon as it is extracted
+
+    Returns:
+        FileResult: Extracted rows or error message, with the processing time,
+        its breakdown by stage and the counters recorded
+    """
+    start = time.perf_counter()
+    with record_stages() as stages, record_counts() as counts:
+        try:
+            rows = process_pdf(file_path, processor_options, structurer_options, data=data, on_row=on_row)
+            return FileResult(file_path, rows, None, time.perf_counter() - start, dict(stages), dict(counts))
+        except Exception as e:
+            logger.error("Failed to process %s: %s", file_path, str(e), exc_info=True)
+            error = str(e) or e.__class__.__name__
+            return FileResult(file_path, [], error, time.perf_counter() - start, dict(stages), dict(counts))
+
+
+def pool_processor_options(processor_options: Optional[dict], workers: int) -> dict:
+    """
+    Split the OCR threads between worker processes, unless ocr_workers is set.
+
+    Each process would otherwise start OCR_WORKERS Tesseract threads and keep
+    twice as many page images, so a pool of N processes would oversubscribe
+    the CPUs N times.
+
+    Args:
+        processor_options (dict, optional): Keyword arguments for PDFProcessor
+        workers (int): Number of worker processes
+
+    Returns:
+        dict: The options, with ocr_workers set to the share of each process
+    """
+    options = dict(processor_options or {})
+    if options.get("ocr_workers") is None:
+        options["ocr_workers"] = max(1, OCR_WORKERS // workers)
+    return options
+
+
+def _share(values: Dict[str, float], parts: int, part: int) -> Dict[str, float]:
+    """Split measurements shared by several files evenly, integer counters keeping their total."""
+    shared = {}
+    for name, value in values.items():
+        if isinstance(value, int):
+            share = value // parts + (1 if part < value % parts else 0)
+        else:
+            share = value / parts
+        if share:
+            shared[name] = share
+    return shared
+
+
+def _process_group_safe(
+    file_paths: List[str],
+    contents: List[Optional[bytes]],
+    processor_options: Optional[dict] = None,
+    structurer_options: Optional[dict] = None,
+    on_row: Optional[Callable[[str, dict], None]] = None,
+) -> List[FileResult]:
+    """
+    Worker entry point structuring several files together, never raising.
+
+    Each file is opened on its own, then the short content blocks of all
+    files are packed into shared LLM requests. The time and counters of the
+    shared extraction are split evenly between the files of the group.
+
+    Args:
+        file_paths (List[str]): Paths to the PDF files
+        contents (List[Optional[bytes]]): Content of each PDF file
+        processor_options (dict, optional): Keyword arguments for PDFProcessor
+        structurer_options (dict, optional): Keyword arguments for PDFStructurer
+        on_row (Callable[[str, dict], None], optional): Called with the file
+                                                        path and each row as
+                                                        soon as it is extracted
+
+    Returns:
+        List[FileResult]: Outcome of each file, in input order
+    """
+    results: List[Optional[FileResult]] = [None] * len(file_paths)
+    opened = []
+    for k, (file_path, data) in enumerate(zip(file_paths, contents)):
+        start = time.perf_counter()
+        with record_stages() as stages, record_counts() as counts:
+            try:
+                pdf_processor = PDFProcessor(file_path, data=data, **(processor_options or {}))
+                options = dict(structurer_options or {}, defer=True)
+                if on_row is not None:
+                    options["on_row"] = lambda row, file_path=file_path: on_row(file_path, row.dict())
+                opened.append((k, PDFStructurer(pdf_processor, **options)))
+            except Exception as e:
+                logger.error("Failed to process %s: %s", file_path, str(e), exc_info=True)
+                error = str(e) or e.__class__.__name__
+                results[k] = FileResult(file_path, [], error, time.perf_counter() - start, dict(stages), dict(counts))
+                continue
+        results[k] = FileResult(file_path, [], None, time.perf_counter() - start, dict(stages), dict(counts))
+
+    if opened:
+        start = time.perf_counter()
+        error = None
+        with record_stages() as stages, record_counts() as counts:
+            try:
+                asyncio.run(astructure_batch(
+                    [structurer for _, structurer in opened],
+                    pack=True,
+                    max_tokens=(structurer_options or {}).get("max_tokens"),
+                ))
+            except Exception as e:
+                logger.error("Failed to structure %s: %s", ", ".join(file_paths), str(e), exc_info=True)
+                error = str(e) or e.__class__.__name__
+        seconds = time.perf_counter() - start
+        for part, (k, structurer) in enumerate(opened):
+            result = results[k]
+            file_stages, file_counts = dict(result.stages), dict(result.counts)
+            for name, value in _share(stages, len(opened), part).items():
+                file_stages[name] = file_stages.get(name, 0.0) + value
+            for name, value in _share(counts, len(opened), part).items():
+                file_counts[name] = file_counts.get(name, 0) + value
+            rows = [] if error is not None else [item.dict() for item in structurer.data_df]
+            results[k] = FileResult(
+                result.file_path, rows, error, result.seconds + seconds / len(opened), file_stages, file_counts
+            )
+            structurer.doc.close()
+    return results
+
+
+def iter_process_pdfs(
+    file_paths: List[str],
+    workers: int = 1,
+    processor_options: Optional[dict] = None,
+    structurer_options: Optional[dict] = None,
+    contents: Optional[List[bytes]] = None,
+    ordered: bool = True,
+    on_row: Optional[Callable[[str, dict], None]] = None,
+    pack_files: int = 1,
+) -> Iterator[FileResult]:
+    """
+    Process PDF files, optionally across a pool of worker processes.
+
+    By default results are yielded in the same order as ``file_paths``
+    whatever the number of workers, so the output of a parallel run matches
+    a serial one.
+    Files that have not started yet are cancelled if the caller stops
+    consuming results early.
+
+    Args:
+        file_paths (List[str]): Paths of the PDF files to process
+        workers (int, optional): Number of worker processes. A value of 1
+                                 processes files in the calling process.
+                                 Defaults to 1.
+        processor_options (dict, optional): Keyword arguments for PDFProcessor.
+                                            With worker processes, ocr_workers
+                                            defaults to a share of OCR_WORKERS.
+                                            Defaults to None.
+        structurer_options (dict, optional): Keyword arguments for PDFStructurer.
+                                             Defaults to None.
+        contents (List[bytes], optional): Content of each PDF file, to
+                                          process files from memory. Defaults
+                                          to None.
+        ordered (bool, optional): Yield results in input order rather than
+                                  as soon as each file finishes. Defaults to True.
+        on_row (Callable[[str, dict], None], optional): Called with the file
+                                  path and each row before the file's result
+                                  is yielded. Files processed in the calling
+                                  process pass rows on as soon as they are
+                                  extracted, e.g. while the LLM response is
+                                  streamed, so rows of a file failing later
+                                  may have been passed on. Files processed
+                                  by worker processes pass them on once the
+                                  file is done. Defaults to None.
+        pack_files (int, optional): Structure this many consecutive files
+                                  together, packing their short content
+                                  blocks into shared LLM requests. Rows of
+                                  the files of a group are passed on and
+                                  yielded once the whole group is done.
+                                  Defaults to 1, no packing.
+
+    Yields:
+        FileResult: Extracted rows or error message of each file
+    """
+    worker = partial(
+        process_pdf_safe,
+        processor_options=processor_options,
+        structurer_options=structurer_options,
+    )
+
+    if contents is None:
+        contents = [None] * len(file_paths)
+
+    if pack_files > 1:
+        yield from _iter_process_groups(
+            file_paths, contents, workers, pack_files, processor_options, structurer_options, ordered, on_row
+        )
+        return
+
+    if workers <= 1 or len(file_paths) <= 1:
+        logger.info("Processing %d files serially", len(file_paths))
+        for file_path, data in zip(file_paths, contents):
+            file_on_row = None if on_row is None else partial(on_row, file_path)
+            yield worker(file_path, data, on_row=file_on_row)
+        return
+
+    workers = min(workers, len(file_paths))
+    logger.info("Processing %d files with %d worker processes", len(file_paths), workers)
+    worker = partial(worker, processor_options=pool_processor_options(processor_options, workers))
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        if ordered:
+            results = executor.map(worker, file_paths, contents)
+        else:
+            futures = [executor.submit(worker, file_path, data) for file_path, data in zip(file_paths, contents)]
+            results = (future.result() for future in as_completed(futures))
+        for result in results:
+            if on_row is not None:
+                for row in result.rows:
+                    on_row(result.file_path, row)
+            yield result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _iter_process_groups(
+    file_paths: List[str],
+    contents: List[Optional[bytes]],
+    workers: int,
+    pack_files: int,
+    processor_options: Optional[dict],
+    structurer_options: Optional[dict],
+    ordered: bool,
+    on_row: Optional[Callable[[str, dict], None]],
+) -> Iterator[FileResult]:
+    """Process groups of files packed together, see iter_process_pdfs."""
+    groups = [
+        (file_paths[start:start + pack_files], contents[start:start + pack_files])
+        for start in range(0, len(file_paths), pack_files)
+    ]
+    worker = partial(
+        _process_group_safe,
+        processor_options=processor_options,
+        structurer_options=structurer_options,
+    )
+
+    if workers <= 1 or len(groups) <= 1:
+        logger.info("Processing %d files serially in %d packed groups", len(file_paths), len(groups))
+        for group_paths, group_contents in groups:
+            yield from worker(group_paths, group_contents, on_row=on_row)
+        return
+
+    workers = min(workers, len(groups))
+    logger.info("Processing %d files in %d packed groups with %d worker processes", len(file_paths), len(groups), workers)
+    worker = partial(worker, processor_options=pool_processor_options(processor_options, workers))
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        if ordered:
+            results = executor.map(worker, *zip(*groups))
+        else:
+            futures = [executor.submit(worker, group_paths, group_contents) for group_paths, group_contents in groups]
+            results = (future.result() for future in as_completed(futures))
+        for group_results in results:
+            for result in group_results:
+                if on_row is not None:
+                    for row in result.rows:
+                        on_row(result.file_path, row)
+                yield result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,241 @@
+import logging
+import math
+import os
+import re
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Optional
+
+from src.data_models import DFSchema
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+CHUNK_TOKENS = int(os.getenv("LLM_CHUNK_TOKENS", "6000"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("LLM_CHUNK_OVERLAP_TOKENS", "200"))
+
+# Blank lines, and line breaks followed by a numbered heading such as "3.2 Endpoints"
+BOUNDARY_PATTERN = re.compile(r"\n\s*\n|\n(?=[ \t]*\d+(?:\.\d+)*\.?[ \t]+\S)")
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+class Chunk(NamedTuple):
+    """
+    Text sent to the LLM in one request.
+
+    Attributes:
+        text (str): Content of the chunk
+        tokens (int): Token count of the content
+        blocks (List[int]): Indices of the content blocks packed in the chunk
+        continued (bool): True if the chunk continues a block split over
+            several chunks, and starts with the end of the previous chunk
+    """
+    text: str
+    tokens: int
+    blocks: List[int]
+    continued: bool = False
+
+
+@lru_cache(maxsize=None)
+def _encoding(model_name: Optional[str]):
+    try:
+        import tiktoken
+    except ImportError:
+        logger.info("tiktoken is not installed, approximating token counts")
+        return None
+    try:
+        return tiktoken.encoding_for_model(model_name or "gpt-4o")
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def approximate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text without a tokenizer.
+
+    Words and punctuation marks count for at least one token each, and long
+    words for one token per four characters.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    return sum(math.ceil(len(token) / 4) for token in TOKEN_PATTERN.findall(text))
+
+
+def token_counter(model_name: Optional[str] = None) -> Callable[[str], int]:
+    """
+    Return a function counting tokens with the model's tokenizer.
+
+    Falls back to approximate_tokens when tiktoken is not available.
+
+    Args:
+        model_name (str, optional): Name of the chat model. Defaults to gpt-4o.
+
+    Returns:
+        Callable[[str], int]: Token counting function
+    """
+    encoding = _encoding(model_name)
+    if encoding is None:
+        return approximate_tokens
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def _segments(text: str, max_tokens: int, count: Callable[[str], int]) -> List[str]:
+    """
+    Cut a text on paragraph or heading boundaries, then on lines and words
+    for pieces that are still above the budget.
+    """
+    segments = []
+    for paragraph in BOUNDARY_PATTERN.split(text):
+        if not paragraph.strip():
+            continue
+        if count(paragraph) <= max_tokens:
+            segments.append(paragraph)
+            continue
+        for line in paragraph.split("\n"):
+            if count(line) <= max_tokens:
+                segments.append(line)
+                continue
+            words = line.split()
+            # Last resort for text without any line break
+            step = max(1, max_tokens // 2)
+            segments.extend(" ".join(words[i:i + step]) for i in range(0, len(words), step))
+    return segments
+
+
+def split_block(text: str, max_tokens: int, overlap_tokens: int, count: Callable[[str], int]) -> List[str]:
+    """
+    Split an oversized block into parts within the budget.
+
+    Each part after the first starts with the last segments of the previous
+    part, up to overlap_tokens, so statements cut at a boundary are seen whole.
+
+    Args:
+        text (str): Content of the block
+        max_tokens (int): Token budget of a part
+        overlap_tokens (int): Token budget of the overlap between parts
+        count (Callable[[str], int]): Token counting function
+
+    Returns:
+        List[str]: Parts of the block
+    """
+    parts = []
+    current: List[str] = []
+    current_tokens = 0
+    for segment in _segments(text, max_tokens, count):
+        tokens = count(segment)
+        if current and current_tokens + tokens > max_tokens:
+            parts.append("\n\n".join(current))
+            overlap: List[str] = []
+            overlap_size = 0
+            for previous in reversed(current):
+                size = count(previous)
+                if overlap_size + size > overlap_tokens or overlap_size + size + tokens > max_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += size
+            current, current_tokens = overlap, overlap_size
+        current.append(segment)
+        current_tokens += tokens
+    if current:
+        parts.append("\n\n".join(current))
+    return parts
+
+
+def chunk_blocks(
+    blocks: List[str],
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+    count: Optional[Callable[[str], int]] = None,
+) -> List[Chunk]:
+    """
+    Pack adjacent content blocks into chunks up to a token budget.
+
+    Blocks are packed in order while they fit the budget, and blocks above
+    the budget are split on paragraph or heading boundaries with a small
+    overlap, so no request is truncated and small blocks share a request.
+
+    Args:
+        blocks (List[str]): Content blocks, in document order
+        max_tokens (int, optional): Token budget of a chunk. Defaults to CHUNK_TOKENS.
+        overlap_tokens (int, optional): Token budget of the overlap between the
+                                        parts of a split block. Defaults to
+                                        CHUNK_OVERLAP_TOKENS.
+        count (Callable[[str], int], optional): Token counting function.
+                                                Defaults to token_counter().
+
+    Returns:
+        List[Chunk]: Chunks, in document order
+    """
+    max_tokens = max_tokens or CHUNK_TOKENS
+    overlap_tokens = CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    count = count or token_counter()
+
+    chunks: List[Chunk] = []
+    packed: List[str] = []
+    packed_blocks: List[int] = []
+    packed_tokens = 0
+
+    def flush():
+        nonlocal packed, packed_blocks, packed_tokens
+        if packed:
+            chunks.append(Chunk("\n".join(packed), packed_tokens, packed_blocks))
+        packed, packed_blocks, packed_tokens = [], [], 0
+
+    for i, block in enumerate(blocks):
+        tokens = count(block)
+        if tokens > max_tokens:
+            flush()
+            parts = split_block(block, max_tokens, overlap_tokens, count)
+            logger.info("Split content block %d of %d tokens into %d chunks", i + 1, tokens, len(parts))
+            for j, part in enumerate(parts):
+                chunks.append(Chunk(part, count(part), [i], continued=j > 0))
+            continue
+        if packed and packed_tokens + tokens > max_tokens:
+            flush()
+        packed.append(block)
+        packed_blocks.append(i)
+        packed_tokens += tokens
+    flush()
+
+    logger.info("Packed %d content blocks into %d chunks of at most %d tokens", len(blocks), len(chunks), max_tokens)
+    return chunks
+
+
+def row_key(row: DFSchema) -> str:
+    """Key identifying a row repeated by a chunk overlap: its whitespace- and case-normalised statement."""
+    return " ".join((row.statement_text or "").lower().split())
+
+
+def merge_chunk_rows(chunks: List[Chunk], chunk_rows: List[List[DFSchema]]) -> List[DFSchema]:
+    """
+    Concatenate the rows of each chunk, dropping rows repeated by an overlap.
+
+    A row of a continued chunk is dropped when the previous chunk already
+    produced a row with the same statement text.
+
+    Args:
+        chunks (List[Chunk]): Chunks sent to the LLM
+        chunk_rows (List[List[DFSchema]]): Rows extracted from each chunk
+
+    Returns:
+        List[DFSchema]: Rows of all chunks, in document order
+    """
+    data: List[DFSchema] = []
+    previous_keys: set = set()
+    for chunk, rows in zip(chunks, chunk_rows):
+        kept = [row for row in rows if not (chunk.continued and row_key(row) in previous_keys)]
+        if len(kept) < len(rows):
+            logger.debug("Dropped %d rows repeated by the chunk overlap", len(rows) - len(kept))
+        data.extend(kept)
+        previous_keys = {row_key(row) for row in rows}
+    return data
@@ -0,0 +1,254 @@
+import json
+import logging
+import os
+import time
+from functools import lru_cache
+from typing import Iterator, List, Optional
+
+from src.data_models import DFSchema
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+CLASSIFIER_PATHS = [path for path in os.getenv("SECTION_CLASSIFIER_PATHS", "").split(",") if path]
+CLASSIFIER_MODE = os.getenv("SECTION_CLASSIFIER_MODE", "fill")
+CLASSIFIER_QUANTIZE = os.getenv("SECTION_CLASSIFIER_QUANTIZE", "false").lower() in ("1", "true", "yes")
+CLASSIFIER_MODES = ("fill", "override")
+CLASSIFIER_FIELDS = ("section_level_1", "section_level_2")
+
+MODEL_FILE = "model.pt"
+LABELS_FILE = "labels.json"
+
+
+def _build_model(bert_model, labels_n: int):
+    import torch.nn as nn
+
+    class FineTuneBert(nn.Module):
+        """Same architecture as the model fine-tuned in notebooks/training.ipynb."""
+
+        def __init__(self):
+            super(FineTuneBert, self).__init__()
+            self.bert_model = bert_model
+            self.classifier = nn.Linear(self.bert_model.config.hidden_size, labels_n)
+            self.dropout = nn.Dropout(p=0.3)
+
+        def forward(self, input_ids, attention_mask):
+            outputs = self.bert_model(input_ids=input_ids, attention_mask=attention_mask)
+            pooled_output = outputs.last_hidden_state[:, 0, :]  # 0 stands for the CLS token
+            dropout_output = self.dropout(pooled_output)
+            return self.classifier(dropout_output)
+
+    return FineTuneBert()
+
+
+def save_classifier(model, tokenizer, labels: List[str], field: str, model_dir: str):
+    """
+    Save a classifier trained in notebooks/training.ipynb so it can be loaded here.
+
+    Args:
+        model: Trained FineTuneBert model
+        tokenizer: Tokenizer used for training
+        labels (List[str]): Label names, indexed like the model outputs
+        field (str): DFSchema field the classifier predicts, e.g. "section_level_2"
+        model_dir (str): Folder to write the classifier to
+    """
+    import torch
+
+    os.makedirs(model_dir, exist_ok=True)
+    torch.save(model.state_dict(), os.path.join(model_dir, MODEL_FILE))
+    model.bert_model.config.save_pretrained(model_dir)
+    tokenizer.save_pretrained(model_dir)
+    with open(os.path.join(model_dir, LABELS_FILE), "w", encoding="utf-8") as f:
+        json.dump({"field": field, "labels": list(labels)}, f)
+
+
+class SectionClassifier:
+    """
+    A local CPU classifier assigning a section label to statement texts.
+
+    Statements are sorted by length and grouped into batches that are padded
+    to their longest item only, so a few forward passes label a whole batch
+    of documents.
+
+    Attributes:
+        model_dir (str): Folder the classifier was loaded from
+        field (str): DFSchema field the classifier predicts
+        labels (List[str]): Label names, indexed like the model outputs
+        batch_size (int): Maximum number of statements per forward pass
+        max_tokens (int): Maximum number of padded tokens per forward pass
+        max_length (int): Maximum number of tokens kept per statement
+        throughput (float): Statements per second of the last predict call
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        quantize: bool = False,
+        batch_size: int = 64,
+        max_tokens: int = 8192,
+        max_length: int = 512,
+        num_threads: Optional[int] = None,
+    ):
+        """
+        Load a classifier saved with save_classifier.
+
+        Args:
+            model_dir (str): Folder holding the classifier
+            quantize (bool, optional): Apply dynamic int8 quantization to the
+                                       linear layers. Defaults to False.
+            batch_size (int, optional): Maximum statements per forward pass.
+                                        Defaults to 64.
+            max_tokens (int, optional): Maximum padded tokens per forward pass.
+                                        Defaults to 8192.
+            max_length (int, optional): Maximum tokens kept per statement.
+                                        Defaults to 512.
+            num_threads (int, optional): Number of CPU threads used by torch.
+                                         Defaults to torch's own setting.
+
+        Raises:
+            ImportError: If torch or transformers are not installed
+        """
+        try:
+            import torch
+            from transformers import BertConfig, BertModel, BertTokenizerFast
+        except ImportError as e:
+            raise ImportError("The section classifier requires torch and transformers") from e
+
+        logger.info("Loading section classifier from %s", model_dir)
+        self._torch = torch
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+        with open(os.path.join(model_dir, LABELS_FILE), encoding="utf-8") as f:
+            metadata = json.load(f)
+        self.model_dir = model_dir
+        self.field = metadata["field"]
+        self.labels = metadata["labels"]
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.max_length = max_length
+        self.throughput = 0.0
+
+        if self.field not in CLASSIFIER_FIELDS:
+            raise ValueError(f"Unsupported classifier field '{self.field}', expected one of {CLASSIFIER_FIELDS}")
+
+        self.tokenizer = BertTokenizerFast.from_pretrained(model_dir)
+        model = _build_model(BertModel(BertConfig.from_pretrained(model_dir)), len(self.labels))
+        model.load_state_dict(torch.load(os.path.join(model_dir, MODEL_FILE), map_location="cpu"))
+        model.eval()
+        if quantize:
+            logger.info("Applying dynamic quantization to the section classifier")
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+
+    def _batches(self, lengths: List[int]) -> Iterator[List[int]]:
+        """
+        Group statement indices, shortest first, within the batch size and token budget.
+        """
+        batch: List[int] = []
+        longest = 0
+        for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+            longest_with_item = max(longest, lengths[index])
+            if batch and (len(batch) >= self.batch_size or longest_with_item * (len(batch) + 1) > self.max_tokens):
+                yield batch
+                batch, longest_with_item = [], lengths[index]
+            batch.append(index)
+            longest = longest_with_item
+        if batch:
+            yield batch
+
+    def predict(self, texts: List[str]) -> List[str]:
+        """
+        Label statement texts.
+
+        Args:
+            texts (List[str]): Statement texts
+
+        Returns:
+            List[str]: One label per text, in input order
+        """
+        if not texts:
+            return []
+
+        start = time.perf_counter()
+        encodings = self.tokenizer(texts, add_special_tokens=True, truncation=True, max_length=self.max_length)
+        lengths = [len(ids) for ids in encodings["input_ids"]]
+        predictions: List[Optional[str]] = [None] * len(texts)
+        passes = 0
+
+        with self._torch.inference_mode():
+            for batch in self._batches(lengths):
+                inputs = self.tokenizer.pad(
+                    {"input_ids": [encodings["input_ids"][i] for i in batch]},
+                    padding="longest",
+                    return_tensors="pt",
+                )
+                logits = self.model(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"])
+                for i, label_index in zip(batch, logits.argmax(dim=-1).tolist()):
+                    predictions[i] = self.labels[label_index]
+                passes += 1
+
+        elapsed = time.perf_counter() - start
+        self.throughput = len(texts) / elapsed if elapsed > 0 else float("inf")
+        logger.info(
+            "Classified %d statements for %s in %.2fs with %d forward passes (%.1f statements/s)",
+            len(texts), self.field, elapsed, passes, self.throughput
+        )
+        return predictions
+
+
+@lru_cache(maxsize=None)
+def load_classifier(model_dir: str, quantize: bool = CLASSIFIER_QUANTIZE) -> SectionClassifier:
+    """
+    Load a classifier once per process.
+
+    Args:
+        model_dir (str): Folder holding the classifier
+        quantize (bool, optional): Apply dynamic quantization. Defaults to
+                                   the SECTION_CLASSIFIER_QUANTIZE setting.
+
+    Returns:
+        SectionClassifier: The loaded classifier
+    """
+    return SectionClassifier(model_dir, quantize=quantize)
+
+
+def classify_rows(rows: List[DFSchema], classifiers: List[SectionClassifier], mode: str = "fill") -> List[DFSchema]:
+    """
+    Fill or override the section labels of rows with local classifiers.
+
+    Each classifier labels all statements of the rows in a few batched
+    forward passes.
+
+    Args:
+        rows (List[DFSchema]): Rows extracted by the LLM
+        classifiers (List[SectionClassifier]): Classifiers to apply
+        mode (str, optional): "fill" only sets missing labels, "override"
+                              replaces the labels returned by the LLM.
+                              Defaults to "fill".
+
+    Returns:
+        List[DFSchema]: The same rows, updated in place
+
+    Raises:
+        ValueError: If the mode is not one of CLASSIFIER_MODES
+    """
+    if mode not in CLASSIFIER_MODES:
+        raise ValueError(f"Unknown classifier mode '{mode}', expected one of {CLASSIFIER_MODES}")
+
+    for classifier in classifiers:
+        targets = [
+            row for row in rows
+            if row.statement_text and (mode == "override" or not getattr(row, classifier.field))
+        ]
+        labels = classifier.predict([row.statement_text for row in targets])
+        for row, label in zip(targets, labels):
+            setattr(row, classifier.field, label)
+    return rows
@@ -16,4 +16,10 @@ class LLMSchema(BaseModel):
     outcome_measure: str
 
 class LLMOutput(BaseModel):
-    data: list[LLMSchema]
\ No newline at end of file
+    data: list[LLMSchema]
+
+class PackedLLMSchema(LLMSchema):
+    block_id: str
+
+class PackedLLMOutput(BaseModel):
+    data: list[PackedLLMSchema]
@@ -0,0 +1,361 @@
+import logging
+import os
+import tempfile
+import weakref
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.ocr import OCR_WORKERS, ocr_page_text, ocr_pages
+from src.timing import count, stage
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    import pymupdf
+
+    from src.text_store import TextStore
+
+
+class Document:
+    """
+    A lightweight view of a PDF as per-page text plus an outline.
+
+    Page text is extracted lazily and cached, so every page is extracted at
+    most once, and the outline is read only once. Subclasses provide the
+    actual extraction for native and scanned PDFs.
+
+    Attributes:
+        page_count (int): Number of pages in the document
+        texts (Dict[int, str]): Extracted text keyed by 1-based page number
+        scanned (bool): True if the page text comes from OCR
+    """
+
+    scanned = False
+
+    def __init__(self, page_count: int):
+        """
+        Initialize the document without extracting any page.
+
+        Args:
+            page_count (int): Number of pages in the document
+        """
+        self.page_count = page_count
+        self.texts: Dict[int, str] = {}
+        self._outline: Optional[list] = None
+
+    def __len__(self) -> int:
+        return self.page_count
+
+    def _extract_text(self, page_number: int) -> str:
+        raise NotImplementedError
+
+    def _read_outline(self) -> list:
+        return []
+
+    @property
+    def outline(self) -> list:
+        """
+        Embedded outline as [level, title, page] entries, empty if there is none.
+        """
+        if self._outline is None:
+            self._outline = self._read_outline()
+        return self._outline
+
+    def page_text(self, page_number: int) -> str:
+        """
+        Return the text of a page, extracting it on first access.
+
+        Args:
+            page_number (int): 1-based number of the page
+
+        Returns:
+            str: Text of the page
+
+        Raises:
+            IndexError: If the page is out of range
+        """
+        if not 1 <= page_number <= self.page_count:
+            raise IndexError(f"page {page_number} not in document")
+        if page_number not in self.texts:
+            self.texts[page_number] = self._extract_text(page_number)
+        return self.texts[page_number]
+
+    def prefetch(self, page_numbers: Iterable[int]):
+        """
+        Extract the given pages ahead of time.
+
+        Args:
+            page_numbers (Iterable[int]): 1-based numbers of the pages
+        """
+        for page_number in page_numbers:
+            if 1 <= page_number <= self.page_count:
+                self.page_text(page_number)
+
+    def close(self):
+        """
+        Release resources held by the document.
+        """
+
+
+class PyMuPDFDocument(Document):
+    """
+    A native PDF whose embedded text and outline are read with pymupdf.
+
+    Attributes:
+        doc (pymupdf.Document): Underlying pymupdf document
+    """
+
+    def __init__(self, doc: "pymupdf.Document"):
+        """
+        Initialize the document from an open pymupdf document.
+
+        Args:
+            doc (pymupdf.Document): Open pymupdf document
+        """
+        super().__init__(doc.page_count)
+        self.doc = doc
+
+    def _extract_text(self, page_number: int) -> str:
+        return self.doc.load_page(page_number - 1).get_text()
+
+    def _read_outline(self) -> list:
+        return self.doc.get_toc()
+
+    def close(self):
+        self.doc.close()
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class OCRDocument(Document):
+    """
+    A scanned PDF whose pages are recognised with Tesseract when needed.
+
+    Attributes:
+        pdf_path (str): Path to the PDF file
+        data (bytes, optional): Content of the PDF file, used instead of
+            reading pdf_path when given
+        ocr_workers (int): Number of threads used for OCR
+        adaptive (bool, optional): Whether pages recognised with a low
+            confidence are rendered again at higher resolutions, None for
+            the OCR_ADAPTIVE setting
+        ocr_quality (Dict[int, Tuple[int, Optional[float]]]): Resolution and
+            Tesseract confidence of each recognised page
+    """
+
+    scanned = True
+
+    def __init__(
+        self,
+        pdf_path: str,
+        page_count: int,
+        ocr_workers: Optional[int] = None,
+        data: Optional[bytes] = None,
+        adaptive: Optional[bool] = None,
+    ):
+        """
+        Initialize the document without recognising any page.
+
+        Args:
+            pdf_path (str): Path to the PDF file
+            page_count (int): Number of pages in the PDF file
+            ocr_workers (int, optional): Number of threads used for OCR.
+                                         Defaults to OCR_WORKERS.
+            data (bytes, optional): Content of the PDF file. Defaults to None.
+            adaptive (bool, optional): Re-render pages recognised with a low
+                                       confidence. Defaults to OCR_ADAPTIVE.
+        """
+        super().__init__(page_count)
+        self.pdf_path = pdf_path
+        self.data = data
+        self.ocr_workers = ocr_workers or OCR_WORKERS
+        self.adaptive = adaptive
+        self.ocr_quality: Dict[int, Tuple[int, Optional[float]]] = {}
+        self._spooled: Optional[weakref.finalize] = None
+        self._spooled_path: Optional[str] = None
+
+    def ocr(self, page_numbers: Iterable[int], lookahead: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """
+        Recognise pages that were not recognised yet, in parallel.
+
+        Args:
+            page_numbers (Iterable[int]): 1-based numbers of the pages
+            lookahead (int, optional): Number of pages recognised ahead of
+                                       the caller, see ocr_pages. Defaults to None.
+
+        Yields:
+            Tuple[int, str]: Page number and text of each newly recognised page
+        """
+        missing = [n for n in page_numbers if 1 <= n <= self.page_count and n not in self.texts]
+        if not missing:
+            return
+        pages = ocr_pages(self.source_path(), missing, workers=self.ocr_workers, adaptive=self.adaptive, lookahead=lookahead)
+        while True:
+            with stage("ocr"):
+                page = next(pages, None)
+            if page is None:
+                break
+            count("ocr_pages")
+            count("ocr_renders", page.renders)
+            logger.debug(
+                "Processed page %d with OCR at %d dpi (confidence %s)",
+                page.page_number, page.dpi, "n/a" if page.confidence is None else f"{page.confidence:.0f}"
+            )
+            self.ocr_quality[page.page_number] = (page.dpi, page.confidence)
+            self.texts[page.page_number] = ocr_page_text(page.page_number, page.text)
+            yield page.page_number, self.texts[page.page_number]
+
+    def source_path(self) -> str:
+        """
+        Path of the PDF file to render pages from.
+
+        Content given in memory is written to a temporary file on first use,
+        removed when the document is closed, as pdf2image would otherwise
+        write a copy of the whole PDF for every page it renders.
+
+        Returns:
+            str: Path to the PDF file
+        """
+        if self.data is None:
+            return self.pdf_path
+        if self._spooled is None:
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spooled:
+                spooled.write(self.data)
+            logger.debug("Wrote %s to %s for OCR", self.pdf_path, spooled.name)
+            self._spooled = weakref.finalize(self, _remove_file, spooled.name)
+            self._spooled_path = spooled.name
+        return self._spooled_path
+
+    def prefetch(self, page_numbers: Iterable[int]):
+        for _ in self.ocr(sorted(set(page_numbers))):
+            pass
+
+    def _extract_text(self, page_number: int) -> str:
+        self.prefetch([page_number])
+        return self.texts[page_number]
+
+    def close(self):
+        if self._spooled is not None:
+            self._spooled()
+
+    @property
+    def recognised_pages(self) -> List[int]:
+        """
+        Numbers of the pages recognised so far.
+        """
+        return sorted(self.texts)
+
+
+class StoredDocument(Document):
+    """
+    A document whose page text and outline are read from a TextStore.
+
+    Pages missing from the store are extracted from the PDF, opened only
+    when such a page is first needed, and added to the store.
+
+    Attributes:
+        store (TextStore): Store holding the page text
+        key (str): Key of the document in the store
+        scanned (bool): True if the page text comes from OCR
+    """
+
+    def __init__(
+        self,
+        store: "TextStore",
+        key: str,
+        page_count: int,
+        outline: list,
+        scanned: bool,
+        source: Optional[Document] = None,
+        open_source: Optional[Callable[[], Document]] = None,
+    ):
+        """
+        Initialize the document without reading any page.
+
+        Args:
+            store (TextStore): Store holding the page text
+            key (str): Key of the document in the store
+            page_count (int): Number of pages
+            outline (list): Embedded outline
+            scanned (bool): True if the page text comes from OCR
+            source (Document, optional): Open document to extract missing
+                                         pages from. Pages it already
+                                         extracted are stored. Defaults to None.
+            open_source (Callable[[], Document], optional): Opens the document
+                                         to extract missing pages from, when
+                                         source is not given. Defaults to None.
+        """
+        super().__init__(page_count)
+        self.store = store
+        self.key = key
+        self.scanned = scanned
+        self._outline = outline
+        self._source = source
+        self._open_source = open_source
+        if source is not None and source.texts:
+            self.texts.update(source.texts)
+            store.put_pages(key, source.texts, quality=getattr(source, "ocr_quality", None))
+
+    @property
+    def source(self) -> Document:
+        """
+        Document the missing pages are extracted from, opened on first access.
+        """
+        if self._source is None:
+            logger.info("Opening the PDF to extract pages missing from the text store")
+            self._source = self._open_source()
+        return self._source
+
+    def _extract(self, page_numbers: List[int], lookahead: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        if isinstance(self.source, OCRDocument):
+            yield from self.source.ocr(page_numbers, lookahead=lookahead)
+        else:
+            for page_number in page_numbers:
+                yield page_number, self.source.page_text(page_number)
+
+    def ocr(self, page_numbers: Iterable[int], lookahead: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """
+        Read pages in order from the store, recognising the missing ones in parallel.
+
+        Args:
+            page_numbers (Iterable[int]): 1-based numbers of the pages
+            lookahead (int, optional): Number of pages recognised ahead of
+                                       the caller, see ocr_pages. Defaults to None.
+
+        Yields:
+            Tuple[int, str]: Page number and text of each page
+        """
+        page_numbers = [n for n in page_numbers if 1 <= n <= self.page_count]
+        self.texts.update(self.store.pages(self.key, [n for n in page_numbers if n not in self.texts]))
+        missing = [n for n in page_numbers if n not in self.texts]
+        extracted = self._extract(missing, lookahead) if missing else iter(())
+        for page_number in page_numbers:
+            if page_number not in self.texts:
+                _, text = next(extracted)
+                self.texts[page_number] = text
+                self.store.put_pages(self.key, {page_number: text}, quality=getattr(self.source, "ocr_quality", None))
+            yield page_number, self.texts[page_number]
+
+    def prefetch(self, page_numbers: Iterable[int]):
+        for _ in self.ocr(sorted(set(page_numbers))):
+            pass
+
+    def _extract_text(self, page_number: int) -> str:
+        self.prefetch([page_number])
+        return self.texts[page_number]
+
+    def close(self):
+        if self._source is not None:
+            self._source.close()
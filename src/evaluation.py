@@ -0,0 +1,402 @@
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+EVAL_FIELDS = ("section_level_1", "section_level_2", "outcome_measure")
+EVAL_MATCH_THRESHOLD = float(os.getenv("EVAL_MATCH_THRESHOLD", "0.8"))
+NGRAM_SIZE = 3
+
+# Gold files label the outcome measure "outcome measure", as in notebooks/data.csv
+COLUMN_ALIASES = {"outcome measure": "outcome_measure"}
+
+
+def load_rows(path: str) -> "pd.DataFrame":
+    """
+    Read gold or predicted rows from a CSV, NDJSON or Parquet file.
+
+    Args:
+        path (str): Path to the file, its format given by the extension
+
+    Returns:
+        pd.DataFrame: Rows with the DFSchema column names
+    """
+    import pandas as pd
+
+    if path.endswith(".ndjson") or path.endswith(".jsonl"):
+        rows = pd.read_json(path, lines=True)
+    elif path.endswith(".parquet"):
+        rows = pd.read_parquet(path)
+    else:
+        rows = pd.read_csv(path)
+    return rows.rename(columns=COLUMN_ALIASES)
+
+
+def normalise_text(values: "pd.Series") -> "pd.Series":
+    """
+    Normalise statement texts or labels for comparison, on the whole column at once.
+
+    Lowercases, unifies quotes and dashes, drops double quotes, collapses
+    whitespace and strips a final period, so statements extracted with
+    different punctuation or line breaks compare equal.
+
+    Args:
+        values (pd.Series): Texts, missing values allowed
+
+    Returns:
+        pd.Series: Normalised texts, empty for missing values
+    """
+    return (
+        values.fillna("").astype(str).str.lower()
+        .str.replace(r"[‘’′]", "'", regex=True)
+        .str.replace(r"[\"“”]", "", regex=True)
+        .str.replace(r"[‐-―−]", "-", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+        .str.replace(r"\s*\.$", "", regex=True)
+    )
+
+
+def document_names(values: "pd.Series") -> "pd.Series":
+    """
+    Reduce document names to the file name without folder nor extension.
+
+    Args:
+        values (pd.Series): Names such as "input\\Prot_000" or "Prot_000.pdf"
+
+    Returns:
+        pd.Series: Names such as "Prot_000"
+    """
+    return (
+        values.fillna("").astype(str)
+        .str.replace("\\", "/", regex=False)
+        .str.split("/").str[-1]
+        .str.replace(r"\.pdf$", "", regex=True, case=False)
+    )
+
+
+def ngram_vectors(texts: Sequence[str], vocabulary: Dict[str, int]) -> "np.ndarray":
+    """
+    Count the character n-grams of texts, L2-normalised, growing the vocabulary as needed.
+
+    Args:
+        texts (Sequence[str]): Normalised texts
+        vocabulary (Dict[str, int]): Column of each n-gram, shared by the
+                                     texts being compared
+
+    Returns:
+        np.ndarray: One row per text
+    """
+    import numpy as np
+
+    rows, columns = [], []
+    for row, text in enumerate(texts):
+        padded = f" {text} "
+        for start in range(max(1, len(padded) - NGRAM_SIZE + 1)):
+            rows.append(row)
+            columns.append(vocabulary.setdefault(padded[start:start + NGRAM_SIZE], len(vocabulary)))
+    vectors = np.zeros((len(texts), max(1, len(vocabulary))))
+    np.add.at(vectors, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), 1.0)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def similarity_matrix(gold_texts: Sequence[str], predicted_texts: Sequence[str]) -> "np.ndarray":
+    """
+    Cosine similarity of the character trigrams of every gold and predicted text.
+
+    Args:
+        gold_texts (Sequence[str]): Normalised gold statements
+        predicted_texts (Sequence[str]): Normalised predicted statements
+
+    Returns:
+        np.ndarray: Similarities, one row per gold text
+    """
+    vocabulary: Dict[str, int] = {}
+    gold = ngram_vectors(gold_texts, vocabulary)
+    predicted = ngram_vectors(predicted_texts, vocabulary)
+    # The gold vectors were built before the vocabulary was complete
+    gold = gold if gold.shape[1] == predicted.shape[1] else _pad_columns(gold, predicted.shape[1])
+    return gold @ predicted.T
+
+
+def _pad_columns(vectors: "np.ndarray", width: int) -> "np.ndarray":
+    import numpy as np
+
+    return np.pad(vectors, ((0, 0), (0, width - vectors.shape[1])))
+
+
+def align(gold: "pd.DataFrame", predicted: "pd.DataFrame", threshold: float = EVAL_MATCH_THRESHOLD) -> "pd.DataFrame":
+    """
+    Pair gold and predicted statements of the same document by text similarity.
+
+    Within each document, pairs are taken greedily from the most similar
+    down to the threshold, each statement being used at most once, so
+    identical statements are always paired and near matches, e.g. with
+    different punctuation or a few OCR errors, are paired too.
+
+    Args:
+        gold (pd.DataFrame): Gold rows with "document" and "text" columns
+        predicted (pd.DataFrame): Predicted rows with the same columns
+        threshold (float, optional): Lowest similarity of a pair, between 0
+                                     and 1. Defaults to EVAL_MATCH_THRESHOLD.
+
+    Returns:
+        pd.DataFrame: Index of the gold and predicted row and similarity of each pair
+    """
+    import numpy as np
+    import pandas as pd
+
+    pairs = []
+    predicted_groups = predicted.groupby("document").indices
+    for document, gold_positions in gold.groupby("document").indices.items():
+        predicted_positions = predicted_groups.get(document)
+        if predicted_positions is None:
+            continue
+        similarities = similarity_matrix(
+            gold["text"].to_numpy()[gold_positions], predicted["text"].to_numpy()[predicted_positions]
+        )
+        candidates = np.argwhere(similarities >= threshold)
+        order = np.argsort(-similarities[candidates[:, 0], candidates[:, 1]], kind="stable")
+        used_gold, used_predicted = set(), set()
+        for i, j in candidates[order]:
+            if i in used_gold or j in used_predicted:
+                continue
+            used_gold.add(i)
+            used_predicted.add(j)
+            pairs.append((gold.index[gold_positions[i]], predicted.index[predicted_positions[j]], float(similarities[i, j])))
+    return pd.DataFrame(pairs, columns=["gold_index", "predicted_index", "similarity"])
+
+
+def field_scores(y_true: "pd.Series", y_pred: "pd.Series") -> dict:
+    """
+    Accuracy, and macro-averaged precision and recall of a label over aligned pairs.
+
+    Uses the settings of notebooks/evaluation.ipynb, so labels never
+    predicted, or never in the gold rows, count with a precision, or
+    recall, of 1.
+
+    Args:
+        y_true (pd.Series): Gold labels
+        y_pred (pd.Series): Predicted labels, aligned with y_true
+
+    Returns:
+        dict: Accuracy, precision, recall and number of labels compared
+    """
+    from sklearn.metrics import accuracy_score, precision_score, recall_score
+
+    y_true, y_pred = list(y_true), list(y_pred)
+    if not y_true:
+        return {"accuracy": None, "precision": None, "recall": None, "support": 0}
+    return {
+        "accuracy": float(accuracy_score(y_true, y_pred)),
+        "precision": float(precision_score(y_true, y_pred, average="macro", zero_division=1)),
+        "recall": float(recall_score(y_true, y_pred, average="macro", zero_division=1)),
+        "support": len(y_true),
+    }
+
+
+def _prepare(rows: "pd.DataFrame") -> "pd.DataFrame":
+    rows = rows.reset_index(drop=True).copy()
+    rows["document"] = document_names(rows["name"])
+    rows["text"] = normalise_text(rows["statement_text"])
+    for field in EVAL_FIELDS:
+        rows[field] = normalise_text(rows[field]) if field in rows else ""
+    return rows
+
+
+def evaluate(
+    gold: "pd.DataFrame",
+    predicted: "pd.DataFrame",
+    threshold: float = EVAL_MATCH_THRESHOLD,
+    canonical_outcomes: bool = False,
+) -> dict:
+    """
+    Score predicted rows against gold rows.
+
+    Statements are aligned with align. Statement extraction is scored with
+    the aligned pairs as true positives, and each field over the aligned
+    pairs with field_scores.
+
+    Args:
+        gold (pd.DataFrame): Gold rows, e.g. from notebooks/data.csv
+        predicted (pd.DataFrame): Predicted rows, e.g. from output.csv
+        threshold (float, optional): Lowest similarity of aligned statements.
+                                     Defaults to EVAL_MATCH_THRESHOLD.
+        canonical_outcomes (bool, optional): Compare outcome measures by the
+                                     measures they name, mapped with the
+                                     outcome rules dictionary, so that "PFS"
+                                     and "Progression free survival" agree.
+                                     Defaults to False.
+
+    Returns:
+        dict: Statement and per-field scores, with the rows compared
+    """
+    start = time.perf_counter()
+    gold, predicted = _prepare(gold), _prepare(predicted)
+    pairs = align(gold, predicted, threshold)
+
+    true_positives = len(pairs)
+    false_positives = len(predicted) - true_positives
+    false_negatives = len(gold) - true_positives
+    precision = true_positives / len(predicted) if len(predicted) else None
+    recall = true_positives / len(gold) if len(gold) else None
+    report = {
+        "gold_rows": len(gold),
+        "predicted_rows": len(predicted),
+        "threshold": threshold,
+        "statements": {
+            "true_positives": true_positives,
+            "false_positives": false_positives,
+            "false_negatives": false_negatives,
+            "exact_matches": int((
+                gold["text"].to_numpy()[pairs["gold_index"].to_numpy(dtype=int)]
+                == predicted["text"].to_numpy()[pairs["predicted_index"].to_numpy(dtype=int)]
+            ).sum()),
+            "precision": precision,
+            "recall": recall,
+            "f1": 2 * precision * recall / (precision + recall) if precision and recall else 0.0,
+        },
+        "fields": {},
+    }
+
+    gold_pairs = gold.loc[pairs["gold_index"]].reset_index(drop=True)
+    predicted_pairs = predicted.loc[pairs["predicted_index"]].reset_index(drop=True)
+    if canonical_outcomes:
+        from src.outcome_rules import get_outcome_extractor
+
+        extractor = get_outcome_extractor()
+        for rows in (gold_pairs, predicted_pairs):
+            measures = extractor.extract(rows["outcome_measure"])
+            rows["outcome_measure"] = [
+                ", ".join(sorted(found)) if found else value
+                for found, value in zip(measures, rows["outcome_measure"])
+            ]
+    for field in EVAL_FIELDS:
+        report["fields"][field] = field_scores(gold_pairs[field], predicted_pairs[field])
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def run_pipeline(input_folder: str, output_path: str, workers: int = 1, processor_options: Optional[dict] = None, structurer_options: Optional[dict] = None, pack_files: int = 1) -> dict:
+    """
+    Extract the rows of a folder of PDFs to a file, measuring the run.
+
+    Args:
+        input_folder (str): Folder holding the PDF files
+        output_path (str): File to write the rows to, its format given by the extension
+        workers (int, optional): Number of worker processes. Defaults to 1.
+        processor_options (dict, optional): Keyword arguments for PDFProcessor
+        structurer_options (dict, optional): Keyword arguments for PDFStructurer
+        pack_files (int, optional): Files structured together, see iter_process_pdfs.
+                                    Defaults to 1.
+
+    Returns:
+        dict: Documents, rows, failures, throughput, and the seconds per
+        stage and counters summed over the files
+    """
+    from src.batch import iter_process_pdfs
+    from src.output import open_sink
+
+    file_paths = [
+        os.path.join(input_folder, file_name)
+        for file_name in sorted(os.listdir(input_folder))
+        if file_name.lower().endswith(".pdf")
+    ]
+    output_format = os.path.splitext(output_path)[1].lstrip(".").lower() or "csv"
+    folder = os.path.dirname(output_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    rows = failed = 0
+    stages: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    start = time.perf_counter()
+    with open_sink(output_format, output_path) as sink:
+        for result in iter_process_pdfs(
+            file_paths,
+            workers=workers,
+            processor_options=processor_options,
+            structurer_options=structurer_options,
+            pack_files=pack_files,
+        ):
+            sink.write_rows(result.rows)
+            rows += len(result.rows)
+            failed += result.error is not None
+            for name, seconds in (result.stages or {}).items():
+                stages[name] = stages.get(name, 0.0) + seconds
+            for name, value in (result.counts or {}).items():
+                counts[name] = counts.get(name, 0) + value
+    seconds = time.perf_counter() - start
+    return {
+        "docs": len(file_paths),
+        "rows": rows,
+        "failed_docs": failed,
+        "seconds": seconds,
+        "docs_per_second": len(file_paths) / seconds if seconds else None,
+        "rows_per_second": rows / seconds if seconds else None,
+        "stage_seconds": stages,
+        "counts": counts,
+    }
+
+
+def score_values(report: dict) -> Dict[str, float]:
+    """
+    Flatten the quality scores of an evaluation report.
+
+    Args:
+        report (dict): Report of evaluate
+
+    Returns:
+        Dict[str, float]: Scores keyed like "statements.f1" or "fields.outcome_measure.accuracy"
+    """
+    scores = {f"statements.{name}": report["statements"][name] for name in ("precision", "recall", "f1")}
+    for field, field_report in report["fields"].items():
+        for name in ("accuracy", "precision", "recall"):
+            scores[f"fields.{field}.{name}"] = field_report[name]
+    return {name: value for name, value in scores.items() if value is not None}
+
+
+def regressions(report: dict, baseline: dict, tolerance: float = 0.01, max_slowdown: Optional[float] = None) -> List[str]:
+    """
+    List the scores, and the throughput, that dropped compared to a baseline report.
+
+    Args:
+        report (dict): Report of the current run
+        baseline (dict): Report of the reference run
+        tolerance (float, optional): Largest drop of a score tolerated. Defaults to 0.01.
+        max_slowdown (float, optional): Largest relative drop of the docs per
+                                        second tolerated, e.g. 0.2, when both
+                                        reports measured a run. Defaults to None.
+
+    Returns:
+        List[str]: Description of each regression, empty if there is none
+    """
+    found = []
+    current = score_values(report)
+    for name, reference in score_values(baseline).items():
+        value = current.get(name)
+        if value is not None and value < reference - tolerance:
+            found.append(f"{name} dropped from {reference:.4f} to {value:.4f}")
+
+    run, reference_run = report.get("run"), baseline.get("run")
+    if max_slowdown is not None and run and reference_run and reference_run.get("docs_per_second"):
+        if run["docs_per_second"] < reference_run["docs_per_second"] * (1 - max_slowdown):
+            found.append(
+                f"docs_per_second dropped from {reference_run['docs_per_second']:.3f} to {run['docs_per_second']:.3f}"
+            )
+    return found
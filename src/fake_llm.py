@@ -0,0 +1,195 @@
+import asyncio
+import json
+import re
+import time
+from typing import AsyncIterator, Callable, Iterator, Optional, Union
+
+from langchain.schema import AIMessage
+from langchain_core.messages import AIMessageChunk
+
+# Header of each block of a packed prompt
+BLOCK_HEADER_PATTERN = re.compile(r"^### Block (\S+)[ \t]*$", re.MULTILINE)
+
+
+class FakeChatModel:
+    """
+    A local stand-in for the chat model used by ``src.llm``.
+
+    Answers every request with a deterministic ``{"data": [...]}`` payload
+    after a configurable delay, so the extraction pipeline can be exercised
+    and timed without network access. Packed prompts get rows for each of
+    their blocks, tagged with the block id.
+
+    Attributes:
+        latency (Union[float, Callable[[str], float]]): Seconds to wait before
+            answering each request, or a function of the prompt returning them
+        rows (int): Number of rows returned per request
+        responder (Callable[[str], str], optional): Custom function building
+            the response content from the prompt
+        chunk_size (int): Characters per piece of a streamed response, the
+            latency being spread evenly over the pieces
+        model_name (str): Model name used in LLM cache keys
+        temperature (float): Sampling temperature used in LLM cache keys
+        calls (int): Number of requests served so far
+        in_flight (int): Number of requests currently being served
+        max_in_flight (int): Highest number of concurrent requests observed
+    """
+
+    model_name = "fake-chat-model"
+    temperature = 0.0
+
+    def __init__(
+        self,
+        latency: Union[float, Callable[[str], float]] = 0.0,
+        rows: int = 1,
+        responder: Optional[Callable[[str], str]] = None,
+        chunk_size: int = 16,
+    ):
+        """
+        Initialize the fake chat model.
+
+        Args:
+            latency (Union[float, Callable[[str], float]], optional): Seconds to
+                wait per request. Defaults to 0.0.
+            rows (int, optional): Rows returned per request. Defaults to 1.
+            responder (Callable[[str], str], optional): Custom response builder.
+                                                        Defaults to None.
+            chunk_size (int, optional): Characters per streamed piece. Defaults to 16.
+        """
+        self.latency = latency
+        self.rows = rows
+        self.responder = responder
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def respond(self, prompt: str) -> str:
+        """
+        Build the response content for a prompt.
+
+        Args:
+            prompt (str): Rendered prompt sent by the caller
+
+        Returns:
+            str: Response content, wrapped in a markdown json fence like gpt-4o does
+        """
+        if self.responder is not None:
+            return self.responder(prompt)
+
+        text = prompt.split("Text:", 1)[-1].strip()
+        headers = list(BLOCK_HEADER_PATTERN.finditer(text))
+        if not headers:
+            return self._answer([(None, text)])
+        blocks = [
+            (header.group(1), text[header.end():headers[k + 1].start() if k + 1 < len(headers) else len(text)].strip())
+            for k, header in enumerate(headers)
+        ]
+        return self._answer(blocks)
+
+    def _answer(self, blocks: list) -> str:
+        data = []
+        for block_id, text in blocks:
+            first_line = text.splitlines()[0] if text else ""
+            for i in range(self.rows):
+                row = {
+                    "statement_text": f"{first_line} ({i + 1})",
+                    "section_level_1": "primary-objective",
+                    "section_level_2": "efficacy-objective",
+                    "outcome_measure": "PFS",
+                }
+                if block_id is not None:
+                    row["block_id"] = block_id
+                data.append(row)
+        return "```json\n" + json.dumps({"data": data}) + "\n```"
+
+    def delay(self, prompt: str) -> float:
+        """Return the number of seconds to wait before answering a prompt."""
+        return self.latency(prompt) if callable(self.latency) else self.latency
+
+    def _start(self):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def invoke(self, messages: list) -> AIMessage:
+        """
+        Answer a request synchronously.
+
+        Args:
+            messages (list): Chat messages, the last one holding the prompt
+
+        Returns:
+            AIMessage: Fake model response
+        """
+        self._start()
+        try:
+            prompt = messages[-1].content
+            time.sleep(self.delay(prompt))
+            return AIMessage(content=self.respond(prompt))
+        finally:
+            self.in_flight -= 1
+
+    async def ainvoke(self, messages: list) -> AIMessage:
+        """
+        Answer a request asynchronously.
+
+        Args:
+            messages (list): Chat messages, the last one holding the prompt
+
+        Returns:
+            AIMessage: Fake model response
+        """
+        self._start()
+        try:
+            prompt = messages[-1].content
+            await asyncio.sleep(self.delay(prompt))
+            return AIMessage(content=self.respond(prompt))
+        finally:
+            self.in_flight -= 1
+
+    def _pieces(self, prompt: str) -> list:
+        content = self.respond(prompt)
+        return [content[i:i + self.chunk_size] for i in range(0, len(content), self.chunk_size)]
+
+    def stream(self, messages: list) -> Iterator[AIMessageChunk]:
+        """
+        Stream the answer to a request synchronously.
+
+        Args:
+            messages (list): Chat messages, the last one holding the prompt
+
+        Yields:
+            AIMessageChunk: Consecutive pieces of the fake model response
+        """
+        self._start()
+        try:
+            prompt = messages[-1].content
+            pieces = self._pieces(prompt)
+            delay = self.delay(prompt) / max(1, len(pieces))
+            for piece in pieces:
+                time.sleep(delay)
+                yield AIMessageChunk(content=piece)
+        finally:
+            self.in_flight -= 1
+
+    async def astream(self, messages: list) -> AsyncIterator[AIMessageChunk]:
+        """
+        Stream the answer to a request asynchronously.
+
+        Args:
+            messages (list): Chat messages, the last one holding the prompt
+
+        Yields:
+            AIMessageChunk: Consecutive pieces of the fake model response
+        """
+        self._start()
+        try:
+            prompt = messages[-1].content
+            pieces = self._pieces(prompt)
+            delay = self.delay(prompt) / max(1, len(pieces))
+            for piece in pieces:
+                await asyncio.sleep(delay)
+                yield AIMessageChunk(content=piece)
+        finally:
+            self.in_flight -= 1
@@ -16,4 +16,75 @@ def matching_toc(text: str) -> list:
                 result = [match[0], match[2], int(match[3])]
                 matches_list.append(result)
 
-        return matches_list
\ No newline at end of file
+        return matches_list
+
+def toc_level(entry: list) -> int:
+        """
+        Level of a TOC entry, from the outline level or the dotted numbering.
+
+        Args:
+                entry (list): [level, title, page] outline entry or
+                        [numbering, title, page] entry from matching_toc
+
+        Returns:
+                int: 1 for top-level headings, 2 for their children, etc.
+        """
+        if isinstance(entry[0], int):
+                return entry[0]
+        return len([part for part in str(entry[0]).split(".") if part])
+
+
+def section_spans(toc: list) -> list:
+        """
+        Find the objective/endpoint sections and the heading ending each of them.
+
+        A section ends at the next entry of the same or a higher level. Matching
+        entries nested in a matching section are covered by their parent.
+
+        Args:
+                toc (list): Table of contents entries
+
+        Returns:
+                list: (entry, end_entry) pairs, end_entry is None for the last section
+        """
+        spans = []
+        parent_level = None
+        for i, entry in enumerate(toc):
+                level = toc_level(entry)
+                if parent_level is not None and level > parent_level:
+                        continue
+                parent_level = None
+                if not matching_section(entry[1]):
+                        continue
+                parent_level = level
+                end_entry = next((e for e in toc[i + 1:] if toc_level(e) <= level), None)
+                spans.append((entry, end_entry))
+
+        return spans
+
+
+def heading_position(text: str, entry: list, start: int = 0):
+        """
+        Find where the heading of a TOC entry starts in a page text.
+
+        Headings at the start of a line are preferred over mentions in the text.
+
+        Args:
+                text (str): Page text
+                entry (list): TOC entry of the heading
+                start (int, optional): Offset to search from. Defaults to 0.
+
+        Returns:
+                Optional[int]: Offset of the heading, None if it was not found
+        """
+        heading = entry[1] if isinstance(entry[0], int) else f"{entry[0]} {entry[1]}"
+        words = re.findall(r"[^\s.]+", heading)
+        if not words:
+                return None
+        # Line breaks and dots of the numbering may differ between the TOC and the page
+        title = r"[\s.]+".join(re.escape(word) for word in words)
+        for pattern in (r"^[ \t]*" + title, title):
+                match = re.compile(pattern, re.IGNORECASE | re.MULTILINE).search(text, start)
+                if match:
+                        return match.start()
+        return None
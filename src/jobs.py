@@ -0,0 +1,243 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from src.batch import iter_process_pdfs
+from src.metrics import metrics, observe_result
+from src.output import open_sink
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "100"))
+
+
+class FileProgress:
+    """
+    Progress of one PDF file within a job.
+
+    Attributes:
+        file (str): Name of the PDF file
+        status (str): One of "pending", "done", "failed" or "cancelled"
+        rows (int): Number of extracted rows
+        seconds (float, optional): Processing time
+        stages (Dict[str, float]): Seconds spent in each pipeline stage
+        error (str, optional): Error message if processing failed
+    """
+
+    def __init__(self, file: str):
+        self.file = file
+        self.status = "pending"
+        self.rows = 0
+        self.seconds: Optional[float] = None
+        self.stages: Dict[str, float] = {}
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "file": self.file,
+            "status": self.status,
+            "rows": self.rows,
+            "seconds": self.seconds,
+            "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            "error": self.error,
+        }
+
+
+class Job:
+    """
+    A batch extraction job over the PDF files of a folder.
+
+    Attributes:
+        id (str): Job identifier
+        file_paths (List[str]): Paths of the PDF files to process
+        options (dict): Keyword arguments for iter_process_pdfs
+        status (str): One of "queued", "running", "completed", "failed" or "cancelled"
+        files (Dict[str, FileProgress]): Progress keyed by file path
+        output_file (str): Path of the result file
+        output_format (str): Format of the result file
+        error (str, optional): Error message if the job failed
+        created_at (float): Submission time
+        started_at (float, optional): Start time
+        finished_at (float, optional): End time
+    """
+
+    def __init__(self, file_paths: List[str], output_file: str, options: Optional[dict] = None, output_format: str = "csv"):
+        self.id = uuid.uuid4().hex
+        self.file_paths = file_paths
+        self.options = options or {}
+        self.status = "queued"
+        self.files: Dict[str, FileProgress] = {
+            file_path: FileProgress(os.path.basename(file_path)) for file_path in file_paths
+        }
+        self.output_file = output_file
+        self.output_format = output_format
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def to_dict(self) -> dict:
+        """
+        Summarise the job state for status responses.
+
+        Returns:
+            dict: Job status, counters, timings and per-file progress
+        """
+        files = list(self.files.values())
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total_files": len(files),
+            "processed_files": sum(f.status == "done" for f in files),
+            "failed_files": sum(f.status == "failed" for f in files),
+            "pending_files": sum(f.status == "pending" for f in files),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": None if self.started_at is None else end - self.started_at,
+            "error": self.error,
+            "files": [f.to_dict() for f in files],
+        }
+
+
+class JobManager:
+    """
+    Runs extraction jobs in the background on a bounded pool of threads.
+
+    Attributes:
+        output_folder (str): Folder where job results are written
+        jobs (Dict[str, Job]): Known jobs keyed by id, oldest first
+    """
+
+    def __init__(self, output_folder: str = os.path.join("output", "jobs"), max_jobs: int = JOB_WORKERS):
+        """
+        Initialize the manager.
+
+        Args:
+            output_folder (str, optional): Folder where job results are written.
+                                           Defaults to "output/jobs".
+            max_jobs (int, optional): Number of jobs running at the same time.
+                                      Defaults to JOB_WORKERS.
+        """
+        self.output_folder = output_folder
+        self.jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="job")
+
+    def submit(self, file_paths: List[str], options: Optional[dict] = None, output_format: str = "csv") -> Job:
+        """
+        Queue a job and return straight away.
+
+        Args:
+            file_paths (List[str]): Paths of the PDF files to process
+            options (dict, optional): Keyword arguments for iter_process_pdfs
+            output_format (str, optional): Format of the result file. Defaults to "csv".
+
+        Returns:
+            Job: The queued job
+        """
+        job = Job(file_paths, "", options, output_format)
+        job.output_file = os.path.join(self.output_folder, f"{job.id}.{output_format}")
+        with self._lock:
+            self.jobs[job.id] = job
+            self._forget_old_jobs()
+        self._executor.submit(self._run, job)
+        logger.info("Queued job %s with %d files", job.id, len(file_paths))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Request cancellation of a job.
+
+        Files that already started are allowed to finish, the others are skipped.
+
+        Args:
+            job_id (str): Job identifier
+
+        Returns:
+            Optional[Job]: The job, None if it is unknown
+        """
+        job = self.jobs.get(job_id)
+        if job is not None and not job.finished:
+            logger.info("Cancelling job %s", job_id)
+            job.cancel_event.set()
+        return job
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self.jobs) - JOB_HISTORY)]:
+            job = self.jobs.pop(job_id)
+            if os.path.exists(job.output_file):
+                os.remove(job.output_file)
+
+    def _run(self, job: Job):
+        if job.cancel_event.is_set():
+            self._finish(job, "cancelled")
+            return
+
+        job.status = "running"
+        job.started_at = time.time()
+        logger.info("Starting job %s", job.id)
+        try:
+            with open_sink(job.output_format, job.output_file) as sink:
+                self._process(job, sink)
+
+            if job.cancel_event.is_set():
+                self._finish(job, "cancelled")
+                return
+
+            self._finish(job, "completed")
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            job.error = str(e)
+            self._finish(job, "failed")
+
+    def _process(self, job: Job, sink):
+        for result in iter_process_pdfs(job.file_paths, **job.options):
+            observe_result(result)
+            progress = job.files[result.file_path]
+            progress.seconds = result.seconds
+            progress.stages = dict(result.stages or {})
+            if result.error is not None:
+                progress.status = "failed"
+                progress.error = result.error
+            else:
+                progress.status = "done"
+                progress.rows = len(result.rows)
+                start = time.perf_counter()
+                sink.write_rows(result.rows)
+                write_seconds = time.perf_counter() - start
+                progress.stages["write"] = write_seconds
+                metrics.observe_stage("write", write_seconds)
+            if job.cancel_event.is_set():
+                break
+
+    def _finish(self, job: Job, status: str):
+        for progress in job.files.values():
+            if progress.status == "pending":
+                progress.status = "cancelled"
+        job.status = status
+        job.finished_at = time.time()
+        logger.info("Job %s %s", job.id, status)
@@ -0,0 +1,152 @@
+import json
+import logging
+import re
+from typing import List
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+# Markdown code fence wrapping the JSON answer, e.g. ```json ... ```
+FENCE_PATTERN = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+
+
+def parses(text: str) -> bool:
+    """
+    Check whether a whole response is a JSON object, once its markdown fence is removed.
+
+    A response cut off by the output token limit or mixed with prose fails.
+
+    Args:
+        text (str): Raw response of the model
+
+    Returns:
+        bool: True if the response parses
+    """
+    try:
+        return isinstance(json.loads(FENCE_PATTERN.sub("", text), strict=False), dict)
+    except json.JSONDecodeError:
+        return False
+
+
+class JSONRowParser:
+    """
+    Incrementally extract the objects of a JSON array from a streamed response.
+
+    Text is fed as it arrives from the model, e.g. ``{"data": [{...}, {...``,
+    and each object of the array is returned as soon as its closing brace is
+    received. Anything around the JSON document, such as a markdown fence,
+    is ignored. A response cut off in the middle of an object still yields
+    the objects completed before it.
+
+    Attributes:
+        key (str): Key of the array in the top-level object
+        complete (bool): True once the closing bracket of the array was received
+        rows (int): Number of objects returned so far
+        errors (int): Number of closed objects that were not valid JSON
+    """
+
+    def __init__(self, key: str = "data"):
+        """
+        Initialize the parser.
+
+        Args:
+            key (str, optional): Key of the array in the top-level object.
+                                 Defaults to "data".
+        """
+        self.key = key
+        self.complete = False
+        self.rows = 0
+        self.errors = 0
+        self._start_pattern = re.compile(r'"' + re.escape(key) + r'"\s*:\s*\[')
+        self._buffer = ""
+        self._in_array = False
+        # Scanning state inside the array, kept between feeds
+        self._pos = 0
+        self._depth = 0
+        self._object_start = None
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> List[dict]:
+        """
+        Consume the next piece of the response.
+
+        Args:
+            text (str): Text received since the previous call
+
+        Returns:
+            List[dict]: Objects of the array completed by this piece
+        """
+        if self.complete or not text:
+            return []
+        self._buffer += text
+
+        if not self._in_array:
+            match = self._start_pattern.search(self._buffer)
+            if match is None:
+                return []
+            self._in_array = True
+            self._buffer = self._buffer[match.end():]
+            self._pos = 0
+
+        objects = []
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer):
+            char = buffer[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._object_start = pos
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # Closing bracket of the array itself
+                    self.complete = True
+                    break
+                self._depth -= 1
+                if self._depth == 0 and self._object_start is not None:
+                    parsed = self._load(buffer[self._object_start:pos + 1])
+                    if parsed is not None:
+                        objects.append(parsed)
+                    self._object_start = None
+            pos += 1
+
+        # Only keep the text of the object still being received
+        if self._object_start is not None:
+            self._buffer = buffer[self._object_start:]
+            self._pos = pos - self._object_start
+            self._object_start = 0
+        else:
+            self._buffer = ""
+            self._pos = 0
+        self.rows += len(objects)
+        return objects
+
+    def _load(self, text: str):
+        try:
+            parsed = json.loads(text, strict=False)
+        except json.JSONDecodeError as e:
+            self.errors += 1
+            logger.warning("Skipping malformed object in streamed response: %s", e)
+            return None
+        if not isinstance(parsed, dict):
+            self.errors += 1
+            return None
+        return parsed
+
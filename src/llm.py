@@ -1,24 +1,232 @@
 
-from src.prompt import prompt_template
+import asyncio
+import logging
+import os
+import threading
+import weakref
 
-from langchain.chat_models import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
+from src.json_stream import parses
+from src.llm_cache import ResponseCache, cache_key
+from src.routing import count_tokens, model_label
+from src.timing import count, stage
 
-
-chat_model = ChatOpenAI(
-    model="gpt-4o",
-    temperature=0.0,
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
 )
 
-def llm_call(text):
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_responses.sqlite"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "use")
+LLM_STREAM = os.getenv("LLM_STREAM", "false").lower() in ("1", "true", "yes")
+# Default chat models from the cheapest to the strongest, tried in turn
+LLM_TIERS = [tier.strip() for tier in os.getenv("LLM_TIERS", "gpt-4o").split(",") if tier.strip()]
+
+# Built on first use, so importing this module neither loads langchain nor needs an API key
+chat_model = None
+_chat_model_lock = threading.Lock()
+
+_semaphores = weakref.WeakKeyDictionary()
+_response_cache = None
+
+def get_chat_model():
+    """Return the default chat model, routing requests across LLM_TIERS, creating it on first use."""
+    global chat_model
+    if chat_model is None:
+        with _chat_model_lock:
+            if chat_model is None:
+                from src.routing import build_chat_model
+
+                logger.info("Creating chat model client for %s", " > ".join(LLM_TIERS))
+                chat_model = build_chat_model(LLM_TIERS)
+    return chat_model
+
+def build_messages(text, prompt=None):
+    from langchain.schema import HumanMessage, SystemMessage
+    from src.prompt import prompt_template
+
+    prompt = (prompt or prompt_template).format(text=text)
+
+    return [
+        SystemMessage(content="You are an expert in clinical research documentation."),
+        HumanMessage(content=prompt)
+    ]
+
+def llm_semaphore():
+    """Return the semaphore capping in-flight async requests on the running event loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        _semaphores[loop] = semaphore
+    return semaphore
+
+def get_response_cache():
+    """Return the process-wide LLM response cache, creating it on first use."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES, mode=LLM_CACHE_MODE)
+    return _response_cache
+
+def request_key(messages, model):
+    """Build the cache key of a request from its rendered prompt, model name and temperature."""
+    model_name = model_label(model)
+    temperature = getattr(model, "temperature", None) or 0.0
+    return cache_key(messages[-1].content, model_name, temperature)
+
+def extraction_key(model=None):
+    """
+    Build a key identifying how rows are extracted: the model, its temperature and every extraction prompt.
+
+    Changes whenever a prompt template, its label choices or the model do,
+    so rows stored under an older key are never reused.
+    """
+    from src.prompt import packed_prompt_template, prompt_template
+
+    model = model or get_chat_model()
+    prompts = "\0".join(build_messages("", prompt)[-1].content for prompt in (prompt_template, packed_prompt_template))
+    return cache_key(prompts, model_label(model), getattr(model, "temperature", None) or 0.0)
+
+def _log_cache_result(cache, hit):
+    stats = cache.stats()
+    logger.info(
+        "LLM cache %s (hits=%d, misses=%d)",
+        "hit" if hit else "miss", stats["hits"], stats["misses"]
+    )
+
+def _lookup_cache(model, messages, cache_mode):
+    """Look up a request in the response cache, logging and counting hits."""
+    cache = get_response_cache()
+    key = request_key(messages, model)
+    cached = cache.get(key, mode=cache_mode)
+    if cached is not None:
+        _log_cache_result(cache, hit=True)
+        count("llm_cache_hits")
+    elif (cache_mode or cache.mode) == "use":
+        _log_cache_result(cache, hit=False)
+    return cache, key, cached
+
+def _cache_response(cache, key, content, cache_mode):
+    """Store a response in the cache unless it fails to parse, so a broken answer is not replayed."""
+    if not parses(content):
+        logger.warning("Not caching an LLM response that is not valid JSON (key %s)", key[:12])
+        return
+    cache.put(key, content, mode=cache_mode)
+
+def llm_call(text, model=None, cache_mode=None, prompt=None):
+
+    model = model or get_chat_model()
+    messages = build_messages(text, prompt)
 
-    prompt = prompt_template.format(text=text)
+    cache, key, cached = _lookup_cache(model, messages, cache_mode)
+    if cached is not None:
+        return cached
 
-    response = chat_model(
-        [
-            SystemMessage(content="You are an expert in clinical research documentation."),
-            HumanMessage(content=prompt)
-                           ]
-                           )
+    with stage("llm"):
+        response = model.invoke(messages)
+    count_tokens(model, messages, response)
+    _cache_response(cache, key, response.content, cache_mode)
 
     return response.content
+
+async def allm_call(text, model=None, cache_mode=None, prompt=None):
+
+    model = model or get_chat_model()
+    messages = build_messages(text, prompt)
+
+    cache, key, cached = _lookup_cache(model, messages, cache_mode)
+    if cached is not None:
+        return cached
+
+    with stage("llm"):
+        async with llm_semaphore():
+            response = await model.ainvoke(messages)
+    count_tokens(model, messages, response)
+    _cache_response(cache, key, response.content, cache_mode)
+
+    return response.content
+
+def llm_stream(text, model=None, cache_mode=None):
+    """
+    Stream the response to an extraction request piece by piece.
+
+    The complete response is cached once the generation finishes, if it
+    parses as JSON, and a cached response is returned as a single piece. If
+    the stream fails part way, the pieces already yielded are kept by the
+    caller but nothing is cached.
+
+    Args:
+        text (str): Text to extract statements from
+        model (optional): Chat model to use instead of the default one
+        cache_mode (str, optional): LLM response cache mode
+
+    Yields:
+        str: Response text as it is generated
+    """
+    model = model or get_chat_model()
+    messages = build_messages(text)
+
+    cache, key, cached = _lookup_cache(model, messages, cache_mode)
+    if cached is not None:
+        yield cached
+        return
+
+    response = None
+    chunks = iter(model.stream(messages))
+    while True:
+        # Only the wait for the model counts as LLM time, not the caller's parsing
+        with stage("llm"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        response = chunk if response is None else response + chunk
+        yield chunk.content
+
+    if response is not None:
+        count_tokens(model, messages, response)
+        _cache_response(cache, key, response.content, cache_mode)
+
+async def allm_stream(text, model=None, cache_mode=None):
+    """
+    Asynchronously stream the response to an extraction request piece by piece.
+
+    Holds a slot of the global concurrency limit until the generation ends.
+    See llm_stream for caching.
+
+    Args:
+        text (str): Text to extract statements from
+        model (optional): Chat model to use instead of the default one
+        cache_mode (str, optional): LLM response cache mode
+
+    Yields:
+        str: Response text as it is generated
+    """
+    model = model or get_chat_model()
+    messages = build_messages(text)
+
+    cache, key, cached = _lookup_cache(model, messages, cache_mode)
+    if cached is not None:
+        yield cached
+        return
+
+    response = None
+    async with llm_semaphore():
+        chunks = model.astream(messages).__aiter__()
+        while True:
+            with stage("llm"):
+                try:
+                    chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    break
+            response = chunk if response is None else response + chunk
+            yield chunk.content
+
+    if response is not None:
+        count_tokens(model, messages, response)
+        _cache_response(cache, key, response.content, cache_mode)
@@ -0,0 +1,181 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Dict, Optional
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+CACHE_MODES = ("use", "bypass", "refresh")
+
+
+def cache_key(prompt: str, model_name: str, temperature: float) -> str:
+    """
+    Build the content-addressed key of an LLM request.
+
+    Args:
+        prompt (str): Fully rendered prompt sent to the model
+        model_name (str): Name of the chat model
+        temperature (float): Sampling temperature
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    digest = hashlib.sha256()
+    for part in (model_name, repr(float(temperature)), prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    A persistent, size-capped cache of LLM responses backed by SQLite.
+
+    Entries are evicted least-recently-used first once the stored responses
+    exceed the size cap. Every operation opens its own connection and writes
+    take an immediate transaction, so several processes can share the same
+    cache file.
+
+    Attributes:
+        path (str): Path to the SQLite database file
+        max_bytes (int): Maximum total size of the stored responses
+        mode (str): One of "use" (read and write), "bypass" (neither read
+            nor write) or "refresh" (write without reading)
+        hits (int): Number of lookups answered from the cache
+        misses (int): Number of lookups not found in the cache
+        evictions (int): Number of entries evicted to respect the size cap
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, mode: str = "use"):
+        """
+        Initialize the cache, creating the database if needed.
+
+        Args:
+            path (str): Path to the SQLite database file
+            max_bytes (int, optional): Size cap in bytes. Defaults to 256 MiB.
+            mode (str, optional): Cache mode. Defaults to "use".
+
+        Raises:
+            ValueError: If the mode is not one of CACHE_MODES
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def get(self, key: str, mode: Optional[str] = None) -> Optional[str]:
+        """
+        Look up a cached response and mark it as recently used.
+
+        Args:
+            key (str): Request key built by cache_key
+            mode (str, optional): Overrides the cache mode for this lookup
+
+        Returns:
+            Optional[str]: Cached response, None on a miss or when reading is disabled
+        """
+        if (mode or self.mode) != "use":
+            return None
+
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.execute("COMMIT")
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        logger.debug("LLM cache %s for key %s", "miss" if row is None else "hit", key[:12])
+        return None if row is None else row[0]
+
+    def put(self, key: str, response: str, mode: Optional[str] = None):
+        """
+        Store a response, evicting least recently used entries above the size cap.
+
+        Args:
+            key (str): Request key built by cache_key
+            response (str): Response content to store
+            mode (str, optional): Overrides the cache mode for this write
+        """
+        if (mode or self.mode) == "bypass":
+            return
+
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            logger.warning("LLM response of %d bytes exceeds the cache size cap, not caching it", size)
+            return
+
+        evicted = 0
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time()),
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                for old_key, old_size in conn.execute(
+                    "SELECT key, size FROM responses WHERE key != ? ORDER BY last_access", (key,)
+                ).fetchall():
+                    conn.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                    total -= old_size
+                    evicted += 1
+                    if total <= self.max_bytes:
+                        break
+            conn.execute("COMMIT")
+
+        if evicted:
+            with self._lock:
+                self.evictions += evicted
+            logger.debug("Evicted %d entries from the LLM cache", evicted)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the hit, miss and eviction counters of this process.
+
+        Returns:
+            Dict[str, int]: Counters keyed by name
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
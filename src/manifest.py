@@ -0,0 +1,154 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 digest of a file's content.
+
+    Args:
+        file_path (str): Path to the file
+        chunk_size (int, optional): Bytes read at a time. Defaults to 1 MiB.
+
+    Returns:
+        str: Hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    A record of the content hash and extracted rows of each processed PDF.
+
+    Used by incremental runs to skip files whose content did not change and
+    to rebuild the merged output from stored per-file results.
+
+    Attributes:
+        path (str): Path to the JSON manifest file
+        files (Dict[str, dict]): Entries keyed by absolute file path, each
+            holding the file "hash" and its extracted "rows"
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the manifest, loading it from disk if it exists.
+
+        Args:
+            path (str): Path to the JSON manifest file
+        """
+        self.path = path
+        self.files: Dict[str, dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.files = json.load(f).get("files", {})
+                logger.info("Loaded manifest with %d files from %s", len(self.files), path)
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable manifest %s: %s", path, e)
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.abspath(file_path)
+
+    def is_current(self, file_path: str, content_hash: str) -> bool:
+        """
+        Check whether a file was already processed with the same content.
+
+        Args:
+            file_path (str): Path to the PDF file
+            content_hash (str): Current content hash of the file
+
+        Returns:
+            bool: True if the stored entry matches the content hash
+        """
+        entry = self.files.get(self._key(file_path))
+        return entry is not None and entry["hash"] == content_hash
+
+    def update(self, file_path: str, content_hash: str, rows: List[dict]):
+        """
+        Store the extracted rows of a file.
+
+        Args:
+            file_path (str): Path to the PDF file
+            content_hash (str): Content hash of the processed file
+            rows (List[dict]): Rows extracted from the file
+        """
+        self.files[self._key(file_path)] = {"hash": content_hash, "rows": rows}
+
+    def remove(self, file_path: str) -> bool:
+        """
+        Drop the entry of a file.
+
+        Args:
+            file_path (str): Path to the PDF file
+
+        Returns:
+            bool: True if an entry was removed
+        """
+        return self.files.pop(self._key(file_path), None) is not None
+
+    def prune(self, file_paths: List[str], folder: str) -> int:
+        """
+        Drop the entries of the files of a folder that are no longer present.
+
+        Entries of files in other folders are kept, so runs on several
+        folders can share the manifest.
+
+        Args:
+            file_paths (List[str]): Paths of the files currently in the folder
+            folder (str): Folder the batch was listed from
+
+        Returns:
+            int: Number of entries removed
+        """
+        current = {self._key(file_path) for file_path in file_paths}
+        folder = self._key(folder)
+        removed = [key for key in self.files if os.path.dirname(key) == folder and key not in current]
+        for key in removed:
+            logger.info("Dropping rows of removed file %s", key)
+            del self.files[key]
+        return len(removed)
+
+    def rows(self, file_paths: Optional[List[str]] = None) -> List[dict]:
+        """
+        Return the stored rows, ordered like the given files.
+
+        Args:
+            file_paths (List[str], optional): Files whose rows to return, in
+                                              order. Defaults to all entries.
+
+        Returns:
+            List[dict]: Stored rows of the files
+        """
+        keys = self.files.keys() if file_paths is None else [self._key(file_path) for file_path in file_paths]
+        return [row for key in keys if key in self.files for row in self.files[key]["rows"]]
+
+    def save(self):
+        """
+        Write the manifest to disk atomically.
+        """
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f)
+        os.replace(tmp_path, self.path)
+        logger.info("Saved manifest with %d files to %s", len(self.files), self.path)
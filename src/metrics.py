@@ -0,0 +1,222 @@
+import bisect
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Counters recorded while processing a file, with their help text
+FILE_COUNTERS = {
+    "ocr_pages": "Pages recognised with OCR",
+    "ocr_renders": "Page renders recognised with OCR, including higher-resolution retries",
+    "toc_entries": "Table of contents entries found",
+    "text_store_hits": "Documents read from the page text store",
+    "llm_blocks": "Content blocks sent to the LLM",
+    "packed_blocks": "Content blocks sent to the LLM together with blocks of other documents",
+    "llm_escalations": "LLM answers rejected by a cheaper model tier and sent to the next one",
+    "llm_cache_hits": "LLM responses served from the cache",
+    "reused_blocks": "Content blocks answered from the section index",
+    "prompt_tokens": "Prompt tokens sent to the LLM",
+    "completion_tokens": "Completion tokens returned by the LLM",
+    "json_parse_failures": "LLM responses that could not be parsed as JSON or were cut off",
+    "invalid_rows": "LLM answer elements failing schema validation",
+    "outcome_rule_fills": "Missing outcome measures filled by the rule-based extractor",
+    "outcome_rule_mismatches": "Outcome measures disagreeing with the rule-based extractor",
+}
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        name + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    """
+    A monotonically increasing Prometheus counter, optionally labelled.
+
+    Attributes:
+        name (str): Metric name
+        help (str): Help text
+    """
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """
+    A Prometheus histogram with cumulative buckets, optionally labelled.
+
+    Attributes:
+        name (str): Metric name
+        help (str): Help text
+        buckets (Tuple[float, ...]): Upper bounds of the buckets
+    """
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = STAGE_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[Tuple[str, str], ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            # Per-bucket counts, sum and number of observations
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(tuple(sorted(labels.items())))
+        return 0 if entry is None else entry[2]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, observations) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    bucket_labels = labels + (("le", f"{bound:g}"),)
+                    lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {observations}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {total:g}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {observations}")
+        return lines
+
+
+class Metrics:
+    """
+    Process-wide registry of the pipeline metrics.
+
+    Files can be processed in worker processes, so metrics are recorded per
+    file into its FileResult and aggregated here by the process serving them.
+
+    Attributes:
+        stage_seconds (Histogram): Seconds spent in each stage per file
+        file_seconds (Histogram): Total processing time per file
+        files (Counter): Processed files by status
+        counters (Dict[str, Counter]): Counters of FILE_COUNTERS keyed by name
+    """
+
+    def __init__(self):
+        self.stage_seconds = Histogram("pdf_stage_seconds", "Seconds spent in each pipeline stage per file")
+        self.file_seconds = Histogram("pdf_file_seconds", "Processing time per file in seconds")
+        self.files = Counter("pdf_files_total", "Processed files by status")
+        self.counters = {
+            name: Counter(f"pdf_{name}_total", help) for name, help in FILE_COUNTERS.items()
+        }
+
+    def observe_file(self, seconds: float, stages: Optional[Dict[str, float]], counts: Optional[Dict[str, int]], error: Optional[str] = None):
+        """
+        Aggregate the measurements of one processed file.
+
+        Args:
+            seconds (float): Processing time of the file
+            stages (Dict[str, float], optional): Seconds spent in each stage
+            counts (Dict[str, int], optional): Counter values recorded for the file
+            error (str, optional): Error message if processing failed
+        """
+        self.files.inc(status="failed" if error is not None else "succeeded")
+        self.file_seconds.observe(seconds)
+        for name, stage_seconds in (stages or {}).items():
+            self.stage_seconds.observe(stage_seconds, stage=name)
+        for name, value in (counts or {}).items():
+            if name in self.counters:
+                self.counters[name].inc(value)
+            else:
+                logger.debug("Ignoring unknown counter %s", name)
+
+    def observe_stage(self, name: str, seconds: float):
+        """
+        Record the duration of a stage run outside of file processing, e.g. writing the output.
+
+        Args:
+            name (str): Stage name
+            seconds (float): Duration of the stage
+        """
+        self.stage_seconds.observe(seconds, stage=name)
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text
+        """
+        lines = []
+        for metric in (self.files, self.file_seconds, self.stage_seconds, *self.counters.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def observe_result(result):
+    """
+    Aggregate the measurements of a FileResult into the process-wide metrics.
+
+    Args:
+        result (FileResult): Outcome of processing one file
+    """
+    metrics.observe_file(result.seconds, result.stages, result.counts, result.error)
+
+
+def result_timings(result) -> dict:
+    """
+    Summarise the processing time of a FileResult for API responses.
+
+    Args:
+        result (FileResult): Outcome of processing one file
+
+    Returns:
+        dict: File name, status, total seconds and seconds per stage
+    """
+    return {
+        "file": os.path.basename(result.file_path),
+        "status": "failed" if result.error is not None else "succeeded",
+        "seconds": round(result.seconds, 4),
+        "stages": {name: round(seconds, 4) for name, seconds in (result.stages or {}).items()},
+    }
@@ -0,0 +1,321 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+OCR_DPI = int(os.getenv("OCR_DPI", "90"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_ADAPTIVE = os.getenv("OCR_ADAPTIVE", "false").lower() in ("1", "true", "yes")
+OCR_MAX_DPI = int(os.getenv("OCR_MAX_DPI", "300"))
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "70"))
+OCR_CACHE_PAGES = int(os.getenv("OCR_CACHE_PAGES", "256"))
+
+_page_cache: "OrderedDict[tuple, Tuple[str, Optional[float]]]" = OrderedDict()
+_page_cache_lock = threading.Lock()
+
+
+class PageOCR(NamedTuple):
+    """
+    Text recognised on a page, with the resolution it was recognised at.
+
+    Attributes:
+        page_number (int): 1-based number of the page
+        text (str): Recognised text
+        dpi (int): Rendering resolution of the kept recognition
+        confidence (float, optional): Mean word confidence (0-100) reported
+            by Tesseract, None if it was not measured or the page has no words
+        renders (int): Number of resolutions the page was rendered at
+    """
+    page_number: int
+    text: str
+    dpi: int
+    confidence: Optional[float] = None
+    renders: int = 1
+
+
+def ocr_settings(adaptive: bool = False) -> str:
+    """
+    Describe the OCR settings the recognised text depends on.
+
+    Args:
+        adaptive (bool, optional): Whether adaptive resolution is used. Defaults to False.
+
+    Returns:
+        str: Settings string, e.g. "ocr-dpi=90"
+    """
+    if adaptive:
+        return f"ocr-dpi={OCR_DPI}-{OCR_MAX_DPI};min-confidence={OCR_MIN_CONFIDENCE:g}"
+    return f"ocr-dpi={OCR_DPI}"
+
+
+def adaptive_dpis(first_dpi: int = OCR_DPI, max_dpi: int = OCR_MAX_DPI) -> List[int]:
+    """
+    Resolutions tried in turn by adaptive OCR, doubling up to the upper bound.
+
+    Args:
+        first_dpi (int, optional): First-pass resolution. Defaults to OCR_DPI.
+        max_dpi (int, optional): Upper bound. Defaults to OCR_MAX_DPI.
+
+    Returns:
+        List[int]: Increasing resolutions, e.g. [90, 180, 300]
+    """
+    dpis = [first_dpi]
+    while dpis[-1] < max_dpi:
+        dpis.append(min(max_dpi, dpis[-1] * 2))
+    return dpis
+
+
+def source_key(source: Union[str, bytes]) -> tuple:
+    """
+    Identify the content of a PDF for the page cache.
+
+    Args:
+        source (Union[str, bytes]): Path to the PDF file, or its content
+
+    Returns:
+        tuple: Hash of the content, or path, size and modification time of the file
+    """
+    if isinstance(source, bytes):
+        return ("data", hashlib.sha1(source).hexdigest())
+    stat = os.stat(source)
+    return ("path", os.path.abspath(source), stat.st_size, stat.st_mtime_ns)
+
+
+def render_page(source: Union[str, bytes], page_number: int, dpi: int) -> "Image.Image":
+    """
+    Render a single PDF page to an image.
+
+    Content given as bytes is written to a temporary file by pdf2image on
+    every call, so OCRDocument passes in-memory PDFs by path, see
+    OCRDocument.source_path.
+
+    Args:
+        source (Union[str, bytes]): Path to the PDF file, or its content
+        page_number (int): 1-based number of the page
+        dpi (int): Rendering resolution
+
+    Returns:
+        Image.Image: Page image, to be closed by the caller
+    """
+    # The OCR stack is only loaded once a document actually needs OCR
+    from pdf2image import convert_from_bytes, convert_from_path
+
+    convert = convert_from_bytes if isinstance(source, bytes) else convert_from_path
+    return convert(source, dpi=dpi, first_page=page_number, last_page=page_number)[0]
+
+
+def recognise(image: "Image.Image", confidence: bool = False) -> Tuple[str, Optional[float]]:
+    """
+    Recognise the text of an image with Tesseract.
+
+    Args:
+        image (Image.Image): Page image
+        confidence (bool, optional): Also measure the mean word confidence,
+                                     rebuilding the text from Tesseract's
+                                     word data. Defaults to False.
+
+    Returns:
+        Tuple[str, Optional[float]]: Recognised text, and the mean word
+        confidence weighted by word length if measured and the page has words
+    """
+    import pytesseract
+
+    if not confidence:
+        return pytesseract.image_to_string(image), None
+
+    data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+    return text_from_data(data)
+
+
+def text_from_data(data: dict) -> Tuple[str, Optional[float]]:
+    """
+    Rebuild the text of a page from Tesseract's word data and measure its confidence.
+
+    Words of a line are joined with spaces, lines with newlines, and
+    paragraphs and blocks are separated by an empty line, like the output
+    of image_to_string.
+
+    Args:
+        data (dict): Output of pytesseract.image_to_data as a dictionary
+
+    Returns:
+        Tuple[str, Optional[float]]: Text, and the mean word confidence
+        weighted by word length, None if there are no words
+    """
+    lines: List[str] = []
+    current_line = None
+    current_paragraph = None
+    words: List[str] = []
+    weighted = 0.0
+    characters = 0
+    for i, word in enumerate(data["text"]):
+        word = (word or "").strip()
+        confidence = float(data["conf"][i])
+        if not word or confidence < 0:
+            continue
+        paragraph = (data["block_num"][i], data["par_num"][i])
+        line = paragraph + (data["line_num"][i],)
+        if line != current_line:
+            if words:
+                lines.append(" ".join(words))
+                words = []
+            if current_paragraph is not None and paragraph != current_paragraph:
+                lines.append("")
+            current_line, current_paragraph = line, paragraph
+        words.append(word)
+        weighted += confidence * len(word)
+        characters += len(word)
+    if words:
+        lines.append(" ".join(words))
+    text = "\n".join(lines) + "\n" if lines else ""
+    return text, (weighted / characters if characters else None)
+
+
+def _recognise_cached(source: Union[str, bytes], key: tuple, page_number: int, dpi: int, confidence: bool) -> Tuple[Tuple[str, Optional[float]], bool]:
+    """Recognise a page at a resolution, unless it was already. Returns the result and whether it was rendered."""
+    cache_key = key + (page_number, dpi, confidence)
+    with _page_cache_lock:
+        cached = _page_cache.get(cache_key)
+        if cached is not None:
+            _page_cache.move_to_end(cache_key)
+            return cached, False
+
+    image = render_page(source, page_number, dpi)
+    try:
+        result = recognise(image, confidence=confidence)
+    finally:
+        image.close()
+
+    with _page_cache_lock:
+        _page_cache[cache_key] = result
+        while len(_page_cache) > OCR_CACHE_PAGES:
+            _page_cache.popitem(last=False)
+    return result, True
+
+
+def ocr_page(
+    source: Union[str, bytes],
+    page_number: int,
+    dpi: int = OCR_DPI,
+    adaptive: bool = False,
+    max_dpi: int = OCR_MAX_DPI,
+    min_confidence: float = OCR_MIN_CONFIDENCE,
+    key: Optional[tuple] = None,
+) -> PageOCR:
+    """
+    Render a single PDF page and recognise its text with Tesseract.
+    
+    In adaptive mode, the page is first recognised at the given resolution
+    and, while Tesseract's mean word confidence stays below the threshold,
+    rendered and recognised again at doubling resolutions up to max_dpi.
+    The most confident recognition is kept. Recognitions are cached by page
+    and resolution, so a page is never rendered twice at the same resolution.
+    
+    Args:
+        source (Union[str, bytes]): Path to the PDF file, or its content
+        page_number (int): 1-based number of the page
+        dpi (int, optional): Rendering resolution, of the first pass in
+                             adaptive mode. Defaults to OCR_DPI.
+        adaptive (bool, optional): Re-render pages recognised with a low
+                                   confidence. Defaults to False.
+        max_dpi (int, optional): Upper bound of the resolution. Defaults to OCR_MAX_DPI.
+        min_confidence (float, optional): Confidence below which a page is
+                                          recognised again. Defaults to OCR_MIN_CONFIDENCE.
+        key (tuple, optional): Cache key of the source, computed by
+                               source_key when not given. Defaults to None.
+        
+    Returns:
+        PageOCR: Recognised text with its resolution and confidence
+    """
+    key = key or source_key(source)
+    best = None
+    renders = 0
+    for attempt_dpi in (adaptive_dpis(dpi, max_dpi) if adaptive else [dpi]):
+        (text, confidence), rendered = _recognise_cached(source, key, page_number, attempt_dpi, adaptive)
+        renders += rendered
+        if best is None or (confidence or 0) > (best.confidence or 0):
+            best = PageOCR(page_number, text, attempt_dpi, confidence)
+        # Pages without any word are blank rather than unreadable
+        if not adaptive or confidence is None or confidence >= min_confidence:
+            break
+        logger.debug("Page %d recognised with confidence %.0f at %d dpi", page_number, confidence, attempt_dpi)
+    if adaptive and best.confidence is not None and best.confidence < min_confidence:
+        logger.warning(
+            "Page %d only recognised with confidence %.0f, at %d dpi", page_number, best.confidence, best.dpi
+        )
+    return best._replace(renders=renders)
+
+
+def ocr_pages(
+    source: Union[str, bytes],
+    page_numbers: Iterable[int],
+    dpi: int = OCR_DPI,
+    workers: Optional[int] = None,
+    adaptive: Optional[bool] = None,
+    lookahead: Optional[int] = None,
+) -> Iterator[PageOCR]:
+    """
+    OCR pages as a bounded stream across a thread pool.
+    
+    Each task renders and recognises one page, and at most twice as many
+    tasks as workers are in flight, so only a fixed number of page images
+    is held in memory whatever the page count. Results are yielded in the
+    order of ``page_numbers``. Callers that may stop early, e.g. the table
+    of contents scan, set a small lookahead, as pages already being
+    recognised when the caller stops are recognised for nothing.
+    
+    Args:
+        source (Union[str, bytes]): Path to the PDF file, or its content
+        page_numbers (Iterable[int]): 1-based numbers of the pages to OCR
+        dpi (int, optional): Rendering resolution. Defaults to OCR_DPI.
+        workers (int, optional): Number of OCR threads. Defaults to OCR_WORKERS.
+        adaptive (bool, optional): Re-render pages recognised with a low
+                                   confidence at higher resolutions.
+                                   Defaults to OCR_ADAPTIVE.
+        lookahead (int, optional): Number of pages in flight. Defaults to
+                                   twice the number of workers.
+        
+    Yields:
+        PageOCR: Recognised text of each page, with its resolution and confidence
+    """
+    workers = max(1, workers or OCR_WORKERS)
+    adaptive = OCR_ADAPTIVE if adaptive is None else adaptive
+    key = source_key(source)
+    max_in_flight = max(1, lookahead or 2 * workers)
+    workers = min(workers, max_in_flight)
+    pending = deque()
+    page_numbers = iter(page_numbers)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for page_number in page_numbers:
+                pending.append(executor.submit(ocr_page, source, page_number, dpi, adaptive, key=key))
+                if len(pending) >= max_in_flight:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Don't OCR pages the caller no longer wants if it stopped early
+            for future in pending:
+                future.cancel()
+
+
+def ocr_page_text(page_number: int, text: str) -> str:
+    """Format the recognised text of a page the way it is stored in OCR documents."""
+    return f"\n\n------- Page {page_number} -------\n\n{text}"
@@ -0,0 +1,288 @@
+import bisect
+import json
+import logging
+import os
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.data_models import DFSchema
+from src.timing import count
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+OUTCOME_RULES_MODE = os.getenv("OUTCOME_RULES_MODE", "off")
+OUTCOME_SYNONYMS_PATH = os.getenv("OUTCOME_SYNONYMS_PATH", "")
+OUTCOME_RULES_MODES = ("off", "fill", "check", "override")
+
+# Outcome measure, as written in the output, and the phrases naming it
+DEFAULT_SYNONYMS: Dict[str, List[str]] = {
+    "PFS": ["PFS", "progression-free survival", "progression free survival", "rPFS", "radiographic progression-free survival"],
+    "OS": ["OS", "overall survival"],
+    "ORR": ["ORR", "objective response rate", "overall response rate", "objective response", "overall response", "best overall response"],
+    "DCR": ["DCR", "disease control rate", "disease control"],
+    "CBR": ["CBR", "clinical benefit rate", "clinical benefit"],
+    "Duration of response": ["DOR", "DoR", "duration of response", "duration of objective response", "duration of overall response"],
+    "Time to response": ["TTR", "time to response", "time to objective response"],
+    "Time to progression": ["TTP", "time to progression", "time to disease progression"],
+    "Quality of Life": ["quality of life", "QoL", "HRQoL", "health-related quality of life", "EORTC QLQ-C30", "patient-reported outcomes"],
+    "Safety and tolerability": ["safety", "tolerability", "adverse events", "adverse event", "TEAEs", "toxicity", "toxicities", "dose-limiting toxicities"],
+    "Pharmacokinetics": ["pharmacokinetics", "pharmacokinetic", "PK", "population pharmacokinetics", "Cmax", "AUC", "plasma concentrations"],
+}
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class PhraseMatcher:
+    """
+    Find phrases of a dictionary in texts with an Aho-Corasick automaton.
+
+    The automaton is compiled into a transition table, so scanning a text
+    costs one dictionary lookup per character whatever the number of
+    phrases. Matching ignores case and only keeps whole words, e.g. "OS"
+    is not found in "dose". Overlapping matches are resolved leftmost
+    first, then longest, e.g. "time to objective response" rather than
+    "objective response".
+
+    Attributes:
+        phrases (Dict[str, str]): Value of each phrase, keyed by the lowercased phrase
+    """
+
+    def __init__(self, phrases: Dict[str, str]):
+        """
+        Compile the automaton.
+
+        Args:
+            phrases (Dict[str, str]): Value returned for each phrase
+        """
+        self.phrases = {phrase.lower(): value for phrase, value in phrases.items() if phrase.strip()}
+
+        # Trie of the phrases, then failure links in breadth-first order
+        goto: List[Dict[str, int]] = [{}]
+        ends: List[Optional[str]] = [None]
+        for phrase in self.phrases:
+            state = 0
+            for char in phrase:
+                if char not in goto[state]:
+                    goto.append({})
+                    ends.append(None)
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            ends[state] = phrase
+
+        fail = [0] * len(goto)
+        # Phrases ending at each state, through its failure links, longest first
+        outputs: List[Tuple[str, ...]] = [()] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] = ((ends[state],) if ends[state] else ()) + outputs[fail[state]]
+            for char, child in goto[state].items():
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = goto[fallback].get(char, 0)
+                queue.append(child)
+
+        # Full transition table: characters outside the phrases go back to the root
+        delta: List[Dict[str, int]] = [dict(goto[0])]
+        order = deque(goto[0].values())
+        delta.extend({} for _ in range(len(goto) - 1))
+        while order:
+            state = order.popleft()
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            order.extend(goto[state].values())
+        self._delta = delta
+        self._outputs = outputs
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        Find the phrases of a text.
+
+        Args:
+            text (str): Text to scan
+
+        Returns:
+            List[Tuple[int, int, str]]: Start, end and value of each match
+            in the original text, in order and without overlaps
+        """
+        lowered = text.lower()
+        # Lowercasing can lengthen a text, e.g. "İ" gives two characters, so
+        # positions are mapped back to the original characters
+        origins = None
+        if len(lowered) != len(text):
+            origins = [position for position, char in enumerate(text) for _ in char.lower()]
+        text = lowered
+        delta, outputs = self._delta, self._outputs
+        candidates = []
+        state = 0
+        for end, char in enumerate(text, start=1):
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                for phrase in outputs[state]:
+                    start = end - len(phrase)
+                    if (start == 0 or not _is_word(text[start - 1])) and (end == len(text) or not _is_word(text[end])):
+                        candidates.append((start, end, phrase))
+        # Leftmost, then longest, non-overlapping matches
+        candidates.sort(key=lambda match: (match[0], match[0] - match[1]))
+        matches = []
+        position = 0
+        for start, end, phrase in candidates:
+            if start >= position:
+                position = end
+                if origins is not None:
+                    start, end = origins[start], origins[end - 1] + 1
+                matches.append((start, end, self.phrases[phrase]))
+        return matches
+
+
+def load_synonyms(path: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Load the synonym dictionary of outcome measures.
+
+    Args:
+        path (str, optional): JSON file mapping each outcome measure to its
+                              synonyms, merged into DEFAULT_SYNONYMS.
+                              Defaults to OUTCOME_SYNONYMS_PATH.
+
+    Returns:
+        Dict[str, List[str]]: Synonyms of each outcome measure, the measure
+        itself included
+    """
+    synonyms = {measure: list(phrases) for measure, phrases in DEFAULT_SYNONYMS.items()}
+    path = OUTCOME_SYNONYMS_PATH if path is None else path
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for measure, phrases in json.load(f).items():
+                synonyms.setdefault(measure, []).extend(phrases)
+    for measure, phrases in synonyms.items():
+        phrases.append(measure)
+    return synonyms
+
+
+class OutcomeExtractor:
+    """
+    Deterministic extractor of the outcome measures named in statements.
+
+    Attributes:
+        synonyms (Dict[str, List[str]]): Synonyms of each outcome measure
+    """
+
+    def __init__(self, synonyms: Optional[Dict[str, List[str]]] = None):
+        """
+        Build the extractor.
+
+        Args:
+            synonyms (Dict[str, List[str]], optional): Synonyms of each
+                                                       outcome measure.
+                                                       Defaults to load_synonyms().
+        """
+        self.synonyms = load_synonyms() if synonyms is None else synonyms
+        phrases = {}
+        for measure, measure_phrases in self.synonyms.items():
+            for phrase in measure_phrases:
+                if phrases.setdefault(phrase.lower(), measure) != measure:
+                    logger.warning("Synonym '%s' of %s is already a synonym of %s", phrase, measure, phrases[phrase.lower()])
+        self.matcher = PhraseMatcher(phrases)
+
+    def extract(self, texts: Iterable[Optional[str]]) -> List[List[str]]:
+        """
+        Find the outcome measures of each text in one pass over the batch.
+
+        The texts are joined and scanned together, and the matches mapped
+        back to the text they were found in.
+
+        Args:
+            texts (Iterable[Optional[str]]): Statement texts
+
+        Returns:
+            List[List[str]]: Outcome measures of each text, in order of
+            appearance and without repetitions
+        """
+        texts = [text or "" for text in texts]
+        starts = []
+        position = 0
+        for text in texts:
+            starts.append(position)
+            position += len(text) + 1
+        measures: List[List[str]] = [[] for _ in texts]
+        # Line breaks separate the texts, so no phrase spans two of them
+        for start, _, measure in self.matcher.find("\n".join(text.replace("\n", " ") for text in texts)):
+            found = measures[bisect.bisect_right(starts, start) - 1]
+            if measure not in found:
+                found.append(measure)
+        return measures
+
+    def normalise(self, value: Optional[str]) -> List[str]:
+        """
+        Map an outcome measure written freely, e.g. by the LLM, to the measures of the dictionary.
+
+        Args:
+            value (str, optional): Outcome measure, e.g. "Progression free survival"
+
+        Returns:
+            List[str]: Outcome measures named in the value
+        """
+        return self.extract([value])[0]
+
+
+@lru_cache(maxsize=None)
+def get_outcome_extractor() -> OutcomeExtractor:
+    """Return the extractor built from the configured synonym dictionary, building it on first use."""
+    return OutcomeExtractor()
+
+
+def apply_outcome_rules(rows: List[DFSchema], mode: str = "fill", extractor: Optional[OutcomeExtractor] = None) -> List[DFSchema]:
+    """
+    Fill or cross-check the outcome measure of rows with the rule-based extractor.
+
+    Args:
+        rows (List[DFSchema]): Rows extracted by the LLM
+        mode (str, optional): "fill" only sets missing outcome measures,
+                              "check" logs and counts rows whose outcome
+                              measure names none of the measures found in
+                              the statement, "override" replaces it when
+                              measures are found, and "off" does nothing.
+                              Defaults to "fill".
+        extractor (OutcomeExtractor, optional): Extractor to use. Defaults
+                                                to get_outcome_extractor().
+
+    Returns:
+        List[DFSchema]: The same rows, updated in place
+
+    Raises:
+        ValueError: If the mode is not one of OUTCOME_RULES_MODES
+    """
+    if mode not in OUTCOME_RULES_MODES:
+        raise ValueError(f"Unknown outcome rules mode '{mode}', expected one of {OUTCOME_RULES_MODES}")
+    if mode == "off" or not rows:
+        return rows
+
+    extractor = extractor or get_outcome_extractor()
+    found = extractor.extract(row.statement_text for row in rows)
+    for row, measures in zip(rows, found):
+        if not measures:
+            continue
+        if not row.outcome_measure or mode == "override":
+            if not row.outcome_measure:
+                count("outcome_rule_fills")
+            row.outcome_measure = ", ".join(measures)
+        elif mode == "check":
+            normalised = extractor.normalise(row.outcome_measure)
+            if normalised and not set(normalised) & set(measures):
+                count("outcome_rule_mismatches")
+                logger.warning(
+                    "Outcome measure '%s' of '%s' differs from the rules: %s",
+                    row.outcome_measure, row.statement_text[:80], ", ".join(measures)
+                )
+    return rows
@@ -0,0 +1,221 @@
+import csv
+import json
+import logging
+import os
+import typing
+from typing import List, Tuple
+
+from src.data_models import DFSchema
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ("csv", "ndjson", "parquet")
+OUTPUT_COLUMNS = list(DFSchema.model_fields)
+OUTPUT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class OutputSink:
+    """
+    Base class for writers appending extracted rows to an output file.
+
+    Rows are written one document at a time as soon as the document is
+    processed, so memory does not grow with the batch size and the rows of
+    finished documents survive a crash later in the run.
+
+    Attributes:
+        path (str): Path to the output file
+        rows_written (int): Number of rows written so far
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the sink, creating the output folder if needed.
+
+        Args:
+            path (str): Path to the output file
+        """
+        self.path = path
+        self.rows_written = 0
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    def write_rows(self, rows: List[dict]):
+        """
+        Append the rows extracted from one document.
+
+        Args:
+            rows (List[dict]): Rows following DFSchema
+        """
+        raise NotImplementedError
+
+    def mark(self) -> Tuple[int, int]:
+        """
+        Remember the current end of the output, to discard the rows written after it.
+
+        Returns:
+            Tuple[int, int]: Position in the file and number of rows written
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot discard written rows")
+
+    def discard(self, mark: Tuple[int, int]):
+        """
+        Remove the rows written since a mark, e.g. the streamed rows of a document that failed.
+
+        Args:
+            mark (Tuple[int, int]): Mark returned by mark()
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot discard written rows")
+
+    def close(self):
+        """
+        Flush and close the output file.
+        """
+        logger.info("Wrote %d rows to %s", self.rows_written, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TextSink(OutputSink):
+    """
+    Base class for sinks writing a text file, whose end can be cut back to a mark.
+    """
+
+    def mark(self) -> Tuple[int, int]:
+        return self.file.tell(), self.rows_written
+
+    def discard(self, mark: Tuple[int, int]):
+        position, rows_written = mark
+        # Rows of several failed files may already have been cut back further
+        if position >= self.file.seek(0, os.SEEK_END):
+            return
+        self.file.seek(position)
+        self.file.truncate()
+        self.file.flush()
+        logger.info("Discarded %d rows from %s", self.rows_written - rows_written, self.path)
+        self.rows_written = rows_written
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+class CSVSink(TextSink):
+    """
+    Writes rows as CSV with a header of the DFSchema fields.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=OUTPUT_COLUMNS, extrasaction="ignore")
+        self.writer.writeheader()
+        self.file.flush()
+
+    def write_rows(self, rows: List[dict]):
+        self.writer.writerows(rows)
+        self.file.flush()
+        self.rows_written += len(rows)
+
+
+class NDJSONSink(TextSink):
+    """
+    Writes rows as newline-delimited JSON, one object per row.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write_rows(self, rows: List[dict]):
+        for row in rows:
+            self.file.write(json.dumps({column: row.get(column) for column in OUTPUT_COLUMNS}) + "\n")
+        self.file.flush()
+        self.rows_written += len(rows)
+
+
+def parquet_schema():
+    """
+    Build the Arrow schema of the output from DFSchema.
+
+    Returns:
+        pyarrow.Schema: One string column per field, nullable when the field is optional
+    """
+    import pyarrow as pa
+
+    return pa.schema([
+        pa.field(name, pa.string(), nullable=type(None) in typing.get_args(field.annotation))
+        for name, field in DFSchema.model_fields.items()
+    ])
+
+
+class ParquetSink(OutputSink):
+    """
+    Writes rows as Parquet, with one row group per document.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow, install it with `pip install pyarrow`") from e
+
+        self._pa = pa
+        self.schema = parquet_schema()
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write_rows(self, rows: List[dict]):
+        if not rows:
+            return
+        columns = {column: [row.get(column) for row in rows] for column in OUTPUT_COLUMNS}
+        self.writer.write_table(self._pa.Table.from_pydict(columns, schema=self.schema))
+        self.rows_written += len(rows)
+
+    def close(self):
+        self.writer.close()
+        super().close()
+
+
+SINKS = {
+    "csv": CSVSink,
+    "ndjson": NDJSONSink,
+    "parquet": ParquetSink,
+}
+
+
+def open_sink(output_format: str, path: str) -> OutputSink:
+    """
+    Open an output sink for the given format.
+
+    Args:
+        output_format (str): One of OUTPUT_FORMATS
+        path (str): Path to the output file
+
+    Returns:
+        OutputSink: The opened sink
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if output_format not in SINKS:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+    logger.info("Writing %s output to %s", output_format, path)
+    return SINKS[output_format](path)
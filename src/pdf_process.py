@@ -1,9 +1,15 @@
+import hashlib
 import logging
-import pymupdf
-import pytesseract
-from pdf2image import convert_from_path
+import os
+from functools import partial
+from typing import List, Optional
 
+from src.document import Document, OCRDocument, PyMuPDFDocument, StoredDocument
 from src.helpers import matching_toc
+from src.manifest import file_hash
+from src.ocr import OCR_ADAPTIVE, OCR_WORKERS
+from src.text_store import TEXT_STORE_MODE, TEXT_STORE_MODES, StoredEntry, extraction_settings, get_text_store, store_key
+from src.timing import count, stage
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,6 +21,12 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+LAZY_OCR = os.getenv("LAZY_OCR", "false").lower() in ("1", "true", "yes")
+TOC_SCAN_MAX_PAGES = int(os.getenv("TOC_SCAN_MAX_PAGES", "30"))
+# Leading pages recognised ahead of the TOC scan, which stops at the first page without entries
+TOC_SCAN_LOOKAHEAD = int(os.getenv("TOC_SCAN_LOOKAHEAD", "2"))
+
+
 class PDFProcessor:
     """
     A class to process PDF documents and extract their table of contents.
@@ -25,122 +37,279 @@ class PDFProcessor:
     
     Attributes:
         pdf_path (str): Path to the PDF file
+        data (bytes, optional): Content of the PDF file when it is processed from memory
         pdf_name (str): Name of the PDF file without extension
-        doc (pymupdf.Document): Loaded PDF document
+        doc (Document): Loaded document, exposing per-page text and outline
         toc (list): Extracted table of contents
+        ocr_workers (int): Number of threads used for OCR
+        lazy_ocr (bool): Whether scanned pages are only recognised when needed
+        adaptive_ocr (bool): Whether scanned pages recognised with a low
+            confidence are rendered again at higher resolutions
+        text_store (str): Page text store mode, "use", "bypass" or "refresh"
+        store_key (str, optional): Key of the document in the page text store
+        from_store (bool): True if the document was read from the page text store
     """
 
-    def __init__(self, pdf_path: str):
+    def __init__(
+        self,
+        pdf_path: str,
+        ocr_workers: Optional[int] = None,
+        lazy_ocr: Optional[bool] = None,
+        data: Optional[bytes] = None,
+        text_store: Optional[str] = None,
+        adaptive_ocr: Optional[bool] = None,
+    ):
         """
         Initialize the PDFProcessor with a PDF file path.
         
         Args:
-            pdf_path (str): Path to the PDF file to process
+            pdf_path (str): Path to the PDF file to process, or its file name
+                            when the content is given in data
+            ocr_workers (int, optional): Number of threads used for OCR.
+                                         Defaults to OCR_WORKERS.
+            lazy_ocr (bool, optional): Only recognise the table of contents
+                                       and the pages it points to, when they
+                                       are needed. Defaults to LAZY_OCR.
+            data (bytes, optional): Content of the PDF file, read from memory
+                                    instead of pdf_path. Defaults to None.
+            text_store (str, optional): Read the page text and table of
+                                        contents from the page text store
+                                        ("use"), ignore it ("bypass") or
+                                        extract them again ("refresh").
+                                        Defaults to TEXT_STORE_MODE.
+            adaptive_ocr (bool, optional): Recognise scanned pages at a low
+                                           resolution first, and again at
+                                           higher ones while Tesseract's
+                                           confidence is low. Defaults to
+                                           OCR_ADAPTIVE.
+
+        Raises:
+            ValueError: If the text store mode is not one of TEXT_STORE_MODES
         """
         logger.info("Initializing PDFProcessor for file: %s", pdf_path)
         self.pdf_path = pdf_path
+        self.data = data
+        self.ocr_workers = ocr_workers or OCR_WORKERS
+        self.lazy_ocr = LAZY_OCR if lazy_ocr is None else lazy_ocr
+        self.adaptive_ocr = OCR_ADAPTIVE if adaptive_ocr is None else adaptive_ocr
         self.pdf_name = pdf_path.split("/")[-1].rstrip(".pdf")
-        self.doc = self.read_pdf(self.pdf_path)
-        self.toc = self.read_toc(self.doc)
+        self.text_store = text_store or TEXT_STORE_MODE
+        if self.text_store not in TEXT_STORE_MODES:
+            raise ValueError(f"Unknown text store mode '{self.text_store}', expected one of {TEXT_STORE_MODES}")
+        self.store_key: Optional[str] = None
+        self.from_store = False
+        with stage("open"):
+            self.doc = self.read_pdf(self.pdf_path)
+        with stage("toc"):
+            self.toc = self.read_toc(self.doc)
+        count("toc_entries", len(self.toc))
 
-    def read_pdf(self, pdf_path: str) -> pymupdf.Document:
+    def read_pdf(self, pdf_path: str) -> Document:
         """
         Read a PDF file and process it appropriately.
         
-        First attempts to read the PDF directly. If no table of contents
-        is found, falls back to OCR processing.
+        Reads the document from the page text store if it is there.
+        Otherwise, first attempts to read the PDF directly. If no table of
+        contents is found, falls back to OCR processing, and the extracted
+        text is added to the store.
         
         Args:
             pdf_path (str): Path to the PDF file
             
         Returns:
-            pymupdf.Document: Processed PDF document
+            Document: Processed PDF document
             
         Raises:
             FileNotFoundError: If the PDF file doesn't exist
             pymupdf.FileDataError: If the PDF file is corrupted
         """
+        import pymupdf
+
         logger.info("Attempting to read PDF: %s", pdf_path)
         try:
-            doc = pymupdf.open(pdf_path)
+            if self.text_store != "bypass":
+                self.store_key = store_key(self.content_hash(), extraction_settings(self.adaptive_ocr))
+                stored = self.read_stored_pdf(pdf_path)
+                if stored is not None:
+                    return stored
+
+            if self.data is not None:
+                doc = PyMuPDFDocument(pymupdf.open(stream=self.data, filetype="pdf"))
+            else:
+                doc = PyMuPDFDocument(pymupdf.open(pdf_path))
             if self.has_toc(doc):
                 logger.info("Successfully found table of contents in PDF")
             else:
                 logger.warning("No table of contents found, attempting OCR processing")
-                doc = self.read_pdf_with_ocr(pdf_path)
+                page_count = doc.page_count
+                doc.close()
+                if self.lazy_ocr:
+                    logger.info("Using lazy OCR, pages will be recognised on demand")
+                    doc = OCRDocument(pdf_path, page_count, ocr_workers=self.ocr_workers, data=self.data, adaptive=self.adaptive_ocr)
+                else:
+                    doc = self.read_pdf_with_ocr(pdf_path, page_count)
+
+            if self.store_key is not None:
+                store = get_text_store()
+                store.add_document(self.store_key, doc.page_count, doc.outline, doc.scanned)
+                doc = StoredDocument(store, self.store_key, doc.page_count, doc.outline, doc.scanned, source=doc)
             return doc
         except Exception as e:
             logger.error("Error reading PDF: %s", str(e))
             raise
 
-    def has_toc(self, doc: pymupdf.Document) -> bool:
+    def content_hash(self) -> str:
+        """
+        Compute the SHA-256 digest of the PDF content.
+        
+        Returns:
+            str: Hex digest of the PDF content
+        """
+        if self.data is not None:
+            return hashlib.sha256(self.data).hexdigest()
+        return file_hash(self.pdf_path)
+
+    def read_stored_pdf(self, pdf_path: str) -> Optional[StoredDocument]:
+        """
+        Read a document from the page text store.
+        
+        Args:
+            pdf_path (str): Path to the PDF file
+            
+        Returns:
+            Optional[StoredDocument]: Stored document, None if it is not in
+            the store or the store is refreshed
+        """
+        if self.text_store != "use":
+            return None
+        store = get_text_store()
+        entry = store.document(self.store_key)
+        if entry is None:
+            return None
+        logger.info("Reading %d pages from the page text store", entry.page_count)
+        count("text_store_hits")
+        self.from_store = True
+        return StoredDocument(
+            store, self.store_key, entry.page_count, entry.outline, entry.scanned,
+            open_source=partial(self.open_source, pdf_path, entry),
+        )
+
+    def open_source(self, pdf_path: str, entry: StoredEntry) -> Document:
+        """
+        Open a stored document's PDF to extract the pages missing from the store.
+        
+        Args:
+            pdf_path (str): Path to the PDF file
+            entry (StoredEntry): What the store knows about the document
+            
+        Returns:
+            Document: The PDF, recognised with OCR page by page if it is scanned
+        """
+        if entry.scanned:
+            return OCRDocument(pdf_path, entry.page_count, ocr_workers=self.ocr_workers, data=self.data, adaptive=self.adaptive_ocr)
+
+        import pymupdf
+
+        if self.data is not None:
+            return PyMuPDFDocument(pymupdf.open(stream=self.data, filetype="pdf"))
+        return PyMuPDFDocument(pymupdf.open(pdf_path))
+
+    def has_toc(self, doc: Document) -> bool:
         """
         Check if the document has a table of contents.
         
         Args:
-            doc (pymupdf.Document): PDF document to check
+            doc (Document): PDF document to check
             
         Returns:
             bool: True if the document has a table of contents, False otherwise
         """
-        toc_exists = len(doc.get_toc()) > 0
+        toc_exists = len(doc.outline) > 0
         logger.debug("Table of contents exists: %s", toc_exists)
         return toc_exists
 
-    def read_pdf_with_ocr(self, pdf_path: str) -> pymupdf.Document:
+    def read_pdf_with_ocr(self, pdf_path: str, page_count: int) -> OCRDocument:
         """
         Process a PDF file using OCR when direct extraction fails.
         
-        Converts PDF pages to images and performs OCR to extract text.
-        Creates a new PDF document with the extracted text.
+        Streams all pages through a pool of OCR threads, holding only a
+        bounded number of page images in memory, and keeps the recognised
+        text of each page.
         
         Args:
             pdf_path (str): Path to the PDF file
+            page_count (int): Number of pages in the PDF file
             
         Returns:
-            pymupdf.Document: New PDF document containing OCR-extracted text
+            OCRDocument: Document holding the OCR-extracted text
             
         Raises:
             pytesseract.TesseractError: If OCR processing fails
         """
-        logger.info("Starting OCR processing of PDF")
+        logger.info("Starting OCR processing of %d pages with %d threads", page_count, self.ocr_workers)
         try:
-            pages = convert_from_path(pdf_path, dpi=90)
-            doc = pymupdf.open()
-            
-            for i, page in enumerate(pages):
-                logger.debug("Processing page %d with OCR", i+1)
-                text = pytesseract.image_to_string(page)
-                
-                new_page = doc.new_page(width=page.width, height=page.height)
-                text_insertion = f"\n\n------- Page {i+1} -------\n\n{text}"
-                new_page.insert_text((50, 50), text_insertion)
-                
-            logger.info("Successfully processed %d pages with OCR", len(pages))
+            doc = OCRDocument(pdf_path, page_count, ocr_workers=self.ocr_workers, data=self.data, adaptive=self.adaptive_ocr)
+            doc.prefetch(range(1, page_count + 1))
+            logger.info("Successfully processed %d pages with OCR", page_count)
             return doc
         except Exception as e:
             logger.error("OCR processing failed: %s", str(e))
             raise
 
-    def retrieve_toc(self, doc: pymupdf.Document) -> list:
+    def retrieve_toc(self, doc: Document) -> list:
         """
         Extract table of contents by scanning through document pages.
         
         Args:
-            doc (pymupdf.Document): PDF document to process
+            doc (Document): PDF document to process
             
         Returns:
             list: Extracted table of contents entries
         """
         logger.info("Retrieving table of contents from document text")
+        # Lets scanned pages missing from the text store be recognised in parallel
+        doc.prefetch(range(1, doc.page_count + 1))
         toc = []
-        for i, page in enumerate(doc):
-            logger.debug("Scanning page %d for table of contents entries", i+1)
-            toc.extend(matching_toc(page.get_text()))
+        for page_number in range(1, doc.page_count + 1):
+            logger.debug("Scanning page %d for table of contents entries", page_number)
+            toc.extend(matching_toc(doc.page_text(page_number)))
         logger.info("Found %d table of contents entries", len(toc))
         return toc
 
-    def read_toc(self, doc: pymupdf.Document) -> list:
+    def retrieve_toc_lazily(self, doc: OCRDocument) -> list:
+        """
+        Extract table of contents by recognising only the leading pages.
+        
+        Pages are recognised in order until TOC entries stop appearing, or
+        until TOC_SCAN_MAX_PAGES pages were scanned without finding any.
+        Only TOC_SCAN_LOOKAHEAD pages are recognised ahead of the scan, so
+        few pages are recognised for nothing once it stops.
+        
+        Args:
+            doc (OCRDocument): Scanned document to process, or a stored one
+            
+        Returns:
+            list: Extracted table of contents entries
+        """
+        logger.info("Retrieving table of contents from leading pages")
+        toc: List[list] = []
+        for page_number, text in doc.ocr(range(1, doc.page_count + 1), lookahead=TOC_SCAN_LOOKAHEAD):
+            entries = matching_toc(text)
+            logger.debug("Found %d table of contents entries on page %d", len(entries), page_number)
+            if entries:
+                toc.extend(entries)
+            elif toc:
+                break
+            elif page_number >= TOC_SCAN_MAX_PAGES:
+                logger.warning("No table of contents found in the first %d pages", page_number)
+                break
+        logger.info(
+            "Found %d table of contents entries after recognising %d/%d pages",
+            len(toc), len(doc.texts), doc.page_count
+        )
+        return toc
+
+    def read_toc(self, doc: Document) -> list:
         """
         Read the table of contents from the document.
         
@@ -148,7 +317,7 @@ class PDFProcessor:
         parsing document text if necessary.
         
         Args:
-            doc (pymupdf.Document): PDF document to process
+            doc (Document): PDF document to process
             
         Returns:
             list: Table of contents entries
@@ -156,10 +325,23 @@ class PDFProcessor:
         logger.info("Attempting to read table of contents")
         if self.has_toc(doc):
             logger.info("Using built-in table of contents")
-            toc = doc.get_toc()
+            return doc.outline
+
+        method = "lazy" if self.lazy_ocr and doc.scanned else "text"
+        if self.from_store:
+            toc = get_text_store().toc(self.store_key, method)
+            if toc is not None:
+                logger.info("Read %d TOC entries from the page text store", len(toc))
+                return toc
+
+        if method == "lazy":
+            logger.info("Extracting table of contents from leading pages")
+            toc = self.retrieve_toc_lazily(doc)
         else:
             logger.info("Extracting table of contents from document text")
             toc = self.retrieve_toc(doc)
-        
+
+        if self.store_key is not None:
+            get_text_store().put_toc(self.store_key, method, toc)
         logger.info("Successfully extracted %d TOC entries", len(toc))
         return toc
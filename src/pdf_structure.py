@@ -1,11 +1,21 @@
+import asyncio
 import json
 import logging
-from typing import List
+import os
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
 
 from src.pdf_process import PDFProcessor
-from src.data_models import DFSchema
-from src.helpers import matching_section
-from src.llm import llm_call
+from src.chunker import CHUNK_TOKENS, Chunk, chunk_blocks, merge_chunk_rows, row_key, token_counter
+from src.classifier import CLASSIFIER_MODE, CLASSIFIER_PATHS, classify_rows, load_classifier
+from src.data_models import DFSchema, LLMSchema, PackedLLMOutput
+from src.helpers import heading_position, section_spans
+from src.json_stream import FENCE_PATTERN, JSONRowParser
+from src.llm import LLM_STREAM, allm_call, allm_stream, extraction_key, get_response_cache, llm_call, llm_stream
+from src.outcome_rules import OUTCOME_RULES_MODE, apply_outcome_rules
+from src.section_index import get_section_index
+from src.timing import count, stage
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,6 +27,65 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+SECTION_MAX_PAGES = int(os.getenv("SECTION_MAX_PAGES", "10"))
+# Content blocks up to this many tokens can share a request with blocks of other documents
+PACK_BLOCK_TOKENS = int(os.getenv("LLM_PACK_BLOCK_TOKENS", "1000"))
+
+
+def _check_no_running_loop(alternative: str):
+    """
+    Raise a clear error when called from a running event loop, where asyncio.run cannot be used.
+
+    Args:
+        alternative (str): What to await instead
+
+    Raises:
+        RuntimeError: If an event loop is running in this thread
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    raise RuntimeError(f"Cannot run the extraction from a running event loop, use {alternative} instead")
+
+
+class _RowEmitter:
+    """
+    Passes rows to a callback as soon as they are extracted.
+
+    Rows of a continued chunk are held back until the previous chunk has
+    finished, so the rows repeated by their overlap are dropped exactly as
+    merge_chunk_rows drops them.
+    """
+
+    def __init__(self, chunks: List[Chunk], on_row: Callable[[DFSchema], None], classify: Callable[[List[DFSchema]], List[DFSchema]]):
+        self.chunks = chunks
+        self.on_row = on_row
+        self.classify = classify
+        # Row keys of each finished chunk, None while it is being extracted
+        self.keys: List[Optional[set]] = [None] * len(chunks)
+        self.pending: Dict[int, List[DFSchema]] = {}
+
+    def rows(self, i: int, rows: List[DFSchema]):
+        """Pass on rows of a block, labelling the rows released together in one call."""
+        ready = []
+        for row in rows:
+            if self.chunks[i].continued:
+                previous_keys = self.keys[i - 1]
+                if previous_keys is None:
+                    self.pending.setdefault(i, []).append(row)
+                    continue
+                if row_key(row) in previous_keys:
+                    continue
+            ready.append(row)
+        for row in self.classify(ready):
+            self.on_row(row)
+
+    def finish(self, i: int, rows: List[DFSchema]):
+        self.keys[i] = {row_key(row) for row in rows}
+        if i + 1 < len(self.chunks):
+            self.rows(i + 1, self.pending.pop(i + 1, []))
+
 class PDFStructurer:
     """
     A class to structure and process PDF content into structured data.
@@ -27,90 +96,209 @@ class PDFStructurer:
     
     Attributes:
         name (str): Name of the PDF document
-        doc (Document): Processed PDF document
+        doc (Document): Processed PDF document, exposing per-page text
         toc (list): Table of contents
+        spans (list): Relevant sections with their ending heading and page range
         sections (list): List of relevant section page numbers
         pages (List[str]): Extracted content from relevant pages
+        chunks (List[Chunk]): Content blocks packed or split to the token budget
+        reuse (str): Reuse mode of rows extracted from identical or similar
+            sections, None for the configured default
+        chat_model: Chat model used for extraction, None for the default one
+        cache_mode (str): LLM response cache mode, None for the configured default
+        classifiers (List[str]): Folders of local section classifiers applied to the rows
+        classifier_mode (str): Whether classifiers "fill" missing labels or "override" them
+        outcome_rules (str): Whether the rule-based extractor "fill"s,
+            "check"s or "override"s outcome measures, or is "off"
+        stream (bool): Stream LLM responses and parse their rows as they are generated
+        on_row (Callable[[DFSchema], None]): Called with each row as soon as it is extracted
         data_df (list): Structured data extracted from the PDF
     """
 
-    def __init__(self, processed_pdf: PDFProcessor):
+    def __init__(
+        self,
+        processed_pdf: PDFProcessor,
+        concurrent: bool = False,
+        chat_model=None,
+        defer: bool = False,
+        cache_mode: Optional[str] = None,
+        classifiers: Optional[List[str]] = None,
+        classifier_mode: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        reuse: Optional[str] = None,
+        stream: Optional[bool] = None,
+        on_row: Optional[Callable[[DFSchema], None]] = None,
+        outcome_rules: Optional[str] = None,
+    ):
         """
         Initialize the PDFStructurer with a processed PDF document.
         
         Args:
             processed_pdf (PDFProcessor): A processed PDF document object
+            concurrent (bool, optional): Send all content blocks to the LLM at
+                                         the same time. Not possible from a
+                                         running event loop, where deferred
+                                         structurers are awaited with
+                                         astructure or astructure_batch instead.
+                                         Defaults to False.
+            chat_model (optional): Chat model to use instead of the default one.
+                                   Defaults to None.
+            defer (bool, optional): Skip the LLM extraction so it can be run
+                                    later, e.g. by structure_batch. Defaults to False.
+            cache_mode (str, optional): LLM response cache mode ("use", "bypass"
+                                        or "refresh"). Defaults to None.
+            classifiers (List[str], optional): Folders of local section
+                                               classifiers used to label rows.
+                                               Defaults to SECTION_CLASSIFIER_PATHS.
+            classifier_mode (str, optional): "fill" missing labels or "override"
+                                             the LLM labels. Defaults to
+                                             SECTION_CLASSIFIER_MODE.
+            max_tokens (int, optional): Token budget of the content sent in one
+                                        request. Defaults to LLM_CHUNK_TOKENS.
+            reuse (str, optional): Reuse rows of previously extracted sections
+                                   that are identical ("exact") or similar
+                                   ("near"), or never ("off"). Defaults to None.
+            stream (bool, optional): Stream LLM responses and parse their rows
+                                     incrementally. Defaults to LLM_STREAM.
+            on_row (Callable[[DFSchema], None], optional): Called with each
+                                     classified row as soon as it is extracted,
+                                     before the other rows of its block when
+                                     streaming. Defaults to None.
+            outcome_rules (str, optional): Fill ("fill"), cross-check
+                                     ("check") or override ("override")
+                                     outcome measures with the rule-based
+                                     extractor, or not ("off"). Defaults to
+                                     OUTCOME_RULES_MODE.
+        
+        Raises:
+            RuntimeError: If concurrent is set from a running event loop
         """
         logger.info("Initializing PDFStructurer for document: %s", processed_pdf.pdf_name)
         self.name = processed_pdf.pdf_name
         self.doc = processed_pdf.doc
         self.toc = processed_pdf.toc
-        self.sections = self.section_pages()
-        self.pages = self.retrieve_pages_content()
-        self.data_df = self.structure()
+        self.chat_model = chat_model
+        self.cache_mode = cache_mode
+        self.classifiers = CLASSIFIER_PATHS if classifiers is None else classifiers
+        self.classifier_mode = classifier_mode or CLASSIFIER_MODE
+        self.outcome_rules = outcome_rules or OUTCOME_RULES_MODE
+        self.reuse = reuse
+        self.stream = LLM_STREAM if stream is None else stream
+        self.on_row = on_row
+        self._emitter = None
+        self._reuse_context = None
+        with stage("retrieve"):
+            self.spans = self.section_spans()
+            self.sections = self.section_pages()
+            self.pages = self.retrieve_pages_content()
+            self.chunks = chunk_blocks(
+                self.pages,
+                max_tokens=max_tokens,
+                count=token_counter(getattr(chat_model, "model_name", None)),
+            )
+        if defer:
+            self.data_df = []
+        elif concurrent:
+            _check_no_running_loop("defer=True and await astructure() or astructure_batch")
+            self.data_df = asyncio.run(self.astructure())
+        else:
+            self.data_df = self.structure()
 
     def retrieve_pages_content(self) -> List[str]:
         """
-        Extract and concatenate content from relevant pages in the PDF.
+        Extract the text of each relevant section from the PDF.
         
-        Processes pages sequentially, combining content from consecutive pages
-        into single blocks for better context preservation.
+        Each block runs from the section heading to the heading of the next
+        sibling or higher-level section, across pages if needed, so neither
+        unrelated neighbouring sections nor the end of long sections are
+        sent to the LLM.
         
         Returns:
             List[str]: List of text content from relevant sections
             
         Note:
-            Pages are considered consecutive if their numbers follow directly
+            When a heading cannot be found in the page text, the section
+            starts at the top of its page, and ends at the bottom of the
+            next heading's page, at most SECTION_MAX_PAGES pages on, so its
+            end is not lost. That page is left out when another relevant
+            section's block already starts at its top.
         """
-        logger.info("Retrieving content from relevant pages")
+        logger.info("Retrieving content from relevant sections")
+        # Lets lazily OCR'd documents recognise all relevant pages in parallel
+        self.doc.prefetch(self.sections)
+
+        begins = {}
+        for entry, _, first_page, _ in self.spans:
+            begins.setdefault(first_page, []).append(heading_position(self.doc.page_text(first_page), entry) or 0)
+
         pages = []
-        current_content = ""
-        previous_page = None
-        
-        for page_n in self.sections:
-            logger.debug("Processing page %s", page_n)
-            if previous_page is not None and page_n == previous_page + 1:
-                logger.debug("Concatenating consecutive page %s", page_n)
-                current_content += self.doc.load_page(page_n - 1).get_text()
-            else:
-                if current_content:
-                    pages.append(current_content)
-                current_content = self.doc.load_page(page_n - 1).get_text()
-            
-            previous_page = page_n
-        
-        if current_content:
-            pages.append(current_content)
+        for entry, end_entry, first_page, last_page in self.spans:
+            texts = [self.doc.page_text(page_n) for page_n in range(first_page, last_page + 1)]
+            begin = heading_position(texts[0], entry) or 0
+
+            if end_entry is not None and end_entry[2] == last_page:
+                end = heading_position(texts[-1], end_entry, begin if first_page == last_page else 0)
+                if end is not None:
+                    texts[-1] = texts[-1][:end]
+                elif first_page < last_page and 0 in begins.get(last_page, []):
+                    # The block of the section starting on that page already holds all of it
+                    texts.pop()
+            texts[0] = texts[0][begin:]
+
+            content = "".join(texts)
+            if content.strip():
+                logger.debug("Section '%s' spans pages %d-%d", entry[1], first_page, last_page)
+                pages.append(content)
         
         logger.info("Retrieved content from %s sections", len(pages))
         return pages
-    def section_pages(self) -> list:
+
+    def section_spans(self) -> List[Tuple[list, Optional[list], int, int]]:
         """
-        Identify pages containing relevant sections (objectives/endpoints).
+        Identify the relevant sections (objectives/endpoints) and the pages they span.
         
-        Scans through the table of contents to find pages that contain
-        sections related to objectives or endpoints.
+        Uses the TOC hierarchy, from the outline levels or the dotted
+        numbering, to find the heading following each relevant section.
         
         Returns:
-            list: List of page numbers containing relevant sections
+            List[Tuple[list, Optional[list], int, int]]: TOC entry of each
+            section, entry of the heading ending it, and first and last page
         """
-        logger.info("Identifying relevant section pages")
-        section_pages = []
+        logger.info("Identifying relevant sections")
+        spans = []
 
-        for element in self.toc:
-            if matching_section(element[1]):
-                if element[2] not in section_pages:
-                    logger.debug("Found relevant section on page %s: %s", element[2], element[1])
-                    section_pages.append(element[2])
+        for entry, end_entry in section_spans(self.toc):
+            first_page = entry[2]
+            if not 1 <= first_page <= self.doc.page_count:
+                logger.warning("Section '%s' points to page %s outside the document", entry[1], first_page)
+                continue
+            last_page = self.doc.page_count if end_entry is None else max(first_page, end_entry[2])
+            last_page = min(last_page, first_page + SECTION_MAX_PAGES - 1, self.doc.page_count)
+            logger.debug("Found relevant section on pages %s-%s: %s", first_page, last_page, entry[1])
+            spans.append((entry, end_entry, first_page, last_page))
+
+        logger.info("Found %s relevant sections", len(spans))
+        return spans
+
+    def section_pages(self) -> list:
+        """
+        Identify pages containing relevant sections (objectives/endpoints).
         
-        logger.info("Found %s relevant section pages", len(section_pages))
-        return section_pages
+        Returns:
+            list: Sorted page numbers covered by the relevant sections
+        """
+        return sorted({
+            page_n
+            for _, _, first_page, last_page in self.spans
+            for page_n in range(first_page, last_page + 1)
+        })
+
     def parse_schema_data(self, llm_response: str) -> str:
         """
         Clean and format the LLM response for JSON parsing.
         
-        Removes markdown formatting and unnecessary characters from the
-        LLM response to prepare it for JSON parsing.
+        Removes the markdown code fence the LLM wraps its answer in, leaving
+        the JSON itself, including statement text, untouched.
         
         Args:
             llm_response (str): Raw response from the LLM
@@ -119,12 +307,268 @@ class PDFStructurer:
             str: Cleaned response ready for JSON parsing
         """
         logger.debug("Cleaning LLM response for parsing")
-        llm_response = llm_response.replace("json", "")
-        llm_response = llm_response.replace("```", "")
-        llm_response = llm_response.replace("\n", "")
+        return FENCE_PATTERN.sub("", llm_response)
+
+    def element_row(self, i: int, element: dict) -> Optional[DFSchema]:
+        """
+        Validate one element of the LLM answer and convert it to a DFSchema row.
         
-        return llm_response
+        Args:
+            i (int): Index of the content block
+            element (dict): Element of the "data" array
+            
+        Returns:
+            Optional[DFSchema]: The row, None if the element is invalid
+        """
+        try:
+            statement = LLMSchema(**element)
+        except (ValidationError, TypeError) as e:
+            count("invalid_rows")
+            logger.error("Skipping invalid element in content block %d: %s", i + 1, e)
+            return None
+        return self.statement_row(statement)
+
+    def statement_row(self, statement: LLMSchema) -> DFSchema:
+        """
+        Convert a validated statement of the LLM answer to a DFSchema row of this document.
+        
+        Args:
+            statement (LLMSchema): Statement extracted by the LLM
+            
+        Returns:
+            DFSchema: The row
+        """
+        fields = statement.model_dump(include=set(LLMSchema.model_fields))
+        return DFSchema(name=self.name, section_level_0="objectives-endpoints-section", **fields)
     
+    def parse_block(self, i: int, llm_response: str) -> Tuple[List[DFSchema], bool]:
+        """
+        Parse the LLM response for one content block into DFSchema rows.
+        
+        A response that is not valid JSON, e.g. cut off by the output token
+        limit, still gives the rows of the elements it completed.
+        
+        Args:
+            i (int): Index of the content block
+            llm_response (str): Raw response from the LLM
+            
+        Returns:
+            Tuple[List[DFSchema], bool]: Rows extracted from the block, and
+            whether the response was complete
+        """
+        complete = True
+        try:
+            parsed_response = self.parse_schema_data(llm_response)
+            elements = json.loads(parsed_response, strict=False).get("data", [])
+        except json.JSONDecodeError as e:
+            count("json_parse_failures")
+            complete = False
+            elements = JSONRowParser().feed(llm_response)
+            logger.error(
+                "Failed to parse JSON from LLM response in content block %d: %s, recovered %d complete elements",
+                i + 1, e, len(elements)
+            )
+        except Exception as e:
+            logger.error("Unexpected error processing content block %d: %s", i+1, e)
+            return [], False
+
+        data = [row for row in (self.element_row(i, element) for element in elements) if row is not None]
+        logger.debug("Successfully processed %d elements from content block %d", len(data), i + 1)
+        return data, complete
+
+    def _feed(self, i: int, parser: JSONRowParser, piece: str, rows: List[DFSchema]):
+        with stage("parse"):
+            for element in parser.feed(piece):
+                row = self.element_row(i, element)
+                if row is not None:
+                    rows.append(row)
+                    if self._emitter is not None:
+                        # Streamed rows are passed on one by one, as soon as they are complete
+                        self._emitter.rows(i, [row])
+
+    def _stream_complete(self, i: int, parser: JSONRowParser, rows: List[DFSchema]) -> bool:
+        if not parser.complete:
+            count("json_parse_failures")
+            logger.error("Incomplete LLM response in content block %d, kept %d complete rows", i + 1, len(rows))
+        return parser.complete
+
+    def stream_block(self, i: int, chunk: Chunk) -> Tuple[List[DFSchema], bool]:
+        """
+        Extract the rows of a content block from a streamed LLM response.
+        
+        Each element of the answer is validated and passed on as soon as
+        its object is closed. If the stream stops early, the rows completed
+        before are kept.
+        
+        Args:
+            i (int): Index of the content block
+            chunk (Chunk): Content block
+            
+        Returns:
+            Tuple[List[DFSchema], bool]: Rows extracted from the block, and
+            whether the response was complete
+        """
+        parser = JSONRowParser()
+        rows: List[DFSchema] = []
+        try:
+            for piece in llm_stream(text=chunk.text, model=self.chat_model, cache_mode=self.cache_mode):
+                self._feed(i, parser, piece, rows)
+        except Exception as e:
+            logger.error("LLM stream failed in content block %d: %s", i + 1, e)
+        return rows, self._stream_complete(i, parser, rows)
+
+    async def astream_block(self, i: int, chunk: Chunk) -> Tuple[List[DFSchema], bool]:
+        """
+        Asynchronous version of stream_block.
+        """
+        parser = JSONRowParser()
+        rows: List[DFSchema] = []
+        try:
+            async for piece in allm_stream(text=chunk.text, model=self.chat_model, cache_mode=self.cache_mode):
+                self._feed(i, parser, piece, rows)
+        except Exception as e:
+            logger.error("LLM stream failed in content block %d: %s", i + 1, e)
+        return rows, self._stream_complete(i, parser, rows)
+
+    def classify(self, data: List[DFSchema]) -> List[DFSchema]:
+        """
+        Fill or override section labels with the local classifiers, and outcome measures with the rules, if any.
+        
+        Args:
+            data (List[DFSchema]): Rows extracted by the LLM
+            
+        Returns:
+            List[DFSchema]: The rows with their labels updated
+        """
+        if not data:
+            return data
+        if self.classifiers:
+            classifiers = [load_classifier(model_dir) for model_dir in self.classifiers]
+            data = classify_rows(data, classifiers, mode=self.classifier_mode)
+        return apply_outcome_rules(data, mode=self.outcome_rules)
+
+    def reuse_context(self) -> str:
+        """
+        Return the key of the prompts and chat model used, under which rows are stored for reuse.
+        
+        Returns:
+            str: Key computed by extraction_key
+        """
+        if self._reuse_context is None:
+            self._reuse_context = extraction_key(self.chat_model)
+        return self._reuse_context
+
+    def reuse_rows(self, i: int, chunk: Chunk) -> Optional[List[DFSchema]]:
+        """
+        Look up the rows of an identical or similar section extracted before.
+        
+        Only rows extracted with the same prompts and chat model are reused.
+        Skipped when the LLM cache is bypassed or refreshed, so these modes
+        always query the model.
+        
+        Args:
+            i (int): Index of the content block
+            chunk (Chunk): Content block
+            
+        Returns:
+            Optional[List[DFSchema]]: Reused rows, None if there is no match
+        """
+        if (self.cache_mode or get_response_cache().mode) != "use":
+            return None
+        if (self.reuse or get_section_index().mode) == "off":
+            return None
+        match = get_section_index().lookup(chunk.text, mode=self.reuse, context=self.reuse_context())
+        if match is None:
+            return None
+        count("reused_blocks")
+        logger.info(
+            "Reusing %d rows for content block %d from a %s section (similarity %.2f)",
+            len(match.rows), i + 1, "identical" if match.exact else "similar", match.similarity
+        )
+        return [DFSchema(name=self.name, **row) for row in match.rows]
+
+    def store_rows(self, chunk: Chunk, rows: List[DFSchema]):
+        """
+        Store the rows extracted from a content block for later reuse.
+        
+        Args:
+            chunk (Chunk): Content block
+            rows (List[DFSchema]): Rows extracted from the block
+        """
+        if not rows or (self.cache_mode or get_response_cache().mode) == "bypass":
+            return
+        if (self.reuse or get_section_index().mode) == "off":
+            return
+        get_section_index().add(chunk.text, [row.model_dump(exclude={"name"}) for row in rows], context=self.reuse_context())
+
+    def _start_emitting(self):
+        self._emitter = None if self.on_row is None else _RowEmitter(self.chunks, self.on_row, self.classify)
+
+    def _finish_block(self, i: int, rows: List[DFSchema], emitted: bool = False):
+        if self._emitter is None:
+            return
+        if not emitted:
+            self._emitter.rows(i, rows)
+        self._emitter.finish(i, rows)
+
+    def _finish_structure(self, chunk_rows: List[List[DFSchema]], classify: bool = True) -> list:
+        data = merge_chunk_rows(self.chunks, chunk_rows)
+        logger.info("Completed structured data extraction. Processed %d total elements", len(data))
+        if self._emitter is not None:
+            # Rows were classified as they were passed on
+            self._emitter = None
+            return data
+        return self.classify(data) if classify else data
+
+    def extract_block(self, i: int, chunk: Chunk) -> List[DFSchema]:
+        """
+        Extract the rows of one content block, reusing those of a known section if possible.
+        
+        Args:
+            i (int): Index of the content block
+            chunk (Chunk): Content block
+            
+        Returns:
+            List[DFSchema]: Rows extracted from the block
+        """
+        reused = self.reuse_rows(i, chunk)
+        if reused is not None:
+            self._finish_block(i, reused)
+            return reused
+        count("llm_blocks")
+        if self.stream:
+            rows, complete = self.stream_block(i, chunk)
+        else:
+            try:
+                llm_response = llm_call(text=chunk.text, model=self.chat_model, cache_mode=self.cache_mode)
+            except Exception as e:
+                logger.error("Unexpected error processing content block %d: %s", i+1, e)
+                self._finish_block(i, [])
+                return []
+            with stage("parse"):
+                rows, complete = self.parse_block(i, llm_response)
+        if complete:
+            self.store_rows(chunk, rows)
+        self._finish_block(i, rows, emitted=self.stream)
+        return rows
+
+    def packable_blocks(self) -> List[int]:
+        """
+        Find the content blocks short enough to share a request with blocks of other documents.
+        
+        Blocks split over several chunks are never packed, so the rows
+        repeated by their overlap are still dropped.
+        
+        Returns:
+            List[int]: Indices of the packable blocks
+        """
+        return [
+            i for i, chunk in enumerate(self.chunks)
+            if chunk.tokens <= PACK_BLOCK_TOKENS
+            and not chunk.continued
+            and not (i + 1 < len(self.chunks) and self.chunks[i + 1].continued)
+        ]
+
     def structure(self) -> list:
         """
         Process PDF content into structured data format.
@@ -134,38 +578,316 @@ class PDFStructurer:
         
         Returns:
             list: List of DFSchema objects containing structured data
-            
-        Raises:
-            json.JSONDecodeError: If LLM response cannot be parsed as JSON
-            KeyError: If required fields are missing from parsed data
         """
         logger.info("Starting structured data extraction")
-        data = []
+        self._start_emitting()
+        chunk_rows = []
         
-        for i, page in enumerate(self.pages):
+        for i, chunk in enumerate(self.chunks):
+            logger.debug("Processing content block %d/%d", i + 1, len(self.chunks))
+            chunk_rows.append(self.extract_block(i, chunk))
+
+        return self._finish_structure(chunk_rows)
+
+    async def _aextract_block(self, i: int, chunk: Chunk) -> List[DFSchema]:
+        reused = self.reuse_rows(i, chunk)
+        if reused is not None:
+            self._finish_block(i, reused)
+            return reused
+        count("llm_blocks")
+        if self.stream:
+            rows, complete = await self.astream_block(i, chunk)
+        else:
             try:
-                logger.debug("Processing content block %d/%d", i + 1, len(self.pages))
-                llm_response = llm_call(text=page)
-                parsed_response = self.parse_schema_data(llm_response)
-                parsed_json = json.loads(parsed_response)
-                parsed_data = parsed_json.get("data", [])
-
-                for element in parsed_data:
-                    data.append(
-                        DFSchema(
-                            name=self.name,
-                            section_level_0="objectives-endpoints-section",
-                            **element)
-                    )
-                logger.debug("Successfully processed %d elements from content block %d", len(parsed_data), i + 1)
-                
-            except json.JSONDecodeError as e:
-                logger.error("Failed to parse JSON from LLM response in content block %d: %s", i+1, e)
-            except KeyError as e:
-                logger.error("Missing required field in parsed data from content block %d: %s", i+1, e)
-            except Exception as e:
-                logger.error("Unexpected error processing content block %d: %s", i+1, e)
+                llm_response = await allm_call(text=chunk.text, model=self.chat_model, cache_mode=self.cache_mode)
+            except Exception:
+                self._finish_block(i, [])
+                raise
+            with stage("parse"):
+                rows, complete = self.parse_block(i, llm_response)
+        if complete:
+            self.store_rows(chunk, rows)
+        self._finish_block(i, rows, emitted=self.stream)
+        return rows
 
-        logger.info("Completed structured data extraction. Processed %d total elements", len(data))
-        return data
-    
\ No newline at end of file
+    async def _apacked_block(self, i: int, chunk: Chunk, packed: Awaitable[Optional[List[DFSchema]]]) -> List[DFSchema]:
+        rows = await packed
+        if rows is None:
+            logger.info("Retrying content block %d of %s on its own", i + 1, self.name)
+            return await self._aextract_block(i, chunk)
+        self._finish_block(i, rows)
+        return rows
+
+    async def astructure(self, packed: Optional[Dict[int, Awaitable[Optional[List[DFSchema]]]]] = None, classify: bool = True) -> list:
+        """
+        Process PDF content into structured data format with concurrent LLM calls.
+        
+        Sends every content block at the same time, within the global
+        concurrency limit of ``src.llm``, and keeps the rows in block order.
+        
+        Args:
+            packed (Dict[int, Awaitable[Optional[List[DFSchema]]]], optional):
+                Rows of blocks answered by packed requests, keyed by block
+                index. Blocks whose packed request failed, giving None, are
+                sent on their own. Defaults to None.
+            classify (bool, optional): Label the rows with the classifiers
+                and outcome rules. Turned off by astructure_batch, which
+                labels the rows of all documents together. Defaults to True.
+        
+        Returns:
+            list: List of DFSchema objects containing structured data
+        """
+        logger.info("Starting concurrent structured data extraction of %d content blocks", len(self.chunks))
+        self._start_emitting()
+        packed = packed or {}
+        results = await asyncio.gather(
+            *(
+                self._apacked_block(i, chunk, packed[i]) if i in packed else self._aextract_block(i, chunk)
+                for i, chunk in enumerate(self.chunks)
+            ),
+            return_exceptions=True,
+        )
+
+        chunk_rows = []
+        for i, rows in enumerate(results):
+            if isinstance(rows, BaseException):
+                logger.error("Unexpected error processing content block %d: %s", i+1, rows)
+                chunk_rows.append([])
+                continue
+            chunk_rows.append(rows)
+
+        return self._finish_structure(chunk_rows, classify=classify)
+
+
+def pack_requests(blocks: List[Tuple[PDFStructurer, int]], max_tokens: int, count: Callable[[str], int]) -> List[List[Tuple[PDFStructurer, int]]]:
+    """
+    Group content blocks of several documents into requests up to a token budget.
+    
+    Blocks are taken in order and added to the current request until the
+    next one would exceed the budget, counting the header of each block.
+    
+    Args:
+        blocks (List[Tuple[PDFStructurer, int]]): Structurer and index of each block
+        max_tokens (int): Token budget of the content sent in one request
+        count (Callable[[str], int]): Token counter
+        
+    Returns:
+        List[List[Tuple[PDFStructurer, int]]]: Blocks of each request
+    """
+    header_tokens = count("### Block B000\n\n")
+    requests = []
+    current: List[Tuple[PDFStructurer, int]] = []
+    tokens = 0
+    for structurer, i in blocks:
+        block_tokens = structurer.chunks[i].tokens + header_tokens
+        if current and tokens + block_tokens > max_tokens:
+            requests.append(current)
+            current, tokens = [], 0
+        current.append((structurer, i))
+        tokens += block_tokens
+    if current:
+        requests.append(current)
+    return requests
+
+
+def parse_packed_response(llm_response: str, block_ids: List[str]) -> Optional[Dict[str, List[LLMSchema]]]:
+    """
+    Split the answer to a packed request into the statements of each block.
+    
+    Args:
+        llm_response (str): Raw response from the LLM
+        block_ids (List[str]): Identifiers of the blocks sent
+        
+    Returns:
+        Optional[Dict[str, List[LLMSchema]]]: Statements keyed by block id,
+        None if the answer is not valid JSON, an element fails validation or
+        refers to an unknown block
+    """
+    try:
+        parsed = json.loads(FENCE_PATTERN.sub("", llm_response), strict=False)
+        output = PackedLLMOutput.model_validate(parsed)
+    except json.JSONDecodeError as e:
+        count("json_parse_failures")
+        logger.error("Failed to parse JSON from packed LLM response: %s", e)
+        return None
+    except ValidationError as e:
+        logger.error("Packed LLM response failed validation: %s", e)
+        return None
+
+    statements: Dict[str, List[LLMSchema]] = {block_id: [] for block_id in block_ids}
+    for statement in output.data:
+        block_id = statement.block_id.strip()
+        if block_id not in statements:
+            logger.error("Packed LLM response refers to unknown block '%s'", statement.block_id)
+            return None
+        statements[block_id].append(statement)
+    return statements
+
+
+async def _arequest_packed(blocks: List[Tuple[PDFStructurer, int]]) -> Optional[List[List[DFSchema]]]:
+    """Send blocks of several documents in one request, returning the rows of each block or None on failure."""
+    from src.prompt import packed_prompt_template
+
+    first = blocks[0][0]
+    block_ids = [f"B{k + 1}" for k in range(len(blocks))]
+    text = "\n\n".join(
+        f"### Block {block_id}\n{structurer.chunks[i].text}" for block_id, (structurer, i) in zip(block_ids, blocks)
+    )
+    count("llm_blocks", len(blocks))
+    count("packed_blocks", len(blocks))
+    try:
+        llm_response = await allm_call(
+            text=text, model=first.chat_model, cache_mode=first.cache_mode, prompt=packed_prompt_template
+        )
+    except Exception as e:
+        logger.error("Packed request of %d content blocks failed: %s", len(blocks), e)
+        return None
+
+    with stage("parse"):
+        statements = parse_packed_response(llm_response, block_ids)
+    if statements is None:
+        return None
+    block_rows = []
+    for block_id, (structurer, i) in zip(block_ids, blocks):
+        rows = [structurer.statement_row(statement) for statement in statements[block_id]]
+        structurer.store_rows(structurer.chunks[i], rows)
+        block_rows.append(rows)
+    logger.info("Packed request answered %d content blocks from %d documents", len(blocks), len({id(s) for s, _ in blocks}))
+    return block_rows
+
+
+async def _resolved(rows: Optional[List[DFSchema]]) -> Optional[List[DFSchema]]:
+    return rows
+
+
+async def _packed_rows(request: Awaitable[Optional[List[List[DFSchema]]]], k: int) -> Optional[List[DFSchema]]:
+    rows = await request
+    return None if rows is None else rows[k]
+
+
+def start_packed_requests(structurers: List[PDFStructurer], max_tokens: Optional[int] = None) -> List[Dict[int, Awaitable[Optional[List[DFSchema]]]]]:
+    """
+    Send the short content blocks of several documents in shared requests.
+    
+    Blocks reusing the rows of a known section are not sent. Blocks are
+    only packed with blocks of documents using the same chat model and
+    cache mode, and a block left alone in its request is sent as usual.
+    Must be called from a running event loop.
+    
+    Args:
+        structurers (List[PDFStructurer]): Structurers created with ``defer=True``
+        max_tokens (int, optional): Token budget of the content sent in one
+                                    request. Defaults to LLM_CHUNK_TOKENS.
+        
+    Returns:
+        List[Dict[int, Awaitable[Optional[List[DFSchema]]]]]: For each
+        structurer, the rows of its packed blocks keyed by block index, to
+        be passed to astructure
+    """
+    packed: List[Dict[int, Awaitable[Optional[List[DFSchema]]]]] = [{} for _ in structurers]
+    candidates: Dict[tuple, List[Tuple[PDFStructurer, int]]] = {}
+    for k, structurer in enumerate(structurers):
+        for i in structurer.packable_blocks():
+            reused = structurer.reuse_rows(i, structurer.chunks[i])
+            if reused is not None:
+                packed[k][i] = _resolved(reused)
+                continue
+            candidates.setdefault((id(structurer.chat_model), structurer.cache_mode), []).append((structurer, i))
+
+    index = {id(structurer): k for k, structurer in enumerate(structurers)}
+    for blocks in candidates.values():
+        model_name = getattr(blocks[0][0].chat_model, "model_name", None)
+        for request_blocks in pack_requests(blocks, max_tokens or CHUNK_TOKENS, token_counter(model_name)):
+            if len(request_blocks) < 2:
+                continue
+            request = asyncio.ensure_future(_arequest_packed(request_blocks))
+            for k, (structurer, i) in enumerate(request_blocks):
+                packed[index[id(structurer)]][i] = _packed_rows(request, k)
+    return packed
+
+
+def classify_batch(structurers: List[PDFStructurer]) -> List[PDFStructurer]:
+    """
+    Label the rows of several documents together.
+    
+    Each classifier labels the statements of every document sharing its
+    settings in one call, so a few padded forward passes cover the whole
+    batch instead of a few per document, and the outcome rules scan the
+    statements of every document in one pass. Structurers passing their rows on
+    as they are extracted already labelled them and are skipped.
+    
+    Args:
+        structurers (List[PDFStructurer]): Structurers whose ``data_df`` was
+                                           extracted without being labelled
+        
+    Returns:
+        List[PDFStructurer]: The same structurers, with their rows updated in place
+    """
+    pending = [structurer for structurer in structurers if structurer.on_row is None and structurer.data_df]
+    groups: Dict[tuple, List[PDFStructurer]] = {}
+    for structurer in pending:
+        if structurer.classifiers:
+            groups.setdefault((tuple(structurer.classifiers), structurer.classifier_mode), []).append(structurer)
+    for (model_dirs, mode), group in groups.items():
+        classifiers = [load_classifier(model_dir) for model_dir in model_dirs]
+        classify_rows([row for structurer in group for row in structurer.data_df], classifiers, mode=mode)
+    outcome_rows: Dict[str, List[DFSchema]] = {}
+    for structurer in pending:
+        outcome_rows.setdefault(structurer.outcome_rules, []).extend(structurer.data_df)
+    for mode, rows in outcome_rows.items():
+        apply_outcome_rules(rows, mode=mode)
+    return structurers
+
+
+async def astructure_batch(structurers: List[PDFStructurer], pack: bool = False, max_tokens: Optional[int] = None) -> List[PDFStructurer]:
+    """
+    Extract structured data for several documents with all blocks in flight at once.
+    
+    The rows of all documents are labelled together once extracted, see
+    classify_batch.
+    
+    Args:
+        structurers (List[PDFStructurer]): Structurers created with ``defer=True``
+        pack (bool, optional): Send short blocks of different documents in
+                               shared requests, see start_packed_requests.
+                               Defaults to False.
+        max_tokens (int, optional): Token budget of packed requests.
+                                    Defaults to LLM_CHUNK_TOKENS.
+        
+    Returns:
+        List[PDFStructurer]: The same structurers, with ``data_df`` filled in
+    """
+    packed = start_packed_requests(structurers, max_tokens) if pack else [None] * len(structurers)
+    results = await asyncio.gather(
+        *(structurer.astructure(blocks, classify=False) for structurer, blocks in zip(structurers, packed))
+    )
+    for structurer, data in zip(structurers, results):
+        structurer.data_df = data
+    return classify_batch(structurers)
+
+
+def structure_batch(processed_pdfs: List[PDFProcessor], chat_model=None, max_tokens: Optional[int] = None, pack: bool = False) -> List[PDFStructurer]:
+    """
+    Structure a batch of processed PDFs, sending the blocks of every document concurrently.
+    
+    Args:
+        processed_pdfs (List[PDFProcessor]): Processed PDF documents
+        chat_model (optional): Chat model to use instead of the default one.
+                               Defaults to None.
+        max_tokens (int, optional): Token budget of the content sent in one
+                                    request. Defaults to LLM_CHUNK_TOKENS.
+        pack (bool, optional): Send short blocks of different documents in
+                               shared requests. Defaults to False.
+        
+    Returns:
+        List[PDFStructurer]: One structurer per document, in input order
+        
+    Raises:
+        RuntimeError: If called from a running event loop
+    """
+    _check_no_running_loop("await astructure_batch")
+    structurers = [
+        PDFStructurer(processed_pdf, chat_model=chat_model, defer=True, max_tokens=max_tokens)
+        for processed_pdf in processed_pdfs
+    ]
+    return asyncio.run(astructure_batch(structurers, pack=pack, max_tokens=max_tokens))
@@ -1,18 +1,29 @@
-
-from src.data_models import LLMOutput
+from src.data_models import LLMOutput, PackedLLMOutput
 
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 
 
 parser = JsonOutputParser(pydantic_object=LLMOutput)
+packed_parser = JsonOutputParser(pydantic_object=PackedLLMOutput)
+
+# Labels the model may assign, also used to validate its answers
+LABEL_CHOICES = {
+    "section_level_1": ("primary-objective", "secondary-objective", "exploratory-objective"),
+    "section_level_2": ("efficacy-objective", "safety-and-tolerability-objective", "pharmacokinetic-objective"),
+}
+
+
+def label_instruction(field: str) -> str:
+    return f"Assign a class for the category `{field}` (choices: {', '.join(LABEL_CHOICES[field])})."
+
 
 prompt_template = PromptTemplate(
     input_variables=["text"],
     template=("""
         Extract each objective and endpoint from the following text as individual statements. For each statement:
-        1. Assign a class for the category `section_level_1` (choices: primary-objective, secondary-objective, exploratory-objective).
-        2. Assign a class for the category `section_level_2` (choices: efficacy-objective, safety-and-tolerability-objective, pharmacokinetic-objective).
+        1. """ + label_instruction("section_level_1") + """
+        2. """ + label_instruction("section_level_2") + """
         3. Assign an outcome measure (e.g., PFS, DCR, OS, Quality of Life, Safety and tolerability, Pharmacokinetics, ORR).
         {format_instructions}
         
@@ -21,3 +32,22 @@ prompt_template = PromptTemplate(
     """),
     partial_variables={"format_instructions": parser.get_format_instructions()},
 )
+
+# Several short blocks, each from its own document, answered in one request
+packed_prompt_template = PromptTemplate(
+    input_variables=["text"],
+    template=("""
+        The following text holds several independent blocks, each starting with a line "### Block <id>".
+        Extract each objective and endpoint from every block as individual statements. For each statement:
+        1. Give the `block_id` of the block it comes from, exactly as written after "### Block".
+        2. """ + label_instruction("section_level_1") + """
+        3. """ + label_instruction("section_level_2") + """
+        4. Assign an outcome measure (e.g., PFS, DCR, OS, Quality of Life, Safety and tolerability, Pharmacokinetics, ORR).
+        Never mix statements of different blocks.
+        {format_instructions}
+        
+        Text: 
+        {text}
+    """),
+    partial_variables={"format_instructions": packed_parser.get_format_instructions()},
+)
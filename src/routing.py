@@ -0,0 +1,277 @@
+import json
+import logging
+import threading
+import time
+from typing import List, Optional
+
+from src.json_stream import FENCE_PATTERN
+from src.timing import count
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+
+def model_label(model) -> str:
+    """Return the name of a chat model, e.g. "gpt-4o" or "llama3.1:8b"."""
+    return getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__
+
+
+def create_chat_model(spec: str):
+    """
+    Create a chat model from its specification.
+
+    Args:
+        spec (str): Model name, optionally prefixed by its provider, e.g.
+                    "gpt-4o-mini", "openai:gpt-4o" or "ollama:llama3.1:8b"
+                    for a local Ollama server
+
+    Returns:
+        Chat model with temperature 0
+
+    Raises:
+        ValueError: If the provider is unknown
+    """
+    provider, _, name = spec.partition(":")
+    if not name:
+        provider, name = "openai", provider
+    if provider == "openai":
+        from langchain.chat_models import ChatOpenAI
+
+        return ChatOpenAI(model=name, temperature=0.0)
+    if provider == "ollama":
+        from langchain_community.chat_models import ChatOllama
+
+        return ChatOllama(model=name, temperature=0.0)
+    raise ValueError(f"Unknown chat model provider '{provider}' in '{spec}', expected openai or ollama")
+
+
+def count_tokens(model, messages: list, response):
+    """Count the prompt and completion tokens of a response, estimating them when the model does not report usage."""
+    usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    if usage:
+        prompt_tokens, completion_tokens = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    else:
+        from src.chunker import token_counter
+
+        counter = token_counter(getattr(model, "model_name", None))
+        prompt_tokens = sum(counter(message.content) for message in messages)
+        completion_tokens = counter(response.content)
+    count("prompt_tokens", prompt_tokens)
+    count("completion_tokens", completion_tokens)
+
+
+def build_chat_model(specs: List[str]):
+    """
+    Create the chat model of one tier, or a TieredChatModel trying several in turn.
+
+    Args:
+        specs (List[str]): Model specifications from the cheapest to the
+                           strongest, see create_chat_model
+
+    Returns:
+        Chat model
+    """
+    if not specs:
+        raise ValueError("At least one chat model is needed")
+    if len(specs) == 1:
+        return create_chat_model(specs[0])
+    return TieredChatModel([create_chat_model(spec) for spec in specs], names=specs)
+
+
+def validate_output(content: str) -> Optional[str]:
+    """
+    Check an extraction answer against LLMOutput and the label vocabularies of the prompt.
+
+    Args:
+        content (str): Raw response of the model
+
+    Returns:
+        Optional[str]: Why the answer is rejected, None if it is valid
+    """
+    from pydantic import ValidationError
+
+    from src.data_models import LLMOutput
+    from src.prompt import LABEL_CHOICES
+
+    try:
+        output = LLMOutput.model_validate(json.loads(FENCE_PATTERN.sub("", content), strict=False))
+    except json.JSONDecodeError as e:
+        return f"invalid JSON ({e})"
+    except ValidationError as e:
+        return f"{e.error_count()} schema errors"
+    if not output.data:
+        return "no statements"
+    for statement in output.data:
+        for field, choices in LABEL_CHOICES.items():
+            value = getattr(statement, field)
+            if value not in choices:
+                return f"unknown {field} '{value}'"
+    return None
+
+
+class TierStats:
+    """
+    Outcome of the requests sent to one tier.
+
+    Attributes:
+        requests (int): Requests sent to the tier
+        accepted (int): Valid answers, returned without escalating
+        errors (int): Requests that failed
+        seconds (float): Total time spent waiting for the tier
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.accepted = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.accepted / self.requests if self.requests else 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.seconds / self.requests if self.requests else 0.0
+
+
+class TieredChatModel:
+    """
+    A chat model routing each request from the cheapest model to the strongest.
+
+    Every answer is checked with validate_output. Answers that fail, are
+    empty, or requests that raise are escalated to the next tier, and the
+    answer of the last tier is returned whatever it is. Can be used
+    wherever a chat model is expected, e.g. as the default model with
+    LLM_TIERS or as the chat_model of PDFStructurer. Streaming is buffered,
+    as an answer is only known to be kept once it is complete. Tokens of
+    rejected answers are counted here, those of the returned answer by the
+    caller, so the counters cover every tier.
+
+    Attributes:
+        models (list): Chat model of each tier
+        names (List[str]): Name of each tier
+        model_name (str): Name used in LLM cache keys, listing the tiers
+        temperature (float): Sampling temperature used in LLM cache keys
+        stats (List[TierStats]): Outcome of the requests sent to each tier
+    """
+
+    def __init__(self, models: list, names: Optional[List[str]] = None):
+        """
+        Initialize the router.
+
+        Args:
+            models (list): Chat models from the cheapest to the strongest
+            names (List[str], optional): Name of each tier. Defaults to the
+                                         model names.
+        """
+        if not models:
+            raise ValueError("At least one chat model is needed")
+        self.models = list(models)
+        self.names = list(names) if names is not None else [model_label(model) for model in self.models]
+        self.model_name = "tiered:" + ">".join(self.names)
+        self.temperature = getattr(self.models[-1], "temperature", None) or 0.0
+        self.stats = [TierStats() for _ in self.models]
+        self._lock = threading.Lock()
+
+    def _record(self, tier: int, seconds: float, accepted: bool, error: bool = False):
+        with self._lock:
+            stats = self.stats[tier]
+            stats.requests += 1
+            stats.accepted += accepted
+            stats.errors += error
+            stats.seconds += seconds
+
+    def _log_route(self, tier: int, seconds: float):
+        with self._lock:
+            summary = ", ".join(
+                f"{name} {stats.hit_rate:.0%} of {stats.requests} (mean {stats.mean_seconds:.2f}s)"
+                for name, stats in zip(self.names, self.stats)
+            )
+        logger.info(
+            "Request answered by tier %d/%d (%s) in %.2fs; hit rates: %s",
+            tier + 1, len(self.models), self.names[tier], seconds, summary
+        )
+
+    def _check(self, tier: int, messages: list, response, seconds: float) -> bool:
+        """Record a tier's answer, returning True if it is kept."""
+        reason = validate_output(response.content)
+        self._record(tier, seconds, accepted=reason is None)
+        if reason is None or tier == len(self.models) - 1:
+            if reason is not None:
+                logger.warning("Keeping the answer of the last tier %s despite %s", self.names[tier], reason)
+            return True
+        count_tokens(self.models[tier], messages, response)
+        count("llm_escalations")
+        logger.info("Escalating from tier %s: %s", self.names[tier], reason)
+        return False
+
+    def _failed(self, tier: int, seconds: float, error: Exception):
+        self._record(tier, seconds, accepted=False, error=True)
+        if tier == len(self.models) - 1:
+            raise error
+        count("llm_escalations")
+        logger.warning("Escalating from tier %s after an error: %s", self.names[tier], error)
+
+    def invoke(self, messages: list):
+        """
+        Answer a request with the first tier giving a valid answer.
+
+        Args:
+            messages (list): Chat messages
+
+        Returns:
+            AIMessage: Answer of the tier kept
+        """
+        start = time.perf_counter()
+        for tier, model in enumerate(self.models):
+            tier_start = time.perf_counter()
+            try:
+                response = model.invoke(messages)
+            except Exception as e:
+                self._failed(tier, time.perf_counter() - tier_start, e)
+                continue
+            if self._check(tier, messages, response, time.perf_counter() - tier_start):
+                self._log_route(tier, time.perf_counter() - start)
+                return response
+
+    async def ainvoke(self, messages: list):
+        """
+        Asynchronous version of invoke.
+        """
+        start = time.perf_counter()
+        for tier, model in enumerate(self.models):
+            tier_start = time.perf_counter()
+            try:
+                response = await model.ainvoke(messages)
+            except Exception as e:
+                self._failed(tier, time.perf_counter() - tier_start, e)
+                continue
+            if self._check(tier, messages, response, time.perf_counter() - tier_start):
+                self._log_route(tier, time.perf_counter() - start)
+                return response
+
+    def stream(self, messages: list):
+        """
+        Answer a request as a single streamed piece, once it is validated.
+        """
+        from langchain_core.messages import AIMessageChunk
+
+        response = self.invoke(messages)
+        yield AIMessageChunk(content=response.content, response_metadata=response.response_metadata)
+
+    async def astream(self, messages: list):
+        """
+        Asynchronous version of stream.
+        """
+        from langchain_core.messages import AIMessageChunk
+
+        response = await self.ainvoke(messages)
+        yield AIMessageChunk(content=response.content, response_metadata=response.response_metadata)
@@ -0,0 +1,289 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+REUSE_MODES = ("off", "exact", "near")
+SECTION_INDEX_PATH = os.getenv("SECTION_INDEX_PATH", os.path.join(".cache", "section_index.sqlite"))
+SECTION_REUSE = os.getenv("SECTION_REUSE", "off")
+SECTION_REUSE_THRESHOLD = float(os.getenv("SECTION_REUSE_THRESHOLD", "0.9"))
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+_PRIME = 4294967291
+
+PAGE_MARKER_PATTERN = re.compile(r"-+ Page \d+ -+")
+# Words, and the symbols that change the meaning of a statement, e.g. "≥18 years"
+WORD_PATTERN = re.compile(r"\w+|[<>≤≥=≠±%+−]")
+
+_section_index = None
+
+
+@lru_cache(maxsize=None)
+def _permutations() -> "np.ndarray":
+    import numpy as np
+
+    # Fixed seed so signatures stored by previous runs stay comparable
+    return np.random.RandomState(1).randint(1, _PRIME, size=(2, NUM_PERM)).astype(np.uint64)
+
+
+class Match(NamedTuple):
+    """
+    A stored section matching a new one.
+
+    Attributes:
+        rows (List[dict]): Rows extracted from the stored section, without the document name
+        similarity (float): Estimated Jaccard similarity of the two sections
+        exact (bool): True if the normalised texts are identical
+    """
+    rows: List[dict]
+    similarity: float
+    exact: bool
+
+
+def normalize_text(text: str) -> List[str]:
+    """
+    Split a section text into lowercase words and symbols, ignoring OCR page markers.
+
+    Comparison and percent symbols are kept as tokens of their own, so
+    "aged ≥18 years" and "aged <18 years" differ.
+
+    Args:
+        text (str): Section text
+
+    Returns:
+        List[str]: Normalised words and symbols
+    """
+    return WORD_PATTERN.findall(PAGE_MARKER_PATTERN.sub(" ", text).lower())
+
+
+def text_hash(words: List[str], context: str = "") -> str:
+    """
+    Hash of a normalised text and the context it was extracted in, identical
+    for texts differing only in case, whitespace, punctuation or page markers.
+    """
+    return hashlib.sha256((context + "\0" + " ".join(words)).encode("utf-8")).hexdigest()
+
+
+def minhash(words: List[str]) -> "np.ndarray":
+    """
+    Compute the MinHash signature of the word shingles of a text.
+
+    Args:
+        words (List[str]): Normalised words
+
+    Returns:
+        np.ndarray: NUM_PERM unsigned 32-bit minimums
+    """
+    import numpy as np
+
+    size = min(SHINGLE_SIZE, len(words)) or 1
+    shingles = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    a, b = _permutations()
+    # Values stay below 2**64: hashes and a are 32-bit, b is below the prime
+    permuted = (hashes[:, None] * a[None, :] + b[None, :]) % np.uint64(_PRIME)
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def _band_keys(signature: "np.ndarray", context: str = "") -> List[bytes]:
+    # Sections extracted in another context never share a bucket
+    return [
+        hashlib.blake2b(
+            context.encode("utf-8") + signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes(), digest_size=8
+        ).digest()
+        for band in range(BANDS)
+    ]
+
+
+class SectionIndex:
+    """
+    A persistent similarity index of section texts and their extracted rows.
+
+    Exact matches are found by a hash of the normalised text, near matches
+    by MinHash signatures over word shingles, with locality-sensitive hashing
+    bands so a lookup only compares a handful of candidates even with tens
+    of thousands of stored sections. Sections are stored with a context,
+    e.g. the prompt and model they were extracted with, and only match
+    sections stored with the same context. Backed by SQLite like the LLM response
+    cache, so several processes can share it.
+
+    Attributes:
+        path (str): Path to the SQLite database file
+        mode (str): One of "off", "exact" (reuse identical sections only) or
+            "near" (also reuse sections above the similarity threshold)
+        threshold (float): Minimum estimated Jaccard similarity of a near match
+        hits (int): Number of lookups answered from the index
+        misses (int): Number of lookups without a match
+    """
+
+    def __init__(self, path: str, mode: str = "exact", threshold: float = SECTION_REUSE_THRESHOLD):
+        """
+        Initialize the index, creating the database if needed.
+
+        Args:
+            path (str): Path to the SQLite database file
+            mode (str, optional): Reuse mode. Defaults to "exact".
+            threshold (float, optional): Minimum similarity of a near match.
+                                         Defaults to SECTION_REUSE_THRESHOLD.
+
+        Raises:
+            ValueError: If the mode is not one of REUSE_MODES
+        """
+        if mode not in REUSE_MODES:
+            raise ValueError(f"Unknown reuse mode '{mode}', expected one of {REUSE_MODES}")
+        self.path = path
+        self.mode = mode
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sections ("
+                "id INTEGER PRIMARY KEY, hash TEXT UNIQUE NOT NULL, "
+                "signature BLOB NOT NULL, rows TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bands ("
+                "band INTEGER NOT NULL, bucket BLOB NOT NULL, section_id INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS bands_bucket ON bands (band, bucket)")
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def lookup(self, text: str, mode: Optional[str] = None, context: str = "") -> Optional[Match]:
+        """
+        Find a stored section identical or similar to a text.
+
+        Args:
+            text (str): Section text
+            mode (str, optional): Overrides the reuse mode for this lookup
+            context (str, optional): Context the rows must have been extracted in
+
+        Returns:
+            Optional[Match]: Best match, None if there is none or reuse is off
+        """
+        mode = mode or self.mode
+        if mode == "off":
+            return None
+
+        words = normalize_text(text)
+        match = None
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT rows FROM sections WHERE hash = ?", (text_hash(words, context),)).fetchone()
+            if row is not None:
+                match = Match(json.loads(row[0]), 1.0, True)
+            elif mode == "near" and words:
+                import numpy as np
+
+                signature = minhash(words)
+                candidates = set()
+                for band, bucket in enumerate(_band_keys(signature, context)):
+                    candidates.update(
+                        section_id for (section_id,) in conn.execute(
+                            "SELECT section_id FROM bands WHERE band = ? AND bucket = ?", (band, bucket)
+                        )
+                    )
+                for section_id in candidates:
+                    stored, rows = conn.execute(
+                        "SELECT signature, rows FROM sections WHERE id = ?", (section_id,)
+                    ).fetchone()
+                    similarity = float(np.mean(np.frombuffer(stored, dtype=np.uint32) == signature))
+                    if similarity >= self.threshold and (match is None or similarity > match.similarity):
+                        match = Match(json.loads(rows), similarity, False)
+
+        with self._lock:
+            if match is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if match is not None:
+            logger.debug("Reusing rows of a %s section (similarity %.2f)", "identical" if match.exact else "similar", match.similarity)
+        return match
+
+    def add(self, text: str, rows: List[dict], context: str = ""):
+        """
+        Store the rows extracted from a section text.
+
+        Args:
+            text (str): Section text
+            rows (List[dict]): Extracted rows, without the document name
+            context (str, optional): Context the rows were extracted in
+        """
+        words = normalize_text(text)
+        if not words:
+            return
+        signature = minhash(words)
+        key = text_hash(words, context)
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            existing = conn.execute("SELECT id FROM sections WHERE hash = ?", (key,)).fetchone()
+            if existing is not None:
+                conn.execute("UPDATE sections SET rows = ? WHERE id = ?", (json.dumps(rows), existing[0]))
+            else:
+                section_id = conn.execute(
+                    "INSERT INTO sections (hash, signature, rows, created_at) VALUES (?, ?, ?, ?)",
+                    (key, signature.tobytes(), json.dumps(rows), time.time()),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO bands (band, bucket, section_id) VALUES (?, ?, ?)",
+                    [(band, bucket, section_id) for band, bucket in enumerate(_band_keys(signature, context))],
+                )
+            conn.execute("COMMIT")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the hit and miss counters of this process.
+
+        Returns:
+            Dict[str, int]: Counters keyed by name
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM sections").fetchone()[0]
+
+
+def get_section_index() -> SectionIndex:
+    """Return the process-wide section index, creating it on first use."""
+    global _section_index
+    if _section_index is None:
+        _section_index = SectionIndex(SECTION_INDEX_PATH, mode=SECTION_REUSE, threshold=SECTION_REUSE_THRESHOLD)
+    return _section_index
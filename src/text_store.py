@@ -0,0 +1,399 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import closing
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+TEXT_STORE_MODES = ("use", "bypass", "refresh")
+TEXT_STORE_PATH = os.getenv("TEXT_STORE_PATH", os.path.join(".cache", "page_text.sqlite"))
+TEXT_STORE_MODE = os.getenv("TEXT_STORE_MODE", "use")
+TEXT_STORE_MAX_BYTES = int(os.getenv("TEXT_STORE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Bumped when the way page text is extracted changes, so stale entries are not reused
+TEXT_STORE_VERSION = 1
+
+_text_store = None
+
+
+def extraction_settings(adaptive_ocr: bool = False) -> str:
+    """
+    Describe the settings the extracted text depends on, part of every store key.
+
+    Args:
+        adaptive_ocr (bool, optional): Whether adaptive-resolution OCR is used.
+                                       Defaults to False.
+
+    Returns:
+        str: Settings string, e.g. "v1;ocr-dpi=90"
+    """
+    from src.ocr import ocr_settings
+
+    return f"v{TEXT_STORE_VERSION};{ocr_settings(adaptive_ocr)}"
+
+
+def store_key(content_hash: str, settings: Optional[str] = None) -> str:
+    """
+    Build the key of a document in the store.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the PDF content
+        settings (str, optional): Extraction settings. Defaults to
+                                  extraction_settings().
+
+    Returns:
+        str: Store key
+    """
+    return f"{content_hash}:{settings or extraction_settings()}"
+
+
+class StoredEntry(NamedTuple):
+    """
+    What the store knows about a document besides its page text.
+
+    Attributes:
+        page_count (int): Number of pages
+        outline (list): Embedded outline, empty for documents without one
+        scanned (bool): True if the page text comes from OCR
+    """
+    page_count: int
+    outline: list
+    scanned: bool
+
+
+class TextStore:
+    """
+    A persistent store of the text extracted from each page of a PDF.
+
+    Documents are keyed by the hash of their content and the extraction
+    settings, so a file is never opened nor OCR'd twice for the same
+    settings, whatever its name. Pages are compressed separately and read
+    one at a time, and each way of reading the table of contents is stored
+    next to them. Backed by SQLite like the LLM response cache, so several
+    processes can share it. Documents are evicted least-recently-used first
+    once the compressed page text exceeds the size cap.
+
+    Attributes:
+        path (str): Path to the SQLite database file
+        max_bytes (int): Maximum total size of the compressed page text
+        mode (str): One of "use" (read and write), "bypass" (neither read
+            nor write) or "refresh" (extract again and overwrite)
+        evictions (int): Number of documents evicted to respect the size cap
+    """
+
+    def __init__(self, path: str, mode: str = "use", max_bytes: int = TEXT_STORE_MAX_BYTES):
+        """
+        Initialize the store, creating the database if needed.
+
+        Args:
+            path (str): Path to the SQLite database file
+            mode (str, optional): Store mode. Defaults to "use".
+            max_bytes (int, optional): Size cap in bytes. Defaults to
+                                       TEXT_STORE_MAX_BYTES.
+
+        Raises:
+            ValueError: If the mode is not one of TEXT_STORE_MODES
+        """
+        if mode not in TEXT_STORE_MODES:
+            raise ValueError(f"Unknown text store mode '{mode}', expected one of {TEXT_STORE_MODES}")
+        self.path = path
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.evictions = 0
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "key TEXT PRIMARY KEY, page_count INTEGER NOT NULL, outline TEXT NOT NULL, "
+                "scanned INTEGER NOT NULL, created_at REAL NOT NULL, "
+                "size INTEGER NOT NULL DEFAULT 0, last_access REAL NOT NULL DEFAULT 0)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(documents)")}
+            # Stores created before the size cap: their documents are evicted first
+            for column, definition in (("size", "INTEGER NOT NULL DEFAULT 0"), ("last_access", "REAL NOT NULL DEFAULT 0")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE documents ADD COLUMN {column} {definition}")
+            conn.execute("CREATE INDEX IF NOT EXISTS documents_last_access ON documents (last_access)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "key TEXT NOT NULL, page INTEGER NOT NULL, text BLOB NOT NULL, "
+                "PRIMARY KEY (key, page))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tocs ("
+                "key TEXT NOT NULL, method TEXT NOT NULL, toc TEXT NOT NULL, "
+                "PRIMARY KEY (key, method))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS page_quality ("
+                "key TEXT NOT NULL, page INTEGER NOT NULL, dpi INTEGER NOT NULL, confidence REAL, "
+                "PRIMARY KEY (key, page))"
+            )
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def document(self, key: str) -> Optional[StoredEntry]:
+        """
+        Look up a document and mark it as recently used.
+
+        Args:
+            key (str): Store key built by store_key
+
+        Returns:
+            Optional[StoredEntry]: Page count, outline and kind of the
+            document, None if it is not stored
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT page_count, outline, scanned FROM documents WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE documents SET last_access = ? WHERE key = ?", (time.time(), key))
+        if row is None:
+            return None
+        return StoredEntry(row[0], json.loads(row[1]), bool(row[2]))
+
+    def add_document(self, key: str, page_count: int, outline: list, scanned: bool):
+        """
+        Store a document, dropping the pages and tables of contents stored for it before.
+
+        Args:
+            key (str): Store key built by store_key
+            page_count (int): Number of pages
+            outline (list): Embedded outline
+            scanned (bool): True if the page text comes from OCR
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            conn.execute("DELETE FROM tocs WHERE key = ?", (key,))
+            conn.execute("DELETE FROM page_quality WHERE key = ?", (key,))
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (key, page_count, outline, scanned, created_at, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, 0, ?)",
+                (key, page_count, json.dumps(outline), int(scanned), now, now),
+            )
+            conn.execute("COMMIT")
+
+    def pages(self, key: str, page_numbers: Iterable[int]) -> Dict[int, str]:
+        """
+        Read the stored text of some pages.
+
+        Args:
+            key (str): Store key built by store_key
+            page_numbers (Iterable[int]): 1-based numbers of the pages
+
+        Returns:
+            Dict[int, str]: Text of the pages found, keyed by page number
+        """
+        page_numbers = list(page_numbers)
+        if not page_numbers:
+            return {}
+        texts = {}
+        with closing(self._connect()) as conn:
+            # Stay below SQLite's limit on the number of query parameters
+            for start in range(0, len(page_numbers), 500):
+                batch = page_numbers[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT page, text FROM pages WHERE key = ? AND page IN ({','.join('?' * len(batch))})",
+                    (key, *batch),
+                )
+                texts.update((page, zlib.decompress(text).decode("utf-8")) for page, text in rows)
+        return texts
+
+    def put_pages(self, key: str, texts: Dict[int, str], quality: Optional[Dict[int, Tuple[int, Optional[float]]]] = None):
+        """
+        Store the text of some pages, evicting least recently used documents above the size cap.
+
+        Args:
+            key (str): Store key built by store_key
+            texts (Dict[int, str]): Text of the pages keyed by page number
+            quality (Dict[int, Tuple[int, Optional[float]]], optional): OCR
+                resolution and confidence of recognised pages. Defaults to None.
+        """
+        if not texts:
+            return
+        quality = quality or {}
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO pages (key, page, text) VALUES (?, ?, ?)",
+                [(key, page, zlib.compress(text.encode("utf-8"))) for page, text in texts.items()],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO page_quality (key, page, dpi, confidence) VALUES (?, ?, ?, ?)",
+                [(key, page, *quality[page]) for page in texts if page in quality],
+            )
+            conn.execute(
+                "UPDATE documents SET size = (SELECT COALESCE(SUM(LENGTH(text)), 0) FROM pages WHERE key = ?), "
+                "last_access = ? WHERE key = ?",
+                (key, time.time(), key),
+            )
+            evicted = self._evict(conn, key)
+            conn.execute("COMMIT")
+
+        if evicted:
+            self.evictions += evicted
+            logger.debug("Evicted %d documents from the page text store", evicted)
+
+    def _evict(self, conn: sqlite3.Connection, keep: str) -> int:
+        """Delete least recently used documents, other than keep, until the store fits its size cap."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+        evicted = 0
+        if total <= self.max_bytes:
+            return evicted
+        for old_key, old_size in conn.execute(
+            "SELECT key, size FROM documents WHERE key != ? ORDER BY last_access", (keep,)
+        ).fetchall():
+            for table in ("pages", "tocs", "page_quality", "documents"):
+                conn.execute(f"DELETE FROM {table} WHERE key = ?", (old_key,))
+            total -= old_size
+            evicted += 1
+            if total <= self.max_bytes:
+                break
+        return evicted
+
+    def quality(self, key: str) -> Dict[int, Tuple[int, Optional[float]]]:
+        """
+        Read the OCR resolution and confidence of the recognised pages of a document.
+
+        Args:
+            key (str): Store key built by store_key
+
+        Returns:
+            Dict[int, Tuple[int, Optional[float]]]: Resolution and confidence
+            keyed by page number
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT page, dpi, confidence FROM page_quality WHERE key = ?", (key,))
+            return {page: (dpi, confidence) for page, dpi, confidence in rows}
+
+    def toc(self, key: str, method: str) -> Optional[list]:
+        """
+        Read a stored table of contents.
+
+        Args:
+            key (str): Store key built by store_key
+            method (str): How the table of contents was read, e.g. "text" or "lazy"
+
+        Returns:
+            Optional[list]: Table of contents entries, None if not stored
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT toc FROM tocs WHERE key = ? AND method = ?", (key, method)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put_toc(self, key: str, method: str, toc: list):
+        """
+        Store a table of contents.
+
+        Args:
+            key (str): Store key built by store_key
+            method (str): How the table of contents was read
+            toc (list): Table of contents entries
+        """
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tocs (key, method, toc) VALUES (?, ?, ?)",
+                (key, method, json.dumps(toc)),
+            )
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+
+def get_text_store() -> TextStore:
+    """Return the process-wide page text store, creating it on first use."""
+    global _text_store
+    if _text_store is None:
+        _text_store = TextStore(TEXT_STORE_PATH, mode=TEXT_STORE_MODE)
+    return _text_store
+
+
+class WarmResult(NamedTuple):
+    """
+    Outcome of pre-warming the store with one PDF file.
+
+    Attributes:
+        file_path (str): Path to the PDF file
+        pages (int): Number of pages stored
+        stored (bool): True if the file was already in the store
+        error (str, optional): Error message if the file could not be read
+        seconds (float): Wall-clock processing time
+    """
+    file_path: str
+    pages: int
+    stored: bool
+    error: Optional[str]
+    seconds: float
+
+
+def warm_file(file_path: str, processor_options: Optional[dict] = None) -> WarmResult:
+    """
+    Store the text of every page of a PDF and its table of contents.
+
+    Args:
+        file_path (str): Path to the PDF file
+        processor_options (dict, optional): Keyword arguments for PDFProcessor
+
+    Returns:
+        WarmResult: Number of pages stored, or the error message
+    """
+    from src.pdf_process import PDFProcessor
+
+    start = time.perf_counter()
+    try:
+        processor = PDFProcessor(file_path, **(processor_options or {}))
+        try:
+            stored = processor.from_store
+            processor.doc.prefetch(range(1, processor.doc.page_count + 1))
+            return WarmResult(file_path, processor.doc.page_count, stored, None, time.perf_counter() - start)
+        finally:
+            processor.doc.close()
+    except Exception as e:
+        logger.error("Failed to store the text of %s: %s", file_path, str(e), exc_info=True)
+        return WarmResult(file_path, 0, False, str(e) or e.__class__.__name__, time.perf_counter() - start)
+
+
+def iter_warm_files(file_paths: List[str], workers: int = 1, processor_options: Optional[dict] = None) -> Iterator[WarmResult]:
+    """
+    Pre-warm the store with PDF files across a pool of worker processes.
+
+    Args:
+        file_paths (List[str]): Paths of the PDF files
+        workers (int, optional): Number of worker processes. Defaults to 1.
+        processor_options (dict, optional): Keyword arguments for PDFProcessor
+
+    Yields:
+        WarmResult: Outcome of each file, as soon as it is done
+    """
+    if workers <= 1 or len(file_paths) <= 1:
+        for file_path in file_paths:
+            yield warm_file(file_path, processor_options)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(file_paths))) as executor:
+        futures = [executor.submit(warm_file, file_path, processor_options) for file_path in file_paths]
+        for future in as_completed(futures):
+            yield future.result()
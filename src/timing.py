@@ -0,0 +1,89 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+STAGES = ("open", "toc", "ocr", "retrieve", "llm", "parse", "write")
+
+_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("stages", default=None)
+_counts: ContextVar[Optional[Dict[str, int]]] = ContextVar("counts", default=None)
+_parent: ContextVar[Optional[List[float]]] = ContextVar("parent_stage", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time a pipeline stage into the stages being recorded, if any.
+
+    Stages are exclusive: time spent in a nested stage, e.g. OCR while
+    opening a scanned PDF, is only counted for the nested stage. Concurrent
+    stages, e.g. LLM requests sent together, each count their own duration.
+
+    Args:
+        name (str): Stage name, one of STAGES
+    """
+    stages = _stages.get()
+    if stages is None:
+        yield
+        return
+
+    parent = _parent.get()
+    # Time spent in nested stages, subtracted from this one
+    children = [0.0]
+    token = _parent.set(children)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _parent.reset(token)
+        stages[name] = stages.get(name, 0.0) + elapsed - children[0]
+        if parent is not None:
+            parent[0] += elapsed
+
+
+@contextmanager
+def record_stages() -> Iterator[Dict[str, float]]:
+    """
+    Record the time spent in each stage by the code run in this context.
+
+    Yields:
+        Dict[str, float]: Seconds per stage name, filled in as stages complete
+    """
+    stages: Dict[str, float] = {}
+    token = _stages.set(stages)
+    parent_token = _parent.set(None)
+    try:
+        yield stages
+    finally:
+        _parent.reset(parent_token)
+        _stages.reset(token)
+
+
+def count(name: str, value: int = 1):
+    """
+    Add to a counter of the counts being recorded, if any.
+
+    Args:
+        name (str): Counter name, e.g. "ocr_pages"
+        value (int, optional): Amount to add. Defaults to 1.
+    """
+    counts = _counts.get()
+    if counts is not None:
+        counts[name] = counts.get(name, 0) + value
+
+
+@contextmanager
+def record_counts() -> Iterator[Dict[str, int]]:
+    """
+    Record the counters incremented by the code run in this context.
+
+    Yields:
+        Dict[str, int]: Counter values keyed by name
+    """
+    counts: Dict[str, int] = {}
+    token = _counts.set(counts)
+    try:
+        yield counts
+    finally:
+        _counts.reset(token)
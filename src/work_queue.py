@@ -0,0 +1,383 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from typing import Dict, List, NamedTuple, Optional
+
+from src.batch import process_pdf_safe
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+QUEUE_PATH = os.getenv("QUEUE_PATH", os.path.join("output", "queue.sqlite"))
+QUEUE_LEASE_SECONDS = float(os.getenv("QUEUE_LEASE_SECONDS", "300"))
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", "3"))
+
+TASK_STATUSES = ("queued", "leased", "done", "failed")
+
+
+class Task(NamedTuple):
+    """
+    A PDF file claimed by a worker.
+
+    Attributes:
+        id (int): Task identifier
+        batch (str): Batch the task belongs to
+        file_path (str): Path to the PDF file
+        attempts (int): Number of times the task was claimed, including this one
+    """
+    id: int
+    batch: str
+    file_path: str
+    attempts: int
+
+
+def worker_name() -> str:
+    """Identify the current worker process by host, process id and a random suffix."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class WorkQueue:
+    """
+    A durable queue of PDF files to process, backed by SQLite.
+
+    Workers claim one task at a time with a lease that they renew with
+    heartbeats. Tasks whose lease expired, e.g. because their worker died,
+    are queued again until they reach the maximum number of attempts. Rows
+    and errors are stored per file, so a batch can be drained by several
+    processes, or several hosts sharing the database file, and resumed after
+    a crash. The database uses SQLite's rollback journal rather than WAL,
+    which needs shared memory between the processes and so does not work on
+    network filesystems; the filesystem must still support file locks.
+
+    Attributes:
+        path (str): Path to the SQLite database file
+        lease_seconds (float): Duration of a lease without heartbeat
+        max_attempts (int): Number of claims before a task is marked as failed
+    """
+
+    def __init__(self, path: str = QUEUE_PATH, lease_seconds: float = QUEUE_LEASE_SECONDS, max_attempts: int = QUEUE_MAX_ATTEMPTS):
+        """
+        Initialize the queue, creating the database if needed.
+
+        Args:
+            path (str, optional): Path to the SQLite database file. Defaults to QUEUE_PATH.
+            lease_seconds (float, optional): Lease duration. Defaults to QUEUE_LEASE_SECONDS.
+            max_attempts (int, optional): Maximum claims per task. Defaults to QUEUE_MAX_ATTEMPTS.
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with closing(self._connect()) as conn:
+            # Also switches back queue files created in WAL mode
+            conn.execute("PRAGMA journal_mode=DELETE")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                "id INTEGER PRIMARY KEY, batch TEXT NOT NULL, file_path TEXT NOT NULL, "
+                "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, "
+                "lease_expires REAL, rows TEXT, error TEXT, seconds REAL, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+                "UNIQUE (batch, file_path))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (batch, status)")
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def enqueue(self, file_paths: List[str], batch: str = "default") -> int:
+        """
+        Add one task per PDF file, ignoring files already in the batch.
+
+        Args:
+            file_paths (List[str]): Paths of the PDF files
+            batch (str, optional): Batch name. Defaults to "default".
+
+        Returns:
+            int: Number of tasks added
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO tasks (batch, file_path, status, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?)",
+                [(batch, os.path.abspath(file_path), now, now) for file_path in file_paths],
+            )
+            added = conn.total_changes - before
+            conn.execute("COMMIT")
+        logger.info("Queued %d of %d files in batch %s", added, len(file_paths), batch)
+        return added
+
+    def _expire_leases(self, conn: sqlite3.Connection, now: float):
+        conn.execute(
+            "UPDATE tasks SET status = 'failed', worker = NULL, updated_at = ?, "
+            "error = COALESCE(error, 'lease expired') || ' (gave up after ' || attempts || ' attempts)' "
+            "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, self.max_attempts),
+        )
+        expired = conn.execute(
+            "UPDATE tasks SET status = 'queued', worker = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (now, now),
+        ).rowcount
+        if expired:
+            logger.warning("Re-queued %d tasks with an expired lease", expired)
+
+    def claim(self, worker: str, batch: Optional[str] = None) -> Optional[Task]:
+        """
+        Lease the oldest queued task, re-queuing expired leases first.
+
+        Args:
+            worker (str): Name of the claiming worker
+            batch (str, optional): Only claim tasks of this batch. Defaults to any batch.
+
+        Returns:
+            Optional[Task]: The claimed task, None if no task is queued
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._expire_leases(conn, now)
+            if batch is None:
+                row = conn.execute(
+                    "SELECT id, batch, file_path, attempts FROM tasks WHERE status = 'queued' ORDER BY id LIMIT 1"
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT id, batch, file_path, attempts FROM tasks WHERE status = 'queued' AND batch = ? "
+                    "ORDER BY id LIMIT 1",
+                    (batch,),
+                ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE tasks SET status = 'leased', attempts = attempts + 1, worker = ?, "
+                    "lease_expires = ?, updated_at = ? WHERE id = ?",
+                    (worker, now + self.lease_seconds, now, row[0]),
+                )
+            conn.execute("COMMIT")
+
+        if row is None:
+            return None
+        task = Task(row[0], row[1], row[2], row[3] + 1)
+        logger.info("Worker %s claimed %s (attempt %d)", worker, task.file_path, task.attempts)
+        return task
+
+    def heartbeat(self, task: Task, worker: str) -> bool:
+        """
+        Renew the lease of a task.
+
+        Args:
+            task (Task): Claimed task
+            worker (str): Name of the worker holding the lease
+
+        Returns:
+            bool: False if the worker lost the lease
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            renewed = conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (now + self.lease_seconds, now, task.id, worker),
+            ).rowcount
+        if not renewed:
+            logger.warning("Worker %s lost the lease of %s", worker, task.file_path)
+        return bool(renewed)
+
+    def complete(self, task: Task, worker: str, rows: List[dict], seconds: float) -> bool:
+        """
+        Record the rows of a processed task.
+
+        Args:
+            task (Task): Claimed task
+            worker (str): Name of the worker holding the lease
+            rows (List[dict]): Rows extracted from the PDF file
+            seconds (float): Processing time
+
+        Returns:
+            bool: False if the worker lost the lease and the result was discarded
+        """
+        with closing(self._connect()) as conn:
+            updated = conn.execute(
+                "UPDATE tasks SET status = 'done', rows = ?, error = NULL, seconds = ?, worker = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (json.dumps(rows), seconds, time.time(), task.id, worker),
+            ).rowcount
+        return bool(updated)
+
+    def fail(self, task: Task, worker: str, error: str, seconds: float) -> bool:
+        """
+        Record a processing error, queuing the task again if attempts remain.
+
+        Args:
+            task (Task): Claimed task
+            worker (str): Name of the worker holding the lease
+            error (str): Error message
+            seconds (float): Processing time
+
+        Returns:
+            bool: True if the task was queued again, False if it was marked
+            as failed or the worker lost the lease and the error was discarded
+        """
+        retry = task.attempts < self.max_attempts
+        with closing(self._connect()) as conn:
+            updated = conn.execute(
+                "UPDATE tasks SET status = ?, error = ?, seconds = ?, worker = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                ("queued" if retry else "failed", error, seconds, time.time(), task.id, worker),
+            ).rowcount
+        logger.warning(
+            "Processing %s failed on attempt %d/%d: %s", task.file_path, task.attempts, self.max_attempts, error
+        )
+        if not updated:
+            logger.warning("Discarding error of %s, the lease was taken over", task.file_path)
+            return False
+        return retry
+
+    def counts(self, batch: str = "default") -> Dict[str, int]:
+        """
+        Count the tasks of a batch by status.
+
+        Args:
+            batch (str, optional): Batch name. Defaults to "default".
+
+        Returns:
+            Dict[str, int]: Number of tasks keyed by status
+        """
+        counts = dict.fromkeys(TASK_STATUSES, 0)
+        with closing(self._connect()) as conn:
+            for status, count in conn.execute(
+                "SELECT status, COUNT(*) FROM tasks WHERE batch = ? GROUP BY status", (batch,)
+            ):
+                counts[status] = count
+        return counts
+
+    def results(self, batch: str = "default") -> List[dict]:
+        """
+        Return the rows of the processed files of a batch, in queue order.
+
+        Args:
+            batch (str, optional): Batch name. Defaults to "default".
+
+        Returns:
+            List[dict]: Extracted rows
+        """
+        with closing(self._connect()) as conn:
+            return [
+                row
+                for (rows,) in conn.execute(
+                    "SELECT rows FROM tasks WHERE batch = ? AND status = 'done' ORDER BY id", (batch,)
+                )
+                for row in json.loads(rows)
+            ]
+
+    def errors(self, batch: str = "default") -> Dict[str, str]:
+        """
+        Return the last error of the failed files of a batch.
+
+        Args:
+            batch (str, optional): Batch name. Defaults to "default".
+
+        Returns:
+            Dict[str, str]: Error messages keyed by file path
+        """
+        with closing(self._connect()) as conn:
+            return dict(conn.execute(
+                "SELECT file_path, error FROM tasks WHERE batch = ? AND status = 'failed' ORDER BY id", (batch,)
+            ))
+
+
+class _Heartbeat(threading.Thread):
+    """Renews the lease of a task in the background while it is processed."""
+
+    def __init__(self, queue: WorkQueue, task: Task, worker: str):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.task = task
+        self.worker = worker
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.queue.lease_seconds / 3):
+            if not self.queue.heartbeat(self.task, self.worker):
+                return
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_worker(
+    queue: WorkQueue,
+    batch: Optional[str] = None,
+    worker: Optional[str] = None,
+    processor_options: Optional[dict] = None,
+    structurer_options: Optional[dict] = None,
+    wait: bool = False,
+    poll_seconds: float = 5.0,
+) -> int:
+    """
+    Drain tasks from the queue with the PDFProcessor/PDFStructurer pipeline.
+
+    Args:
+        queue (WorkQueue): Queue to drain
+        batch (str, optional): Only process tasks of this batch. Defaults to any batch.
+        worker (str, optional): Name of the worker. Defaults to host and process id.
+        processor_options (dict, optional): Keyword arguments for PDFProcessor
+        structurer_options (dict, optional): Keyword arguments for PDFStructurer
+        wait (bool, optional): Keep polling for new tasks when the queue is
+                               empty instead of returning. Defaults to False.
+        poll_seconds (float, optional): Delay between polls. Defaults to 5.0.
+
+    Returns:
+        int: Number of tasks processed by this worker
+    """
+    worker = worker or worker_name()
+    processed = 0
+    logger.info("Worker %s started", worker)
+    while True:
+        task = queue.claim(worker, batch)
+        if task is None:
+            if not wait:
+                break
+            time.sleep(poll_seconds)
+            continue
+
+        heartbeat = _Heartbeat(queue, task, worker)
+        heartbeat.start()
+        try:
+            result = process_pdf_safe(
+                task.file_path,
+                processor_options=processor_options,
+                structurer_options=structurer_options,
+            )
+        finally:
+            heartbeat.stop()
+
+        if result.error is None:
+            if not queue.complete(task, worker, result.rows, result.seconds):
+                logger.warning("Discarding result of %s, the lease was taken over", task.file_path)
+        else:
+            queue.fail(task, worker, result.error, result.seconds)
+        processed += 1
+
+    logger.info("Worker %s finished after %d tasks", worker, processed)
+    return processed
@@ -0,0 +1,11 @@
+from src import batch
+from src.batch import pool_processor_options
+
+
+def test_ocr_threads_are_split_between_worker_processes(monkeypatch):
+    monkeypatch.setattr(batch, "OCR_WORKERS", 16)
+
+    assert pool_processor_options({"lazy_ocr": True}, 4) == {"lazy_ocr": True, "ocr_workers": 4}
+    assert pool_processor_options(None, 32) == {"ocr_workers": 1}
+    # An explicit thread count is kept
+    assert pool_processor_options({"ocr_workers": 8}, 4) == {"ocr_workers": 8}
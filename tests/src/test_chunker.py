@@ -0,0 +1,55 @@
+from src.chunker import Chunk, approximate_tokens, chunk_blocks, merge_chunk_rows, split_block
+from src.data_models import DFSchema
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def test_adjacent_blocks_are_packed_up_to_the_budget():
+    blocks = ["one two three", "four five", "six seven eight nine", "ten"]
+    chunks = chunk_blocks(blocks, max_tokens=6, count=count_words)
+
+    assert [chunk.blocks for chunk in chunks] == [[0, 1], [2, 3]]
+    assert all(chunk.tokens <= 6 for chunk in chunks)
+    assert not any(chunk.continued for chunk in chunks)
+
+
+def test_oversized_block_is_split_on_paragraphs_with_overlap():
+    block = "alpha beta\n\ngamma delta\n\nepsilon zeta\n\neta theta"
+    parts = split_block(block, max_tokens=4, overlap_tokens=2, count=count_words)
+
+    assert parts == ["alpha beta\n\ngamma delta", "gamma delta\n\nepsilon zeta", "epsilon zeta\n\neta theta"]
+
+
+def test_oversized_block_is_split_before_numbered_headings():
+    block = "1. Objectives\nTo assess PFS\n2. Endpoints\nProgression-free survival"
+    parts = split_block(block, max_tokens=5, overlap_tokens=0, count=count_words)
+
+    assert parts == ["1. Objectives\nTo assess PFS", "2. Endpoints\nProgression-free survival"]
+
+
+def test_split_chunks_are_marked_as_continued():
+    chunks = chunk_blocks(["short", "a b\n\nc d\n\ne f"], max_tokens=4, overlap_tokens=2, count=count_words)
+
+    assert chunks[0] == Chunk("short", 1, [0])
+    assert [chunk.continued for chunk in chunks[1:]] == [False] + [True] * (len(chunks) - 2)
+    assert all(chunk.blocks == [1] for chunk in chunks[1:])
+
+
+def test_merge_drops_rows_repeated_by_the_overlap():
+    chunks = [Chunk("a", 1, [0]), Chunk("b", 1, [0], continued=True), Chunk("c", 1, [1])]
+    rows = [
+        [DFSchema(name="doc", statement_text="To assess PFS"), DFSchema(name="doc", statement_text="To assess OS")],
+        [DFSchema(name="doc", statement_text="to assess  OS"), DFSchema(name="doc", statement_text="To assess ORR")],
+        [DFSchema(name="doc", statement_text="To assess ORR")],
+    ]
+
+    merged = merge_chunk_rows(chunks, rows)
+
+    assert [row.statement_text for row in merged] == ["To assess PFS", "To assess OS", "To assess ORR", "To assess ORR"]
+
+
+def test_approximate_tokens_counts_words_and_punctuation():
+    assert approximate_tokens("Overall survival (OS).") == 8
+    assert approximate_tokens("pharmacokinetics") == 4
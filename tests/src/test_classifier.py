@@ -0,0 +1,51 @@
+import pytest
+
+from src.classifier import SectionClassifier, classify_rows
+from src.data_models import DFSchema
+
+
+class KeywordClassifier(SectionClassifier):
+    """Stand-in for a trained model, labelling statements by keyword."""
+
+    def __init__(self, field):
+        self.field = field
+        self.batch_size = 2
+        self.max_tokens = 10
+        self.calls = []
+
+    def predict(self, texts):
+        self.calls.append(texts)
+        return ["endpoint" if "rate" in text else "objective" for text in texts]
+
+
+@pytest.fixture
+def rows():
+    return [
+        DFSchema(name="doc", statement_text="Overall response rate", section_level_1="objective"),
+        DFSchema(name="doc", statement_text="To compare survival"),
+    ]
+
+
+def test_fill_only_labels_missing_values(rows):
+    classifier = KeywordClassifier("section_level_1")
+    classify_rows(rows, [classifier], mode="fill")
+    assert [row.section_level_1 for row in rows] == ["objective", "objective"]
+    assert classifier.calls == [["To compare survival"]]
+
+
+def test_override_relabels_all_rows(rows):
+    classify_rows(rows, [KeywordClassifier("section_level_1")], mode="override")
+    assert [row.section_level_1 for row in rows] == ["endpoint", "objective"]
+
+
+def test_unknown_mode_raises(rows):
+    with pytest.raises(ValueError):
+        classify_rows(rows, [], mode="replace")
+
+
+def test_batches_respect_size_and_token_budget():
+    classifier = KeywordClassifier("section_level_2")
+    batches = list(classifier._batches([4, 1, 3, 2, 6]))
+    assert sorted(i for batch in batches for i in batch) == [0, 1, 2, 3, 4]
+    assert all(len(batch) <= 2 for batch in batches)
+    assert batches[0] == [1, 3]
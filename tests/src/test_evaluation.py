@@ -0,0 +1,57 @@
+import pandas as pd
+
+from src.evaluation import align, document_names, evaluate, field_scores, normalise_text, regressions
+
+
+def rows(statements):
+    return pd.DataFrame(
+        [
+            {"name": name, "statement_text": text, "section_level_1": "Primary", "section_level_2": "Objectives", "outcome_measure": measure}
+            for name, text, measure in statements
+        ]
+    )
+
+
+def test_texts_and_names_are_normalised():
+    texts = pd.Series(["To compare  “PFS”\nand OS.", None, "Safety – and tolerability"])
+    names = pd.Series(["input\\Prot_000", "output/Prot_001.pdf", "Prot_002"])
+
+    assert normalise_text(texts).tolist() == ["to compare pfs and os", "", "safety - and tolerability"]
+    assert document_names(names).tolist() == ["Prot_000", "Prot_001", "Prot_002"]
+
+
+def test_statements_are_aligned_within_documents_above_the_threshold():
+    gold = pd.DataFrame({
+        "document": ["Prot_000", "Prot_000", "Prot_001"],
+        "text": ["to compare progression-free survival", "to assess safety", "to assess overall survival"],
+    })
+    predicted = pd.DataFrame({
+        "document": ["Prot_000", "Prot_000", "Prot_002"],
+        "text": ["to assess safety", "to compare progression free survival", "to assess overall survival"],
+    })
+
+    pairs = align(gold, predicted, threshold=0.7)
+
+    assert sorted(zip(pairs["gold_index"], pairs["predicted_index"])) == [(0, 1), (1, 0)]
+    assert align(gold, predicted, threshold=0.99)["gold_index"].tolist() == [1]
+
+
+def test_scores_and_regressions():
+    assert field_scores(pd.Series(["a", "a", "b"]), pd.Series(["a", "b", "b"])) == {
+        "accuracy": 2 / 3, "precision": 0.75, "recall": 0.75, "support": 3
+    }
+
+    gold = rows([("Prot_000", "To compare PFS.", "PFS"), ("Prot_000", "To assess safety", "Safety")])
+    predicted = rows([("input\\Prot_000", "To compare PFS", "Progression free survival"), ("Prot_000", "Unrelated text", "OS")])
+    report = evaluate(gold, predicted)
+
+    assert report["statements"]["true_positives"] == 1
+    assert report["statements"]["exact_matches"] == 1
+    assert report["fields"]["outcome_measure"]["accuracy"] == 0.0
+    assert evaluate(gold, predicted, canonical_outcomes=True)["fields"]["outcome_measure"]["accuracy"] == 1.0
+
+    assert regressions(report, report) == []
+    found = regressions(report, evaluate(gold, gold))
+    assert "statements.f1 dropped from 1.0000 to 0.5000" in found
+    assert "fields.outcome_measure.accuracy dropped from 1.0000 to 0.0000" in found
+    assert not any(name.startswith("fields.section_level") for name in found)
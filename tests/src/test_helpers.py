@@ -1,6 +1,6 @@
 import pytest
 
-from src.helpers import matching_section
+from src.helpers import heading_position, matching_section, section_spans
 
 @pytest.fixture()
 def section_examples():
@@ -77,3 +77,38 @@ def test_matching_section(section_examples,example):
     expected = example_case[1]
     predictions = [matching_section(section) for section in sections]
     assert predictions == expected
+
+
+@pytest.mark.parametrize(
+    "example,expected",
+    [
+        ("oe_lvl_1", [("2. Study objective and study endpoints", "3. Study design")]),
+        ("o_lvl1_e", [
+            ("8 STUDY OBJECTIVES", "9 INVESTIGATIONAL PLAN"),
+            ("9.1.1 Primary Endpoint", "9.1.2 Secondary Endpoints"),
+            ("9.1.2 Secondary Endpoints", "9.1.3 Exploratory Endpoints"),
+            ("9.1.3 Exploratory Endpoints", None),
+        ]),
+        ("e_noo", [
+            ("9.1.1 Primary Endpoint", "9.1.2 Secondary Endpoints"),
+            ("9.1.2 Secondary Endpoints", "9.1.3 Exploratory Endpoints"),
+            ("9.1.3 Exploratory Endpoints", "9.2 Randomization"),
+        ]),
+        ("no_sections", []),
+    ]
+)
+def test_section_spans(section_examples, example, expected):
+    spans = section_spans(section_examples(example)[0])
+    assert [(entry[1], end and end[1]) for entry, end in spans] == expected
+
+
+def test_section_spans_from_dotted_numbering():
+    toc = [["8.", "Study objectives", 33], ["8.1.", "Primary objective", 33], ["9.", "Study design", 35]]
+    assert section_spans(toc) == [(toc[0], toc[2])]
+
+
+def test_heading_position_prefers_line_start():
+    text = "The study objectives are listed below.\n2.1. Study\nobjectives\nTo assess PFS"
+    assert heading_position(text, [2, "2.1 Study objectives", 3]) == text.index("2.1.")
+    assert heading_position(text, ["2.1", "Study objectives", 3]) == text.index("2.1.")
+    assert heading_position(text, [2, "3 Study design", 3]) is None
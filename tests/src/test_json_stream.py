@@ -0,0 +1,30 @@
+import json
+
+from src.json_stream import JSONRowParser
+
+
+RESPONSE = "```json\n" + json.dumps({"data": [
+    {"statement_text": 'Braces } and quotes " in json text', "nested": [1, {"a": "]"}]},
+    {"statement_text": "Line\nbreak"},
+]}, indent=2) + "\n```"
+
+
+def test_objects_are_returned_as_soon_as_they_close():
+    parser = JSONRowParser()
+    received = []
+    for i, char in enumerate(RESPONSE):
+        for element in parser.feed(char):
+            received.append((element["statement_text"], i))
+
+    assert [text for text, _ in received] == ['Braces } and quotes " in json text', "Line\nbreak"]
+    # The first object is returned long before the end of the response
+    assert received[0][1] < RESPONSE.index("Line")
+    assert parser.complete
+
+
+def test_truncated_response_keeps_completed_objects():
+    parser = JSONRowParser()
+    elements = parser.feed(RESPONSE[:RESPONSE.index("Line")])
+
+    assert len(elements) == 1
+    assert not parser.complete
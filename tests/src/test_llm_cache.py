@@ -0,0 +1,83 @@
+import os
+from multiprocessing import Pool
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src import llm
+from src.fake_llm import FakeChatModel
+from src.llm_cache import ResponseCache, cache_key
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=100)
+
+
+def _put_many(args):
+    path, worker = args
+    cache = ResponseCache(path)
+    for i in range(20):
+        cache.put(f"{worker}-{i}", "response")
+    return len(cache)
+
+
+def test_cache_key_depends_on_prompt_model_and_temperature():
+    key = cache_key("prompt", "gpt-4o", 0.0)
+    assert key == cache_key("prompt", "gpt-4o", 0)
+    assert key != cache_key("prompt ", "gpt-4o", 0.0)
+    assert key != cache_key("prompt", "gpt-4o-mini", 0.0)
+    assert key != cache_key("prompt", "gpt-4o", 0.7)
+
+
+def test_get_put_counts_hits_and_misses(cache):
+    assert cache.get("a") is None
+    cache.put("a", "response")
+    assert cache.get("a") == "response"
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    cache.put("a", "x" * 40)
+    cache.put("b", "x" * 40)
+    cache.get("a")
+    cache.put("c", "x" * 40)
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.evictions == 1
+
+
+def test_bypass_and_refresh_modes(cache):
+    cache.put("a", "old")
+    assert cache.get("a", mode="bypass") is None
+    assert cache.get("a", mode="refresh") is None
+
+    cache.put("a", "new", mode="bypass")
+    assert cache.get("a") == "old"
+    cache.put("a", "new", mode="refresh")
+    assert cache.get("a") == "new"
+
+
+def test_concurrent_writers(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    ResponseCache(path)
+    with Pool(4) as pool:
+        pool.map(_put_many, [(path, worker) for worker in range(4)])
+    assert len(ResponseCache(path)) == 80
+
+
+def test_llm_call_is_served_from_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm, "_response_cache", ResponseCache(str(tmp_path / "cache.sqlite")))
+    model = FakeChatModel()
+
+    first = llm.llm_call("Primary objective", model=model)
+    second = llm.llm_call("Primary objective", model=model)
+    assert first == second
+    assert model.calls == 1
+
+    llm.llm_call("Primary objective", model=model, cache_mode="refresh")
+    llm.llm_call("Primary objective", model=model, cache_mode="bypass")
+    assert model.calls == 3
@@ -0,0 +1,13 @@
+import os
+
+from src.manifest import Manifest
+
+
+def test_prune_only_drops_missing_files_of_the_folder(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+    for folder in ("a", "b"):
+        for name in ("kept.pdf", "deleted.pdf"):
+            manifest.update(os.path.join(tmp_path, folder, name), "hash", [{"name": f"{folder}/{name}"}])
+
+    assert manifest.prune([str(tmp_path / "b" / "kept.pdf")], str(tmp_path / "b")) == 1
+    assert [row["name"] for row in manifest.rows()] == ["a/kept.pdf", "a/deleted.pdf", "b/kept.pdf"]
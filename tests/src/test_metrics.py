@@ -0,0 +1,50 @@
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from benchmarks.pipeline import generate_protocol
+from src.batch import process_pdf_safe
+from src.fake_llm import FakeChatModel
+from src.metrics import Counter, Histogram, Metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("stage_seconds", "Stage durations", buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="llm")
+    histogram.observe(0.5, stage="llm")
+    histogram.observe(5.0, stage="llm")
+
+    lines = histogram.render()
+    assert 'stage_seconds_bucket{stage="llm",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="llm",le="1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="llm",le="+Inf"} 3' in lines
+    assert 'stage_seconds_count{stage="llm"} 3' in lines
+
+
+def test_counter_escapes_label_values():
+    counter = Counter("files_total", "Files")
+    counter.inc(status='a "quoted"\nvalue')
+    assert counter.render()[-1] == 'files_total{status="a \\"quoted\\"\\nvalue"} 1'
+
+
+def test_file_counters_are_recorded_and_aggregated(tmp_path):
+    path = str(tmp_path / "protocol.pdf")
+    generate_protocol(path, pages=20, variant="outline")
+
+    result = process_pdf_safe(
+        path,
+        processor_options={"text_store": "bypass"},
+        structurer_options={"chat_model": FakeChatModel(), "cache_mode": "bypass"}
+    )
+
+    assert result.error is None
+    assert result.counts["toc_entries"] > 0
+    assert result.counts["llm_blocks"] > 0
+    assert result.counts["prompt_tokens"] > 0 and result.counts["completion_tokens"] > 0
+
+    registry = Metrics()
+    registry.observe_file(result.seconds, result.stages, result.counts, result.error)
+    text = registry.render()
+    assert 'pdf_files_total{status="succeeded"} 1' in text
+    assert f'pdf_llm_blocks_total {result.counts["llm_blocks"]}' in text
+    assert 'pdf_stage_seconds_count{stage="llm"} 1' in text
@@ -0,0 +1,71 @@
+import pytest
+
+from src import ocr
+from src.ocr import adaptive_dpis, ocr_page, ocr_pages, text_from_data
+
+
+class FakeImage:
+    def __init__(self, dpi):
+        self.dpi = dpi
+
+    def close(self):
+        pass
+
+
+@pytest.fixture()
+def renders(monkeypatch):
+    """Fake the rendering and recognition of pages whose confidence grows with the resolution."""
+    renders = []
+
+    def render_page(source, page_number, dpi):
+        renders.append((page_number, dpi))
+        return FakeImage(dpi)
+
+    def recognise(image, confidence=False):
+        return f"text at {image.dpi}", (min(95.0, image.dpi / 3) if confidence else None)
+
+    monkeypatch.setattr(ocr, "render_page", render_page)
+    monkeypatch.setattr(ocr, "recognise", recognise)
+    monkeypatch.setattr(ocr, "_page_cache", ocr.OrderedDict())
+    return renders
+
+
+def test_text_from_data_rebuilds_lines_and_weights_confidence():
+    data = {
+        "text": ["", "Primary", "objective", "", "Endpoint", " "],
+        "conf": [-1, 90, 60, -1, 80, 95],
+        "block_num": [1, 1, 1, 2, 2, 2],
+        "par_num": [1, 1, 1, 1, 1, 1],
+        "line_num": [1, 1, 1, 1, 1, 1],
+    }
+
+    text, confidence = text_from_data(data)
+
+    assert text == "Primary objective\n\nEndpoint\n"
+    assert confidence == pytest.approx((90 * 7 + 60 * 9 + 80 * 8) / 24)
+    assert text_from_data({"text": [""], "conf": [-1], "block_num": [1], "par_num": [1], "line_num": [1]}) == ("", None)
+
+
+def test_adaptive_dpis_double_up_to_the_maximum():
+    assert adaptive_dpis(90, 300) == [90, 180, 300]
+    assert adaptive_dpis(300, 300) == [300]
+
+
+def test_low_confidence_pages_are_rendered_again_once_per_resolution(renders, tmp_path):
+    pdf = tmp_path / "scan.pdf"
+    pdf.write_bytes(b"%PDF")
+
+    page = ocr_page(str(pdf), 1, dpi=90, adaptive=True, max_dpi=300, min_confidence=50)
+    assert (page.dpi, page.confidence, page.renders, page.text) == (180, 60.0, 2, "text at 180")
+
+    # Never reaching the threshold keeps the most confident recognition
+    page = ocr_page(str(pdf), 2, dpi=90, adaptive=True, max_dpi=300, min_confidence=99)
+    assert (page.dpi, page.confidence, page.renders) == (300, 95.0, 3)
+
+    # Cached recognitions are not rendered again, only page 1 at 300 dpi for the default threshold of 70
+    pages = list(ocr_pages(str(pdf), [1, 2], dpi=90, workers=2, adaptive=True))
+    assert [(page.dpi, page.renders) for page in pages] == [(300, 1), (300, 0)]
+    assert sorted(renders) == [(1, 90), (1, 180), (1, 300), (2, 90), (2, 180), (2, 300)]
+
+    page = ocr_page(str(pdf), 3, dpi=90)
+    assert (page.dpi, page.confidence, page.renders) == (90, None, 1)
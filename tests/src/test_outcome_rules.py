@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from src.data_models import DFSchema
+from src.outcome_rules import OutcomeExtractor, PhraseMatcher, apply_outcome_rules, load_synonyms
+
+
+@pytest.fixture()
+def extractor():
+    return OutcomeExtractor()
+
+
+def test_matcher_keeps_whole_words_leftmost_longest():
+    matcher = PhraseMatcher({"os": "OS", "objective response": "ORR", "time to objective response": "TTR"})
+
+    assert matcher.find("Dose and time to Objective Response, OS") == [(9, 35, "TTR"), (37, 39, "OS")]
+
+
+def test_measures_of_a_batch_are_mapped_back_to_their_statement(extractor):
+    texts = [
+        "To compare progression-free survival (PFS) and overall survival",
+        None,
+        "Safety and tolerability of the dose",
+        "Duration of objective response and ORR",
+    ]
+
+    assert extractor.extract(texts) == [["PFS", "OS"], [], ["Safety and tolerability"], ["Duration of response", "ORR"]]
+    assert extractor.normalise("Progression free survival") == ["PFS"]
+
+
+def test_texts_lengthened_by_lowercasing_keep_their_matches(extractor):
+    # "İ".lower() is two characters long
+    assert extractor.extract(["İİİİİİİİİİİİ safety", "overall survival"]) == [["Safety and tolerability"], ["OS"]]
+    text = "İİ then PFS"
+    assert [text[start:end] for start, end, _ in extractor.matcher.find(text)] == ["PFS"]
+
+
+def test_rows_are_filled_checked_or_overridden(extractor, tmp_path):
+    def rows():
+        return [
+            DFSchema(name="Prot_000", statement_text="Overall survival", outcome_measure=None),
+            DFSchema(name="Prot_000", statement_text="Objective response rate", outcome_measure="PFS"),
+        ]
+
+    assert [row.outcome_measure for row in apply_outcome_rules(rows(), "fill", extractor)] == ["OS", "PFS"]
+    assert [row.outcome_measure for row in apply_outcome_rules(rows(), "check", extractor)] == ["OS", "PFS"]
+    assert [row.outcome_measure for row in apply_outcome_rules(rows(), "override", extractor)] == ["OS", "ORR"]
+    with pytest.raises(ValueError):
+        apply_outcome_rules(rows(), "replace", extractor)
+
+    path = tmp_path / "synonyms.json"
+    path.write_text(json.dumps({"Myelosuppression": ["severe neutropenia"]}))
+    custom = OutcomeExtractor(load_synonyms(str(path)))
+    assert custom.extract(["Duration of severe neutropenia"]) == [["Myelosuppression"]]
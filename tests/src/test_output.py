@@ -0,0 +1,89 @@
+import csv
+import json
+
+import pytest
+
+from src.output import OUTPUT_COLUMNS, open_sink
+
+
+@pytest.fixture()
+def documents():
+    return [
+        [
+            {"name": "Prot_000", "statement_text": "To compare PFS, per RECIST v1.1",
+             "section_level_0": "objectives-endpoints-section", "section_level_1": "primary-objective",
+             "section_level_2": "efficacy-objective", "outcome_measure": "PFS"},
+            {"name": "Prot_000", "statement_text": "To evaluate safety", "outcome_measure": None},
+        ],
+        [],
+        [
+            {"name": "Prot_001", "statement_text": "To characterise PK", "section_level_2": "pharmacokinetic-objective"},
+        ],
+    ]
+
+
+def test_csv_sink_appends_rows_per_document(tmp_path, documents):
+    path = tmp_path / "output.csv"
+    with open_sink("csv", str(path)) as sink:
+        sink.write_rows(documents[0])
+        # Rows of finished documents are on disk before the run ends
+        with open(path, newline="") as f:
+            assert len(list(csv.DictReader(f))) == 2
+        for rows in documents[1:]:
+            sink.write_rows(rows)
+
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+    assert reader.fieldnames == OUTPUT_COLUMNS
+    assert [row["name"] for row in rows] == ["Prot_000", "Prot_000", "Prot_001"]
+    assert rows[0]["statement_text"] == "To compare PFS, per RECIST v1.1"
+
+
+def test_ndjson_sink(tmp_path, documents):
+    path = tmp_path / "output.ndjson"
+    with open_sink("ndjson", str(path)) as sink:
+        for rows in documents:
+            sink.write_rows(rows)
+
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(rows) == 3
+    assert all(list(row) == OUTPUT_COLUMNS for row in rows)
+    assert rows[1]["outcome_measure"] is None
+
+
+
+@pytest.mark.parametrize("output_format", ["csv", "ndjson"])
+def test_rows_written_since_a_mark_are_discarded(tmp_path, documents, output_format):
+    path = tmp_path / f"output.{output_format}"
+    with open_sink(output_format, str(path)) as sink:
+        sink.write_rows(documents[2])
+        first = sink.mark()
+        sink.write_rows(documents[0][:1])
+        second = sink.mark()
+        sink.write_rows(documents[0][1:])
+        sink.discard(first)
+        # Cutting back to a later mark once the rows are gone does nothing
+        sink.discard(second)
+        assert sink.rows_written == 1
+
+    text = path.read_text()
+    assert "Prot_001" in text and "Prot_000" not in text
+
+def test_parquet_sink_writes_one_row_group_per_document(tmp_path, documents):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "output.parquet"
+    with open_sink("parquet", str(path)) as sink:
+        for rows in documents:
+            sink.write_rows(rows)
+
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.num_row_groups == 2
+    assert parquet_file.schema_arrow.names == OUTPUT_COLUMNS
+    assert not parquet_file.schema_arrow.field("name").nullable
+    assert parquet_file.read().column("name").to_pylist() == ["Prot_000", "Prot_000", "Prot_001"]
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        open_sink("xlsx", str(tmp_path / "output.xlsx"))
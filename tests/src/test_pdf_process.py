@@ -0,0 +1,73 @@
+import os
+import threading
+
+import pymupdf
+import pytest
+
+from benchmarks.pipeline import generate_protocol
+from src import ocr
+from src.document import OCRDocument
+from src.fake_llm import FakeChatModel
+from src.pdf_process import TOC_SCAN_LOOKAHEAD, PDFProcessor
+from src.pdf_structure import PDFStructurer
+
+
+class PageImage:
+    def __init__(self, text):
+        self.text = text
+
+    def close(self):
+        pass
+
+
+@pytest.fixture()
+def rendered(monkeypatch):
+    """Fake Tesseract with the text layer of the PDF, recording the pages rendered."""
+    rendered = []
+    lock = threading.Lock()
+
+    def render_page(source, page_number, dpi):
+        with lock:
+            rendered.append(page_number)
+        with pymupdf.open(source) as doc:
+            return PageImage(doc[page_number - 1].get_text())
+
+    monkeypatch.setattr(ocr, "render_page", render_page)
+    monkeypatch.setattr(ocr, "recognise", lambda image, confidence=False: (image.text, None))
+    monkeypatch.setattr(ocr, "_page_cache", ocr.OrderedDict())
+    return rendered
+
+
+def test_lazy_ocr_only_recognises_the_toc_and_the_pages_it_points_to(rendered, tmp_path):
+    # Without an outline, the table of contents printed on page 2 is recognised like a scan
+    path = str(tmp_path / "protocol.pdf")
+    generate_protocol(path, pages=60, variant="text-toc")
+
+    processed = PDFProcessor(path, lazy_ocr=True, text_store="bypass", ocr_workers=8)
+    assert isinstance(processed.doc, OCRDocument)
+    assert processed.doc.recognised_pages == [1, 2, 3]
+    assert any("Objective" in entry[1] for entry in processed.toc)
+    # Pages recognised ahead of the scan when it stopped, whatever the number of OCR threads
+    assert len(rendered) <= 3 + TOC_SCAN_LOOKAHEAD - 1
+
+    structurer = PDFStructurer(processed, chat_model=FakeChatModel(), cache_mode="bypass")
+
+    assert structurer.data_df
+    assert processed.doc.recognised_pages == sorted({1, 2, 3, *structurer.sections})
+    # Every page is rendered once, pages recognised ahead being kept in the page cache
+    assert len(rendered) == len(set(rendered)) < 60 // 4
+    assert set(rendered) <= set(range(1, 3 + TOC_SCAN_LOOKAHEAD)) | set(structurer.sections)
+
+
+def test_pdf_in_memory_is_written_once_to_a_temporary_file_for_ocr(rendered, tmp_path):
+    path = tmp_path / "protocol.pdf"
+    generate_protocol(str(path), pages=20, variant="text-toc")
+
+    processed = PDFProcessor("protocol.pdf", data=path.read_bytes(), lazy_ocr=True, text_store="bypass")
+    spooled = processed.doc.source_path()
+    assert spooled != "protocol.pdf" and os.path.exists(spooled)
+    processed.doc.prefetch(range(1, 21))
+    assert processed.doc.source_path() == spooled
+
+    processed.doc.close()
+    assert not os.path.exists(spooled)
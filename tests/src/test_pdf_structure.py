@@ -0,0 +1,296 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+
+import pymupdf
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src import llm, section_index
+from src.document import PyMuPDFDocument
+from src.fake_llm import FakeChatModel
+from src.llm_cache import ResponseCache
+from src.pdf_structure import PDFStructurer, astructure_batch, structure_batch
+from src.section_index import SectionIndex
+
+
+# Token budget fitting a single block, so that each block is its own request
+BLOCK_TOKENS = 8
+
+
+@pytest.fixture(autouse=True)
+def bypass_llm_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm, "_response_cache", ResponseCache(str(tmp_path / "cache.sqlite"), mode="bypass"))
+
+
+class ProcessedPDF:
+    def __init__(self, name, doc, toc):
+        self.pdf_name = name
+        self.doc = doc
+        self.toc = toc
+
+
+@pytest.fixture()
+def processed_pdf():
+    def _processed_pdf(name="Prot_000", blocks=6):
+        doc = pymupdf.open()
+        toc = []
+        for i in range(blocks):
+            # Relevant pages are separated by an unrelated one so that each
+            # of them becomes its own content block
+            page = doc.new_page()
+            page.insert_text((50, 72), f"{name} block {i}")
+            doc.new_page()
+            toc.append([2, f"{i + 1}. Study objectives", 2 * i + 1])
+        return ProcessedPDF(name, PyMuPDFDocument(doc), toc)
+
+    return _processed_pdf
+
+
+def block_latency(prompt):
+    # Later blocks answer faster, so completion order is the reverse of block order
+    block = int(prompt.rsplit("block ", 1)[1].split()[0])
+    return 0.05 * (6 - block)
+
+
+def test_concurrent_structure_keeps_block_order(processed_pdf):
+    model = FakeChatModel(latency=block_latency)
+    serial = PDFStructurer(processed_pdf(), chat_model=FakeChatModel(), max_tokens=BLOCK_TOKENS).data_df
+    concurrent = PDFStructurer(processed_pdf(), concurrent=True, chat_model=model, max_tokens=BLOCK_TOKENS).data_df
+
+    assert [row.statement_text for row in concurrent] == [row.statement_text for row in serial]
+    assert [row.statement_text for row in concurrent][0].startswith("Prot_000 block 0")
+    assert model.max_in_flight == 6
+
+
+
+def test_concurrent_structure_inside_a_running_loop_asks_for_astructure(processed_pdf):
+    async def main():
+        with pytest.raises(RuntimeError, match="await astructure"):
+            PDFStructurer(processed_pdf(), concurrent=True, chat_model=FakeChatModel())
+        with pytest.raises(RuntimeError, match="await astructure_batch"):
+            structure_batch([processed_pdf()], chat_model=FakeChatModel())
+
+        structurer = PDFStructurer(processed_pdf(), chat_model=FakeChatModel(), defer=True)
+        return await structurer.astructure()
+
+    assert len(asyncio.run(main())) > 0
+
+def test_concurrent_structure_is_faster_than_serial(processed_pdf):
+    start = time.perf_counter()
+    PDFStructurer(processed_pdf(), chat_model=FakeChatModel(latency=0.05), max_tokens=BLOCK_TOKENS)
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    PDFStructurer(processed_pdf(), concurrent=True, chat_model=FakeChatModel(latency=0.05), max_tokens=BLOCK_TOKENS)
+    concurrent_time = time.perf_counter() - start
+
+    assert concurrent_time < serial_time / 2
+
+
+def test_structure_batch_respects_concurrency_limit(processed_pdf, monkeypatch):
+    monkeypatch.setattr(llm, "LLM_MAX_CONCURRENCY", 4)
+    model = FakeChatModel(latency=0.01)
+    pdfs = [processed_pdf(name=f"Prot_00{i}", blocks=3) for i in range(3)]
+
+    structurers = structure_batch(pdfs, chat_model=model, max_tokens=BLOCK_TOKENS)
+
+    assert model.calls == 9
+    assert model.max_in_flight == 4
+    assert [structurer.name for structurer in structurers] == ["Prot_000", "Prot_001", "Prot_002"]
+    assert all(len(structurer.data_df) == 3 for structurer in structurers)
+    assert all(row.name == structurer.name for structurer in structurers for row in structurer.data_df)
+
+
+def test_short_blocks_of_several_documents_share_a_request(processed_pdf):
+    model = FakeChatModel(rows=2)
+    pdfs = [processed_pdf(name=f"Prot_00{i}", blocks=1) for i in range(3)]
+
+    structurers = structure_batch(pdfs, chat_model=model, pack=True)
+
+    assert model.calls == 1
+    for structurer in structurers:
+        assert [row.name for row in structurer.data_df] == [structurer.name] * 2
+        assert all(row.statement_text.startswith(f"{structurer.name} block 0") for row in structurer.data_df)
+
+
+def test_invalid_packed_response_is_retried_block_by_block(processed_pdf):
+    prompts = []
+
+    def responder(prompt):
+        prompts.append(prompt)
+        if "### Block" in prompt:
+            # Statements without their block id cannot be split back
+            return '{"data": [{"statement_text": "x", "section_level_1": "primary-objective", ' \
+                   '"section_level_2": "efficacy-objective", "outcome_measure": "PFS"}]}'
+        return FakeChatModel().respond(prompt)
+
+    model = FakeChatModel(responder=responder)
+    pdfs = [processed_pdf(name=f"Prot_00{i}", blocks=1) for i in range(2)]
+
+    structurers = structure_batch(pdfs, chat_model=model, pack=True)
+
+    assert model.calls == 3
+    assert [[row.statement_text for row in structurer.data_df] for structurer in structurers] == [
+        ["Prot_000 block 0 (1)"], ["Prot_001 block 0 (1)"]
+    ]
+
+
+def test_small_blocks_share_a_request(processed_pdf):
+    model = FakeChatModel()
+    structurer = PDFStructurer(processed_pdf(), chat_model=model)
+
+    assert model.calls == 1
+    assert structurer.chunks[0].blocks == list(range(6))
+
+
+def test_blocks_span_from_section_heading_to_next_heading():
+    doc = pymupdf.open()
+    doc.new_page().insert_text((50, 72), "1 Introduction\nBackground\n2 Study objectives\nTo assess PFS")
+    doc.new_page().insert_text((50, 72), "To assess OS\n3 Study design\nRandomised")
+    doc.new_page().insert_text((50, 72), "4 Statistics")
+    toc = [[1, "1 Introduction", 1], [1, "2 Study objectives", 1], [1, "3 Study design", 2], [1, "4 Statistics", 3]]
+
+    structurer = PDFStructurer(ProcessedPDF("Prot_000", PyMuPDFDocument(doc), toc), chat_model=FakeChatModel())
+
+    assert structurer.sections == [1, 2]
+    assert structurer.pages == ["2 Study objectives\nTo assess PFS\nTo assess OS\n"]
+
+
+
+def test_section_keeps_the_page_of_a_heading_missing_from_the_text():
+    doc = pymupdf.open()
+    doc.new_page().insert_text((50, 72), "2 Study objectives\nTo assess PFS")
+    # The next heading was garbled by OCR, its page still ends the section
+    doc.new_page().insert_text((50, 72), "To assess OS\n3 Stdy dsign\nRandomised")
+    doc.new_page().insert_text((50, 72), "4 Statistics")
+    toc = [[1, "2 Study objectives", 1], [1, "3 Study design", 2], [1, "4 Statistics", 3]]
+
+    structurer = PDFStructurer(ProcessedPDF("Prot_000", PyMuPDFDocument(doc), toc), chat_model=FakeChatModel())
+
+    assert structurer.sections == [1, 2]
+    assert "To assess OS" in structurer.pages[0]
+    assert "4 Statistics" not in structurer.pages[0]
+
+def test_identical_sections_reuse_rows_across_documents(processed_pdf, tmp_path, monkeypatch):
+    monkeypatch.setattr(llm, "_response_cache", ResponseCache(str(tmp_path / "use.sqlite")))
+    monkeypatch.setattr(section_index, "_section_index", SectionIndex(str(tmp_path / "index.sqlite")))
+    first = PDFStructurer(processed_pdf(name="Prot_000"), chat_model=FakeChatModel()).data_df
+
+    # The same section text in another document is not sent to the model again
+    doc = pymupdf.open()
+    doc.new_page().insert_text((50, 72), "\n".join(f"PROT_000  block {i}" for i in range(6)))
+    model = FakeChatModel()
+    second = PDFStructurer(ProcessedPDF("Prot_001", PyMuPDFDocument(doc), [[1, "Objectives", 1]]), chat_model=model).data_df
+
+    assert model.calls == 0
+    assert [row.statement_text for row in second] == [row.statement_text for row in first]
+    assert all(row.name == "Prot_001" for row in second)
+
+
+def test_streamed_rows_are_passed_on_before_the_response_ends(processed_pdf):
+    model = FakeChatModel(rows=4, chunk_size=8)
+    received = []
+
+    def on_row(row):
+        # The model is still generating the rest of the response
+        received.append((row.statement_text, model.in_flight))
+
+    structurer = PDFStructurer(processed_pdf(), chat_model=model, stream=True, on_row=on_row)
+
+    assert [text for text, _ in received] == [row.statement_text for row in structurer.data_df]
+    assert len(received) == 4
+    assert all(in_flight == 1 for _, in_flight in received[:-1])
+
+
+def test_truncated_response_keeps_completed_rows(processed_pdf):
+    rows = [
+        {"statement_text": f"To assess json output {i}", "section_level_1": "primary-objective",
+         "section_level_2": "efficacy-objective", "outcome_measure": "PFS"}
+        for i in range(3)
+    ]
+    response = "```json\n" + json.dumps({"data": rows}, indent=2) + "\n```"
+    truncated = response[:response.index("output 2")]
+
+    for stream in (False, True):
+        structurer = PDFStructurer(
+            processed_pdf(), chat_model=FakeChatModel(responder=lambda prompt: truncated), stream=stream
+        )
+        assert [row.statement_text for row in structurer.data_df] == ["To assess json output 0", "To assess json output 1"]
+
+
+
+def test_responses_that_do_not_parse_are_not_cached(processed_pdf, tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "use.sqlite"))
+    monkeypatch.setattr(llm, "_response_cache", cache)
+    response = FakeChatModel().respond("Text: To assess PFS")
+
+    for stream in (False, True):
+        model = FakeChatModel(responder=lambda prompt: response[:-20])
+        PDFStructurer(processed_pdf(), chat_model=model, stream=stream).data_df
+        assert len(cache) == 0
+
+    PDFStructurer(processed_pdf(), chat_model=FakeChatModel(), stream=True).data_df
+    assert len(cache) > 0
+
+def test_concurrent_streaming_drops_rows_repeated_by_the_overlap():
+    doc = pymupdf.open()
+    doc.new_page().insert_text((50, 72), "1 Study objectives\n" + "\n".join(f"Objective line {i}" for i in range(30)))
+    calls = itertools.count()
+
+    def responder(prompt):
+        data = [{"statement_text": "Shared statement", "section_level_1": "primary-objective",
+                 "section_level_2": "efficacy-objective", "outcome_measure": "PFS"}]
+        return json.dumps({"data": data})
+
+    received = []
+    structurer = PDFStructurer(
+        ProcessedPDF("Prot_000", PyMuPDFDocument(doc), [[1, "1 Study objectives", 1]]),
+        concurrent=True,
+        # Later chunks answer first, before the chunk they overlap with
+        chat_model=FakeChatModel(responder=responder, latency=lambda prompt: 0.05 / (1 + next(calls))),
+        max_tokens=40,
+        stream=True,
+        on_row=received.append,
+    )
+
+    assert len(structurer.chunks) > 1 and all(chunk.continued for chunk in structurer.chunks[1:])
+    assert [row.statement_text for row in received] == ["Shared statement"]
+    assert len(structurer.data_df) == 1
+
+
+def test_rows_of_a_batch_are_classified_together(processed_pdf, monkeypatch):
+    from src import pdf_structure
+    from tests.src.test_classifier import KeywordClassifier
+
+    classifier = KeywordClassifier("section_level_1")
+    monkeypatch.setattr(pdf_structure, "load_classifier", lambda model_dir: classifier)
+    structurers = [
+        PDFStructurer(processed_pdf(name=f"Prot_00{i}", blocks=1), chat_model=FakeChatModel(rows=2), defer=True,
+                      classifiers=["section_level_1"], classifier_mode="override")
+        for i in range(3)
+    ]
+
+    asyncio.run(astructure_batch(structurers))
+
+    assert len(classifier.calls) == 1 and len(classifier.calls[0]) == 6
+    assert all(row.section_level_1 == "objective" for structurer in structurers for row in structurer.data_df)
+
+
+def test_outcome_rules_scan_the_rows_of_a_batch_once(processed_pdf, monkeypatch):
+    from src import pdf_structure
+
+    calls = []
+    monkeypatch.setattr(pdf_structure, "apply_outcome_rules", lambda rows, mode: calls.append((len(rows), mode)) or rows)
+    structurers = [
+        PDFStructurer(processed_pdf(name=f"Prot_00{i}", blocks=1), chat_model=FakeChatModel(rows=2), defer=True,
+                      outcome_rules="fill")
+        for i in range(3)
+    ]
+
+    asyncio.run(astructure_batch(structurers))
+
+    assert calls == [(6, "fill")]
@@ -0,0 +1,68 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src import llm
+from src.fake_llm import FakeChatModel
+from src.llm_cache import ResponseCache
+from src.routing import TieredChatModel, validate_output
+from src.timing import record_counts
+
+ROW = {
+    "statement_text": "To compare PFS",
+    "section_level_1": "primary-objective",
+    "section_level_2": "efficacy-objective",
+    "outcome_measure": "PFS",
+}
+
+
+def answer(*rows):
+    return "```json\n" + json.dumps({"data": list(rows)}) + "\n```"
+
+
+@pytest.fixture(autouse=True)
+def bypass_llm_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm, "_response_cache", ResponseCache(str(tmp_path / "cache.sqlite"), mode="bypass"))
+
+
+def test_answers_are_checked_against_schema_and_label_vocabulary():
+    assert validate_output(answer(ROW)) is None
+    assert validate_output(answer()) == "no statements"
+    assert validate_output('{"data": [').startswith("invalid JSON")
+    assert "schema" in validate_output(answer({"statement_text": "To compare PFS"}))
+    assert validate_output(answer(dict(ROW, section_level_1="primary"))) == "unknown section_level_1 'primary'"
+
+
+def test_cheap_tier_answers_when_valid_and_escalates_otherwise():
+    cheap = FakeChatModel(responder=lambda prompt: answer(ROW) if "valid" in prompt else answer())
+    strong = FakeChatModel()
+    model = TieredChatModel([cheap, strong], names=["cheap", "strong"])
+
+    assert llm.llm_call("valid block", model=model) == answer(ROW)
+    assert strong.calls == 0
+
+    with record_counts() as counts:
+        escalated = llm.llm_call("other block", model=model)
+    assert validate_output(escalated) is None
+    assert (cheap.calls, strong.calls) == (2, 1)
+    # The rejected answer of the cheap tier is paid for too
+    with record_counts() as strong_counts:
+        llm.llm_call("other block", model=strong)
+    assert counts["completion_tokens"] > strong_counts["completion_tokens"]
+    assert counts["prompt_tokens"] == 2 * strong_counts["prompt_tokens"]
+    assert [(stats.requests, stats.accepted) for stats in model.stats] == [(2, 1), (1, 1)]
+
+
+def test_failing_tier_escalates_asynchronously():
+    class Broken(FakeChatModel):
+        async def ainvoke(self, messages):
+            raise RuntimeError("backend down")
+
+    model = TieredChatModel([Broken(), FakeChatModel()])
+
+    assert validate_output(asyncio.run(llm.allm_call("block", model=model))) is None
+    assert model.stats[0].errors == 1
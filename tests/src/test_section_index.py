@@ -0,0 +1,61 @@
+import pytest
+
+from src.section_index import SectionIndex, minhash, normalize_text
+
+SECTION = " ".join(
+    f"Objective {i}: to evaluate the efficacy of the study drug on outcome {i} in adult patients."
+    for i in range(20)
+)
+ROWS = [{"statement_text": "To evaluate PFS", "section_level_1": "primary-objective"}]
+
+
+@pytest.fixture()
+def index(tmp_path):
+    return SectionIndex(str(tmp_path / "index.sqlite"), mode="near", threshold=0.8)
+
+
+def test_exact_match_ignores_case_whitespace_and_page_markers(index):
+    index.add(SECTION, ROWS)
+    match = index.lookup("\n\n------- Page 3 -------\n\n" + SECTION.upper().replace(" ", "  \n"))
+
+    assert match.exact
+    assert match.rows == ROWS
+
+
+def test_near_match_above_threshold(index):
+    index.add(SECTION, ROWS)
+    amended = SECTION.replace("outcome 19", "outcome nineteen")
+
+    match = index.lookup(amended)
+    assert match is not None and not match.exact
+    assert match.similarity >= 0.8
+    assert index.lookup(amended, mode="exact") is None
+
+
+def test_different_section_is_not_matched(index):
+    index.add(SECTION, ROWS)
+    assert index.lookup("Secondary endpoints: overall survival and quality of life at week 12.") is None
+    assert index.stats() == {"hits": 0, "misses": 1}
+
+
+def test_index_persists_and_off_mode_disables_lookups(index):
+    index.add(SECTION, ROWS)
+    reopened = SectionIndex(index.path, mode="off")
+
+    assert len(reopened) == 1
+    assert reopened.lookup(SECTION) is None
+    assert reopened.lookup(SECTION, mode="exact").rows == ROWS
+
+
+def test_minhash_similarity_estimates_jaccard():
+    words = normalize_text(SECTION)
+    assert (minhash(words) == minhash(list(words))).all()
+    assert (minhash(words) == minhash(words[:40])).mean() < 0.6
+
+
+def test_context_and_comparison_symbols_are_part_of_the_key(index):
+    index.add("Patients aged ≥18 years with PFS above 50%", ROWS, context="gpt-4o")
+
+    assert index.lookup("Patients aged ≥18 years with PFS above 50%", context="gpt-4o").exact
+    assert index.lookup("Patients aged ≥18 years with PFS above 50%", context="gpt-4o-mini") is None
+    assert index.lookup("Patients aged <18 years with PFS above 50%", mode="exact", context="gpt-4o") is None
@@ -0,0 +1,84 @@
+import pytest
+
+from benchmarks.pipeline import generate_protocol
+from src import text_store
+from src.document import Document, StoredDocument
+from src.pdf_process import PDFProcessor
+from src.text_store import TextStore
+
+
+class CountingDocument(Document):
+    def __init__(self, page_count):
+        super().__init__(page_count)
+        self.extracted = []
+
+    def _extract_text(self, page_number):
+        self.extracted.append(page_number)
+        return f"Text of page {page_number} " * 50
+
+
+@pytest.fixture()
+def store(tmp_path, monkeypatch):
+    store = TextStore(str(tmp_path / "pages.sqlite"))
+    monkeypatch.setattr(text_store, "_text_store", store)
+    return store
+
+
+def test_pages_are_compressed_and_read_one_at_a_time(store):
+    store.add_document("key", 3, [], scanned=True)
+    store.put_pages("key", {1: "a" * 10000, 2: "b"})
+
+    assert store.pages("key", [2, 3]) == {2: "b"}
+    with store._connect() as conn:
+        assert conn.execute("SELECT LENGTH(text) FROM pages WHERE page = 1").fetchone()[0] < 1000
+
+
+def test_missing_pages_are_extracted_once_and_stored(store):
+    source = CountingDocument(4)
+    store.add_document("key", 4, [], scanned=False)
+    first = StoredDocument(store, "key", 4, [], scanned=False, open_source=lambda: source)
+    first.prefetch([2, 3])
+
+    second = StoredDocument(store, "key", 4, [], scanned=False, open_source=lambda: source)
+    second.prefetch([1, 2, 3])
+
+    assert source.extracted == [2, 3, 1]
+    assert second.page_text(2) == source.page_text(2)
+
+
+def test_processor_reads_the_store_before_the_pdf(store, tmp_path):
+    path = str(tmp_path / "protocol.pdf")
+    generate_protocol(path, pages=20, variant="outline")
+    first = PDFProcessor(path)
+    first.doc.prefetch([3, 4])
+
+    # The store is keyed by content, not by file name
+    copy = tmp_path / "copy.pdf"
+    copy.write_bytes(open(path, "rb").read())
+    second = PDFProcessor(str(copy))
+
+    assert not first.from_store and second.from_store
+    assert second.toc == first.toc
+    assert second.doc.page_text(3) == first.doc.page_text(3)
+    assert second.doc._source is None
+    assert len(store) == 1
+
+
+def test_least_recently_used_documents_are_evicted_above_the_size_cap(tmp_path):
+    store = TextStore(str(tmp_path / "pages.sqlite"), max_bytes=1600)
+    texts = {page: f"{page} ".join(str(i) for i in range(200)) for page in (1, 2)}
+    for key in ("a", "b"):
+        store.add_document(key, 2, [], scanned=True)
+        store.put_pages(key, texts)
+    store.document("a")
+    store.add_document("c", 2, [], scanned=True)
+    store.put_pages("c", texts)
+
+    assert store.document("b") is None
+    assert store.pages("a", [1]) and store.pages("c", [1])
+    assert store.evictions == 1
+
+
+def test_unknown_text_store_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="text store mode"):
+        PDFProcessor(str(tmp_path / "protocol.pdf"), text_store="reuse")
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from benchmarks.pipeline import generate_protocol
+from src.batch import process_pdf_safe
+from src.fake_llm import FakeChatModel
+from src.timing import record_stages, stage
+
+
+def test_nested_stages_are_exclusive():
+    with record_stages() as stages:
+        with stage("open"):
+            time.sleep(0.02)
+            with stage("ocr"):
+                time.sleep(0.05)
+
+    assert 0.05 <= stages["ocr"] < 0.1
+    assert 0.02 <= stages["open"] < 0.05
+
+
+def test_concurrent_stages_each_count_their_duration():
+    async def call():
+        with stage("llm"):
+            await asyncio.sleep(0.05)
+
+    async def gather():
+        await asyncio.gather(call(), call(), call())
+
+    with record_stages() as stages:
+        asyncio.run(gather())
+
+    assert stages["llm"] >= 0.15
+
+
+def test_stages_are_not_recorded_outside_a_recording():
+    with stage("open"):
+        pass
+    with record_stages() as stages:
+        pass
+    assert stages == {}
+
+
+def test_file_result_breaks_processing_time_down_by_stage(tmp_path):
+    path = str(tmp_path / "protocol.pdf")
+    generate_protocol(path, pages=20, variant="outline")
+
+    result = process_pdf_safe(
+        path,
+        processor_options={"text_store": "bypass"},
+        structurer_options={"chat_model": FakeChatModel(latency=0.05), "cache_mode": "bypass"}
+    )
+
+    assert result.error is None and result.rows
+    assert {"open", "toc", "retrieve", "llm", "parse"} <= set(result.stages)
+    assert result.stages["llm"] >= 0.05
+    assert sum(result.stages.values()) <= result.seconds
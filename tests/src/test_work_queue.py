@@ -0,0 +1,82 @@
+import os
+import time
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src import work_queue
+from src.batch import FileResult
+from src.work_queue import WorkQueue, run_worker
+
+
+@pytest.fixture()
+def queue(tmp_path):
+    return WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=60, max_attempts=2)
+
+
+def test_enqueue_ignores_files_already_queued(queue):
+    assert queue.enqueue(["a.pdf", "b.pdf"]) == 2
+    assert queue.enqueue(["b.pdf", "c.pdf"]) == 1
+    assert queue.counts() == {"queued": 3, "leased": 0, "done": 0, "failed": 0}
+
+
+def test_claimed_task_is_not_claimed_twice(queue):
+    queue.enqueue(["a.pdf"])
+    task = queue.claim("w1")
+
+    assert task.file_path.endswith("a.pdf") and task.attempts == 1
+    assert queue.claim("w2") is None
+    assert queue.complete(task, "w1", [{"name": "a"}], 0.1)
+    assert queue.results() == [{"name": "a"}]
+
+
+def test_expired_lease_is_requeued_up_to_max_attempts(queue):
+    queue.enqueue(["a.pdf"])
+    queue.lease_seconds = 0.01
+    first = queue.claim("w1")
+    time.sleep(0.02)
+
+    second = queue.claim("w2")
+    assert second.id == first.id and second.attempts == 2
+    # The dead worker's late result is discarded
+    assert not queue.complete(first, "w1", [], 0.1)
+
+    time.sleep(0.02)
+    assert queue.claim("w3") is None
+    assert queue.counts()["failed"] == 1
+    assert "lease expired" in queue.errors()[second.file_path]
+
+
+def test_failed_task_is_retried_then_recorded(queue):
+    queue.enqueue(["a.pdf"])
+    assert queue.fail(queue.claim("w1"), "w1", "boom", 0.1)
+    assert not queue.fail(queue.claim("w1"), "w1", "boom again", 0.1)
+    assert list(queue.errors().values()) == ["boom again"]
+    assert queue.counts()["failed"] == 1
+
+
+def test_workers_drain_the_batch(queue, monkeypatch):
+    def process(file_path, processor_options=None, structurer_options=None):
+        if file_path.endswith("bad.pdf"):
+            return FileResult(file_path, [], "unreadable", 0.0)
+        return FileResult(file_path, [{"name": file_path}], None, 0.0)
+
+    monkeypatch.setattr(work_queue, "process_pdf_safe", process)
+    queue.enqueue(["a.pdf", "bad.pdf", "c.pdf"], batch="run")
+
+    assert run_worker(queue, batch="run") == 4
+    assert queue.counts("run") == {"queued": 0, "leased": 0, "done": 2, "failed": 1}
+    assert [row["name"][-5:] for row in queue.results("run")] == ["a.pdf", "c.pdf"]
+
+
+def test_error_after_a_lost_lease_is_discarded(queue):
+    queue.enqueue(["a.pdf"])
+    queue.lease_seconds = 0.01
+    first = queue.claim("w1")
+    time.sleep(0.02)
+    second = queue.claim("w2")
+
+    assert not queue.fail(first, "w1", "late error", 0.1)
+    assert queue.counts()["leased"] == 1
+    assert queue.complete(second, "w2", [], 0.1)
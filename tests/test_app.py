@@ -0,0 +1,162 @@
+from benchmarks.startup import measure_import
+
+
+def test_import_app_defers_heavy_dependencies():
+    # Runs without OPENAI_API_KEY, which used to make the import fail
+    result = measure_import("app")
+    assert result["loaded"] == []
+
+
+def test_output_path_outside_the_output_folder_is_rejected(tmp_path):
+    from fastapi.testclient import TestClient
+
+    from app import app
+
+    client = TestClient(app)
+    for output_path in (str(tmp_path / "output.csv"), "output/../app.py", "output"):
+        response = client.post(
+            "/extract_objectives_and_endpoints",
+            params={"input_folder": str(tmp_path), "output_path": output_path},
+        )
+        assert response.status_code == 400
+        assert "inside the 'output' folder" in response.json()["detail"]
+
+
+def test_pack_files_is_passed_on_and_validated(tmp_path):
+    from fastapi.testclient import TestClient
+
+    from app import app, batch_options
+
+    assert batch_options(1, False, None, None, pack_files=4)["pack_files"] == 4
+
+    client = TestClient(app)
+    params = {"input_folder": str(tmp_path), "pack_files": 0}
+    responses = [
+        client.post("/extract_objectives_and_endpoints", params=params),
+        client.post("/jobs", params=params),
+        client.post("/extract_objectives_and_endpoints/upload", params=params, files={"files": ("a.pdf", b"%PDF")}),
+    ]
+    for response in responses:
+        assert response.status_code == 400
+        assert "packed files" in response.json()["detail"]
+
+
+def test_uploads_are_processed_from_memory_and_streamed_back_as_ndjson(tmp_path, monkeypatch):
+    import json
+    import tempfile
+
+    from fastapi.testclient import TestClient
+
+    from app import app
+    from benchmarks.pipeline import generate_protocol
+    from src import llm
+    from src.fake_llm import FakeChatModel
+
+    path = str(tmp_path / "Prot_000.pdf")
+    generate_protocol(path, pages=12, variant="outline")
+    spool_folder = tmp_path / "spool"
+    spool_folder.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(spool_folder))
+    monkeypatch.setattr(llm, "chat_model", FakeChatModel(rows=2))
+
+    with open(path, "rb") as pdf:
+        response = TestClient(app).post(
+            "/extract_objectives_and_endpoints/upload",
+            params={"llm_cache": "bypass"},
+            files=[("files", ("Prot_000.pdf", pdf.read())), ("files", ("broken.pdf", b"not a pdf"))],
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    rows = [line for line in lines if "error" not in line]
+    assert rows and all(row["name"] == "Prot_000" for row in rows)
+    assert [line["file"] for line in lines if "error" in line] == ["broken.pdf"]
+    # PDFs with a text layer are opened from memory, without temporary files
+    assert list(spool_folder.iterdir()) == []
+
+
+def test_jobs_can_be_submitted_polled_cancelled_and_downloaded(tmp_path, monkeypatch):
+    import json
+    import time
+
+    from fastapi.testclient import TestClient
+
+    import app as app_module
+    from benchmarks.pipeline import generate_protocol
+    from src import llm
+    from src.fake_llm import FakeChatModel
+    from src.jobs import JobManager
+
+    input_folder = tmp_path / "input"
+    input_folder.mkdir()
+    for i in range(2):
+        generate_protocol(str(input_folder / f"Prot_00{i}.pdf"), pages=12, variant="outline", seed=i)
+    # One job at a time, so the second job is still queued while the first runs
+    monkeypatch.setattr(app_module, "job_manager", JobManager(str(tmp_path / "jobs"), max_jobs=1))
+    monkeypatch.setattr(llm, "chat_model", FakeChatModel(latency=0.2))
+    client = TestClient(app_module.app)
+    params = {"input_folder": str(input_folder), "llm_cache": "bypass", "output_format": "ndjson"}
+
+    first = client.post("/jobs", params=params).json()
+    second = client.post("/jobs", params=params).json()
+    assert client.delete(f"/jobs/{second['job_id']}").status_code == 200
+
+    deadline = time.time() + 30
+    while client.get(f"/jobs/{first['job_id']}").json()["status"] in ("queued", "running"):
+        assert time.time() < deadline
+        time.sleep(0.05)
+
+    status = client.get(f"/jobs/{first['job_id']}").json()
+    assert status["status"] == "completed"
+    assert (status["total_files"], status["processed_files"], status["failed_files"]) == (2, 2, 0)
+    assert all(progress["rows"] > 0 for progress in status["files"])
+    result = client.get(f"/jobs/{first['job_id']}/result")
+    rows = [json.loads(line) for line in result.text.splitlines()]
+    assert sorted({row["name"] for row in rows}) == ["Prot_000", "Prot_001"]
+
+    cancelled = client.get(f"/jobs/{second['job_id']}").json()
+    assert cancelled["status"] == "cancelled"
+    assert all(progress["status"] == "cancelled" for progress in cancelled["files"])
+    assert client.get(f"/jobs/{second['job_id']}/result").status_code == 409
+    assert client.get("/jobs/unknown").status_code == 404
+
+
+def test_streamed_rows_of_a_failed_file_are_removed_from_the_output(tmp_path, monkeypatch):
+    import csv
+
+    from fastapi.testclient import TestClient
+
+    import app as app_module
+    from benchmarks.pipeline import generate_protocol
+    from src import llm
+    from src.fake_llm import FakeChatModel
+    from src.pdf_structure import PDFStructurer
+
+    input_folder = tmp_path / "input"
+    input_folder.mkdir()
+    for i in range(2):
+        generate_protocol(str(input_folder / f"Prot_00{i}.pdf"), pages=12, variant="outline", seed=i)
+    monkeypatch.setattr(app_module, "OUTPUT_FOLDER", str(tmp_path / "output"))
+    monkeypatch.setattr(llm, "chat_model", FakeChatModel(rows=2))
+    streamed = []
+
+    def store_rows(self, chunk, rows):
+        # Prot_000 fails once its first block was streamed to the output
+        streamed.append(self.name)
+        if self.name == "Prot_000":
+            raise RuntimeError("section index unavailable")
+
+    monkeypatch.setattr(PDFStructurer, "store_rows", store_rows)
+    response = TestClient(app_module.app).post(
+        "/extract_objectives_and_endpoints",
+        params={"input_folder": str(input_folder), "llm_cache": "bypass", "stream_llm": True},
+    )
+
+    assert response.status_code == 200
+    assert "Prot_000" in streamed
+    statuses = {entry["file"]: entry["status"] for entry in response.json()["files"]}
+    assert statuses == {"Prot_000.pdf": "failed", "Prot_001.pdf": "succeeded"}
+    with open(tmp_path / "output" / "output.csv", newline="") as f:
+        names = {row["name"] for row in csv.DictReader(f)}
+    assert names == {"Prot_001"}
@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+
+from src.output import OUTPUT_FORMATS, open_sink
+from src.work_queue import QUEUE_PATH, WorkQueue, run_worker
+
+
+def main():
+    """
+    Command line entry point of the durable work queue.
+
+    Queue the PDFs of a folder, drain the queue from any number of worker
+    processes or hosts sharing the queue file, and export the results.
+    """
+    parser = argparse.ArgumentParser(description="Process PDF files from a durable work queue.")
+    parser.add_argument("--queue", default=QUEUE_PATH, help="Path to the queue database")
+    parser.add_argument("--batch", default="default", help="Batch name")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Queue the PDF files of a folder")
+    enqueue.add_argument("input_folder")
+
+    work = commands.add_parser("work", help="Process queued files until the batch is drained")
+    work.add_argument("--wait", action="store_true", help="Keep polling for new files")
+    work.add_argument("--concurrent-llm", action="store_true", help="Send the blocks of a file concurrently")
+    work.add_argument("--lazy-ocr", action="store_true", help="Only OCR the TOC and the pages it points to")
+
+    commands.add_parser("status", help="Show the task counts and errors of the batch")
+
+    export = commands.add_parser("export", help="Write the rows of the processed files")
+    export.add_argument("output_path")
+    export.add_argument("--format", default="csv", choices=OUTPUT_FORMATS)
+
+    args = parser.parse_args()
+    queue = WorkQueue(args.queue)
+
+    if args.command == "enqueue":
+        file_paths = [
+            os.path.join(args.input_folder, file_name)
+            for file_name in sorted(os.listdir(args.input_folder))
+            if file_name.endswith(".pdf")
+        ]
+        queue.enqueue(file_paths, batch=args.batch)
+    elif args.command == "work":
+        run_worker(
+            queue,
+            batch=args.batch,
+            processor_options={"lazy_ocr": args.lazy_ocr or None},
+            structurer_options={"concurrent": args.concurrent_llm},
+            wait=args.wait,
+        )
+    elif args.command == "status":
+        print(json.dumps({"counts": queue.counts(args.batch), "errors": queue.errors(args.batch)}, indent=2))
+    elif args.command == "export":
+        with open_sink(args.format, args.output_path) as sink:
+            sink.write_rows(queue.results(args.batch))
+
+
+if __name__ == "__main__":
+    main()